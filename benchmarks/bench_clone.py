@@ -0,0 +1,81 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Compare the latency of creating a new shell with cloning a template shell
+
+$ python benchmarks/bench_clone.py [modules] [commands-per-module]
+"""
+
+import sys
+import timeit
+
+import cmdsh
+from cmdsh.utils import bind_function
+
+
+def make_module(num, commands):
+    """Create a module class which binds a number of commands to the shell"""
+    def load(self, shell):
+        # pylint: disable=unused-argument
+        setattr(shell, '_bench{}_data'.format(num), {})
+        for cmd in range(commands):
+            def command(self, statement: cmdsh.Statement) -> cmdsh.Result:
+                # pylint: disable=unused-argument
+                return cmdsh.Result()
+            command.__name__ = 'do_bench{}_{}'.format(num, cmd)
+            bind_function(command, shell)
+    return type('Bench{}'.format(num), (), {'load': load})
+
+
+class BenchPersonality(cmdsh.personalities.SimplePersonality):
+    """A personality which loads lots of modules"""
+    def __init__(self, modules):
+        super().__init__()
+        self.modules = modules
+
+    def bind(self, shell):
+        for module in self.modules:
+            shell.load_module(module)
+
+
+def main(argv):
+    """run the benchmark"""
+    nmodules = int(argv[1]) if len(argv) > 1 else 50
+    ncommands = int(argv[2]) if len(argv) > 2 else 10
+    modules = [make_module(num, ncommands) for num in range(nmodules)]
+    template = cmdsh.Shell(personality=BenchPersonality(modules))
+
+    number = 200
+    construct = timeit.timeit(
+        lambda: cmdsh.Shell(personality=BenchPersonality(modules)),
+        number=number,
+    )
+    clone = timeit.timeit(template.clone, number=number)
+
+    print('{} modules with {} commands each'.format(nmodules, ncommands))
+    print('construct: {:10.1f} usec per shell'.format(construct / number * 1e6))
+    print('clone:     {:10.1f} usec per shell'.format(clone / number * 1e6))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
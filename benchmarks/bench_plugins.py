@@ -0,0 +1,81 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Measure plugin discovery with and without the cached plugin index
+
+Creates a directory containing hundreds of installed distributions, each of which
+advertises a cmdsh module, and compares scanning their metadata with reading the
+saved index.
+
+$ python benchmarks/bench_plugins.py [distributions]
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+
+import cmdsh.plugins
+
+
+def make_site(sitedir, count):
+    """create count distributions which each provide a cmdsh module"""
+    for num in range(count):
+        distinfo = os.path.join(sitedir, 'plugin{}-1.0.dist-info'.format(num))
+        os.mkdir(distinfo)
+        with open(os.path.join(distinfo, 'METADATA'), 'w') as file:
+            file.write('Metadata-Version: 2.1\nName: plugin{}\nVersion: 1.0\n'.format(num))
+        with open(os.path.join(distinfo, 'entry_points.txt'), 'w') as file:
+            file.write('[cmdsh.modules]\nplugin{0} = plugin{0}:Module\n'.format(num))
+            file.write('[console_scripts]\nplugin{0} = plugin{0}:main\n'.format(num))
+
+
+def main(argv):
+    """run the benchmark"""
+    count = int(argv[1]) if len(argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sitedir = os.path.join(tmpdir, 'site')
+        os.mkdir(sitedir)
+        make_site(sitedir, count)
+        search_path = [sitedir] + sys.path
+        index_path = os.path.join(tmpdir, 'plugins.json')
+
+        def discover():
+            index = cmdsh.plugins.PluginIndex(path=index_path, search_path=search_path)
+            return index.plugins(cmdsh.plugins.MODULES)
+
+        number = 10
+        scan = timeit.timeit(
+            lambda: cmdsh.plugins.PluginIndex(path=index_path, search_path=search_path).refresh(),
+            number=number,
+        )
+        found = len(discover())
+        cached = timeit.timeit(discover, number=number)
+
+    print('{} plugins found in {} distributions'.format(found, count))
+    print('scan:   {:10.2f} msec'.format(scan / number * 1e3))
+    print('cached: {:10.2f} msec'.format(cached / number * 1e3))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -50,6 +50,12 @@ setup(
 
     setup_requires=['setuptools_scm'],
 
+    entry_points={
+        'console_scripts': [
+            'cmdsh-bench=cmdsh.bench:main',
+        ],
+    },
+
     # dependencies for development and testing
     # $ pip3 install -e .[dev]
     extras_require={
@@ -29,7 +29,11 @@ compatible with `cmd` in the standard library.
 from pkg_resources import get_distribution, DistributionNotFound
 
 from .shell import Shell  # noqa F401
-from .models import Statement, Result, CommandNotFound  # noqa F401
+from .models import Statement, BytesStatement, Result  # noqa F401
+from .models import CommandNotFound, ModuleDependencyError  # noqa F401
+from .cancellation import CancellationToken, CommandCancelled, CommandTimeout  # noqa F401
+from .cancellation import timeout  # noqa F401
+from .arguments import argument, with_arguments  # noqa F401
 from . import modules  # noqa F401
 
 try:
@@ -0,0 +1,251 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Declare the arguments of a command once, instead of parsing them in every command
+
+Decorate a command with ``with_arguments()``, passing it the same arguments you
+would pass to ``argparse.ArgumentParser.add_argument()``, each wrapped in
+``argument()``. The command is called with the statement and an
+``argparse.Namespace`` of the parsed arguments:
+
+    class App(cmdsh.Shell):
+        @cmdsh.with_arguments(
+            cmdsh.argument('name'),
+            cmdsh.argument('-l', '--loud', action='store_true', help='shout'),
+        )
+        def do_greet(self, statement, args):
+            \"\"\"Greet someone\"\"\"
+            greeting = 'Hello {}'.format(args.name)
+            self.wout((greeting.upper() if args.loud else greeting) + '\\n')
+            return cmdsh.Result()
+
+The argument parser for a command is only built the first time the command is
+used, and is shared by every shell. Invalid arguments write the usage and an
+error message with ``Shell.werr()`` and return a result with an exit code of 2,
+and ``-h`` writes help with ``Shell.wout()``, without calling the command.
+
+Many commands only have positional arguments and ``store_true`` or ``store_false``
+flags. Their arguments are parsed without using argparse, unless the input is
+something only argparse knows how to handle, like an unknown option.
+"""
+
+import argparse
+import functools
+
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .models import Result
+
+# the kinds of arguments the fast path can parse
+_SIMPLE_POSITIONAL = frozenset(('help', 'metavar', 'nargs', 'type', 'default'))
+_SIMPLE_FLAG = frozenset(('action', 'help', 'dest', 'default'))
+
+
+def argument(*args, **kwargs) -> Tuple[tuple, Dict[str, Any]]:
+    """Declare an argument, using the parameters of ``ArgumentParser.add_argument()``"""
+    return args, kwargs
+
+
+class ParserExit(Exception):
+    """Exception raised instead of exiting when an argument parser would exit"""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    """An argument parser which raises ParserExit instead of writing output and exiting"""
+    def error(self, message: str):
+        raise ParserExit(2, '{}{}: error: {}\n'.format(self.format_usage(), self.prog, message))
+
+    def exit(self, status: int = 0, message: Optional[str] = None):
+        raise ParserExit(status, message or '')
+
+    def print_help(self, file=None):
+        raise ParserExit(0, self.format_help())
+
+    def _print_message(self, message: str, file=None):
+        raise ParserExit(0, message)
+
+
+class ArgumentSpec:
+    """The arguments of a command, and the parser for them, which is built when first needed"""
+    def __init__(
+            self,
+            prog: str,
+            arguments: Sequence[Tuple[tuple, Dict[str, Any]]],
+            description: Optional[str] = None,
+            fast: bool = True,
+    ):
+        self.prog = prog
+        self.arguments = arguments
+        self.description = description
+        self._parser = None
+        # for the fast path, a list of (dest, nargs, type) for the positional
+        # arguments, and a dict of option strings to (dest, value) for the flags
+        self._positionals = None
+        self._flags = None
+        self._defaults = None
+        if fast:
+            self._compile_fast_path()
+
+    @property
+    def parser(self) -> ArgumentParser:
+        """The argparse parser for the arguments, built the first time it's needed"""
+        if self._parser is None:
+            parser = ArgumentParser(prog=self.prog, description=self.description)
+            for args, kwargs in self.arguments:
+                parser.add_argument(*args, **kwargs)
+            self._parser = parser
+        return self._parser
+
+    def format_help(self) -> str:
+        """The help for the command"""
+        return self.parser.format_help()
+
+    def parse(self, args: Sequence[str]) -> argparse.Namespace:
+        """Parse arguments into a namespace
+
+        Raises ``ParserExit`` if the arguments are invalid or help was requested.
+        """
+        if self._flags is not None:
+            namespace = self._parse_fast(args)
+            if namespace is not None:
+                return namespace
+        return self.parser.parse_args(list(args))
+
+    def _compile_fast_path(self) -> None:
+        """Prepare to parse the arguments without argparse, if they are simple enough"""
+        positionals = []
+        flags = {}
+        defaults = {}
+        for args, kwargs in self.arguments:
+            if not args:
+                return
+            if not args[0].startswith('-'):
+                nargs = kwargs.get('nargs')
+                if (len(args) != 1 or set(kwargs) - _SIMPLE_POSITIONAL
+                        or nargs not in (None, '?', '*')
+                        or (positionals and positionals[-1][1] is not None)
+                        or ('type' in kwargs and isinstance(kwargs.get('default'), str))):
+                    return
+                positionals.append((args[0], nargs, kwargs.get('type')))
+                if nargs in ('?', '*'):
+                    defaults[args[0]] = kwargs.get('default')
+            else:
+                action = kwargs.get('action')
+                if set(kwargs) - _SIMPLE_FLAG or action not in ('store_true', 'store_false'):
+                    return
+                dest = kwargs.get('dest') or _option_dest(args)
+                for option in args:
+                    flags[option] = (dest, action == 'store_true')
+                defaults[dest] = kwargs.get('default', action == 'store_false')
+        self._positionals = positionals
+        self._flags = flags
+        self._defaults = defaults
+
+    def _parse_fast(self, args: Sequence[str]) -> Optional[argparse.Namespace]:
+        """Parse simple arguments, or return None to let argparse do it"""
+        values = dict(self._defaults)
+        positional = []
+        options_ended = False
+        for arg in args:
+            if not options_ended and arg.startswith('-') and len(arg) > 1:
+                if arg == '--':
+                    options_ended = True
+                    continue
+                if arg not in self._flags:
+                    # help, an unknown option, or a negative number
+                    return None
+                dest, value = self._flags[arg]
+                values[dest] = value
+            else:
+                positional.append(arg)
+
+        for dest, nargs, typ in self._positionals:
+            if nargs is None:
+                if not positional:
+                    return None
+                value = positional.pop(0)
+            elif nargs == '?':
+                if not positional:
+                    continue
+                value = positional.pop(0)
+            else:
+                value, positional = positional, []
+                if typ:
+                    try:
+                        value = [typ(item) for item in value]
+                    except (TypeError, ValueError):
+                        return None
+                if value or values[dest] is None:
+                    # like argparse, a new empty list unless there's a default
+                    values[dest] = value
+                continue
+            if typ:
+                try:
+                    value = typ(value)
+                except (TypeError, ValueError):
+                    return None
+            values[dest] = value
+        if positional:
+            return None
+        return argparse.Namespace(**values)
+
+
+def _option_dest(options: Sequence[str]) -> str:
+    """Find the dest argparse would use for an option"""
+    for option in options:
+        if option.startswith('--'):
+            return option[2:].replace('-', '_')
+    return options[0].lstrip('-').replace('-', '_')
+
+
+def with_arguments(*arguments, description: Optional[str] = None, fast: bool = True) -> Callable:
+    """Decorator which parses the arguments of a command
+
+    Pass an ``argument()`` for each argument of the command. The description in
+    the help defaults to the docstring of the command. Set fast to False to
+    always parse the arguments with argparse.
+    """
+    def decorator(func: Callable) -> Callable:
+        name = func.__name__
+        prog = name[3:] if name.startswith('do_') else name
+        spec = ArgumentSpec(prog, arguments, description or func.__doc__, fast)
+
+        @functools.wraps(func)
+        def command(self, statement):
+            try:
+                args = spec.parse(statement.arglist)
+            except ParserExit as err:
+                if err.status:
+                    self.werr(err.message)
+                else:
+                    self.wout(err.message)
+                return Result(exit_code=err.status)
+            return func(self, statement, args)
+
+        command.cmdsh_arguments = spec
+        return command
+    return decorator
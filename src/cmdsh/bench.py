@@ -0,0 +1,326 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A synthetic load generator for shells
+
+Run a number of shells concurrently, each executing a random mix of statements,
+and report the throughput, latency of each command, and memory used per shell:
+
+    $ python -m cmdsh.bench --shells 8 --mode processes --statements 10000
+    $ cmdsh-bench --factory myapp.shell:MyShell -s 'status@9' -s 'deploy --dry-run@1'
+
+Shells can run on threads, in separate processes, or as interleaved asyncio
+sessions like the ones ``cmdsh.server`` runs. Statements are fed to each shell
+by calling ``Shell.do()``, or with ``--feed queue`` by putting them all in an
+``InputQueue`` and running the command loop.
+
+The factory is imported from a ``package.module:Name`` spec, and called with no
+arguments to create each shell. It defaults to ``BenchShell``, which has a few
+trivial commands.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import sys
+import threading
+import time
+
+from typing import List, Optional, Tuple
+
+from .models import Result
+from .modules.memstats import rss
+from .queues import InputQueue
+from .replay import ReplayReport
+from .shell import Shell
+from .utils import import_object
+
+# the result of running one shell: (statements, errors, latencies by command, bytes of memory)
+ShellResult = Tuple[int, int, dict, int]
+
+DEFAULT_MIX = ('noop@8', 'echo hello world@2')
+
+
+class BenchShell(Shell):
+    """A shell with trivial commands, to measure the overhead of the shell itself"""
+    def do_noop(self, _statement):
+        """Do nothing"""
+        return Result()
+
+    def do_echo(self, statement):
+        """Write the arguments"""
+        self.wout(' '.join(statement.arglist) + '\n')
+        return Result()
+
+
+def parse_mix(specs: List[str]) -> List[str]:
+    """Turn 'statement@weight' specs into a list with each statement repeated weight times"""
+    mix = []
+    for spec in specs:
+        statement, _, weight = spec.rpartition('@')
+        if not statement or not weight.isdigit():
+            statement, weight = spec, '1'
+        mix.extend([statement] * int(weight))
+    return mix
+
+
+def _discard(_data: str) -> None:
+    """Throw away output"""
+
+
+def _make_shell(factory_spec: str):
+    """Create a quiet shell from a factory spec"""
+    shell = import_object(factory_spec)()
+    shell.wout = _discard
+    shell.werr = _discard
+    return shell
+
+
+def _latencies(shell) -> dict:
+    """Collect the duration of each statement in the history of a shell, by command"""
+    latencies = {}
+    for record in shell.history:
+        latencies.setdefault(record.statement.command, []).append(record.duration)
+    return latencies
+
+
+def _run_shell(shell, statements: List[str], feed: str) -> Tuple[int, int]:
+    """Feed statements to a shell, returning the number executed and the number of errors"""
+    if feed == 'queue':
+        shell.input_queue = InputQueue(wait=True)
+        shell.input_queue.extend(statements)
+        shell.input_queue.close()
+        shell.loop()
+        return len(statements), len(statements) - len(shell.history)
+    errors = 0
+    for line in statements:
+        try:
+            shell.do(line)
+        except Exception:  # pylint: disable=broad-except
+            errors += 1
+    return len(statements), errors
+
+
+def _process_worker(factory_spec: str, statements: List[str], feed: str, start) -> ShellResult:
+    """Run a shell in a separate process"""
+    before = rss()
+    shell = _make_shell(factory_spec)
+    start.wait()
+    count, errors = _run_shell(shell, statements, feed)
+    return count, errors, _latencies(shell), rss() - before
+
+
+class Bench:
+    """Run statements against a number of shells concurrently
+
+    factory
+        a ``package.module:Name`` spec for a callable which creates a shell
+
+    mix
+        a list of statements, from which each shell picks at random
+
+    shells
+        the number of shells to run concurrently
+
+    statements
+        the number of statements each shell executes
+
+    mode
+        ``threads``, ``processes``, or ``asyncio``
+
+    feed
+        ``do`` to call ``Shell.do()`` for each statement, or ``queue`` to run the
+        command loop on an ``InputQueue``
+    """
+    # pylint: disable=too-few-public-methods, too-many-arguments
+    def __init__(
+            self,
+            factory: str = 'cmdsh.bench:BenchShell',
+            mix: Optional[List[str]] = None,
+            shells: int = 4,
+            statements: int = 1000,
+            mode: str = 'threads',
+            feed: str = 'do',
+            seed: Optional[int] = None,
+    ):
+        if mode not in ('threads', 'processes', 'asyncio'):
+            raise ValueError('unknown mode: {}'.format(mode))
+        if feed not in ('do', 'queue'):
+            raise ValueError('unknown feed: {}'.format(feed))
+        if mode == 'asyncio' and feed == 'queue':
+            raise ValueError('asyncio sessions can only be fed with do')
+        self.factory = factory
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.shells = shells
+        self.statements = statements
+        self.mode = mode
+        self.feed = feed
+        self._random = random.Random(seed)
+
+    def run(self) -> Tuple[ReplayReport, int]:
+        """Run the benchmark, returning a report and the average bytes of memory per shell"""
+        workloads = [
+            [self._random.choice(self.mix) for _ in range(self.statements)]
+            for _ in range(self.shells)
+        ]
+        start = time.perf_counter()
+        if self.mode == 'processes':
+            results, start = self._run_processes(workloads)
+        elif self.mode == 'asyncio':
+            results, start = self._run_asyncio(workloads)
+        else:
+            results, start = self._run_threads(workloads)
+        elapsed = time.perf_counter() - start
+
+        report = ReplayReport(elapsed=elapsed)
+        memory = 0
+        for count, errors, latencies, used in results:
+            report.statements += count
+            report.errors += errors
+            memory += used
+            for command, values in latencies.items():
+                report.latencies.setdefault(command, []).extend(values)
+        for values in report.latencies.values():
+            values.sort()
+        return report, memory // self.shells
+
+    def _run_threads(self, workloads) -> Tuple[List[ShellResult], float]:
+        """Run each shell on it's own thread"""
+        before = rss()
+        shells = [_make_shell(self.factory) for _ in workloads]
+        counts = [None] * len(shells)
+
+        def worker(num):
+            counts[num] = _run_shell(shells[num], workloads[num], self.feed)
+
+        threads = [threading.Thread(target=worker, args=(num,)) for num in range(len(shells))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._shell_results(shells, counts, before), start
+
+    def _run_asyncio(self, workloads) -> Tuple[List[ShellResult], float]:
+        """Run each shell as a session on a single event loop"""
+        before = rss()
+        shells = [_make_shell(self.factory) for _ in workloads]
+
+        async def session(shell, statements):
+            errors = 0
+            for line in statements:
+                try:
+                    shell.do(line)
+                except Exception:  # pylint: disable=broad-except
+                    errors += 1
+                # let the other sessions run, like a server waiting for input
+                await asyncio.sleep(0)
+            return len(statements), errors
+
+        async def run_all():
+            return await asyncio.gather(
+                *[session(shell, statements) for shell, statements in zip(shells, workloads)]
+            )
+
+        loop = asyncio.new_event_loop()
+        try:
+            start = time.perf_counter()
+            counts = loop.run_until_complete(run_all())
+        finally:
+            loop.close()
+        return self._shell_results(shells, counts, before), start
+
+    def _run_processes(self, workloads) -> Tuple[List[ShellResult], float]:
+        """Run each shell in it's own process"""
+        manager = multiprocessing.Manager()
+        ready = manager.Event()
+        with multiprocessing.Pool(len(workloads)) as pool:
+            pending = [
+                pool.apply_async(_process_worker, (self.factory, statements, self.feed, ready))
+                for statements in workloads
+            ]
+            # give the processes a moment to create their shells before the clock starts
+            time.sleep(0.1)
+            start = time.perf_counter()
+            ready.set()
+            results = [result.get() for result in pending]
+        manager.shutdown()
+        return results, start
+
+    @staticmethod
+    def _shell_results(shells, counts, before) -> List[ShellResult]:
+        """Collect the results of shells which shared a process, splitting the memory used evenly"""
+        used = (rss() - before) // len(shells)
+        return [
+            (count, errors, _latencies(shell), used)
+            for shell, (count, errors) in zip(shells, counts)
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(
+        prog='cmdsh-bench',
+        description='Run statements against many shells and report throughput and latency',
+    )
+    parser.add_argument(
+        '-f', '--factory', default='cmdsh.bench:BenchShell',
+        help='package.module:Name of a callable which creates a shell',
+    )
+    parser.add_argument(
+        '-s', '--statement', action='append', dest='mix', metavar='STATEMENT[@WEIGHT]',
+        help='a statement to execute, with an optional relative weight; may be repeated',
+    )
+    parser.add_argument('-n', '--shells', type=int, default=4, help='number of shells')
+    parser.add_argument(
+        '-c', '--statements', type=int, default=1000, help='statements per shell',
+    )
+    parser.add_argument(
+        '-m', '--mode', choices=('threads', 'processes', 'asyncio'), default='threads',
+    )
+    parser.add_argument('--feed', choices=('do', 'queue'), default='do')
+    parser.add_argument('--seed', type=int, help='seed for choosing statements')
+    args = parser.parse_args(argv)
+
+    try:
+        bench = Bench(
+            factory=args.factory,
+            mix=parse_mix(args.mix) if args.mix else None,
+            shells=args.shells,
+            statements=args.statements,
+            mode=args.mode,
+            feed=args.feed,
+            seed=args.seed,
+        )
+    except ValueError as err:
+        parser.error(str(err))
+    report, memory = bench.run()
+    print('{} shells on {}, fed with {}'.format(args.shells, args.mode, args.feed))
+    print(report.format())
+    print('memory: {:.1f} KiB per shell'.format(memory / 1024))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Cancel commands which take too long, or which the user interrupts
+
+Every command runs with a ``CancellationToken``, available as
+``shell.cancel_token`` while the command is running. A long running command
+should periodically call ``self.cancel_token.check()``, which raises
+``CommandCancelled`` (or ``CommandTimeout``) once the command has been
+cancelled, or use ``self.cancel_token.wait()`` instead of ``time.sleep()``.
+
+Set ``shell.timeout`` to limit how many seconds every command may run, or
+decorate a command to give it it's own limit:
+
+    class App(cmdsh.Shell):
+        @cmdsh.timeout(5)
+        def do_slow(self, statement: cmdsh.Statement) -> cmdsh.Result:
+            ...
+
+When the shell runs commands in the main thread on a platform with
+``signal.setitimer()``, a command which runs too long is interrupted by a
+``CommandTimeout`` exception even if it never checks it's token. Otherwise
+the token is cancelled and the command has to notice.
+
+A command which times out returns a result with an exit code of ``EXIT_TIMEOUT``,
+and a command interrupted with Ctrl-C returns ``EXIT_INTERRUPTED``. In either case
+the command loop keeps running.
+"""
+
+import signal
+import threading
+import time
+
+from typing import Callable, Optional
+
+# the same exit codes used by the timeout utility and posix shells
+EXIT_TIMEOUT = 124
+EXIT_INTERRUPTED = 130
+
+
+class CommandCancelled(Exception):
+    """Exception raised in a command which has been cancelled"""
+
+
+class CommandTimeout(CommandCancelled):
+    """Exception raised in a command which ran longer than it's timeout"""
+
+
+class CancellationToken:
+    """Used to tell a running command it should stop
+
+    Every command gets a token, but most are never cancelled or waited on, so
+    the event behind the token isn't created until it's needed.
+    """
+    _create_lock = threading.Lock()
+
+    def __init__(self):
+        self._event = None
+        self.reason = None
+
+    def _get_event(self) -> threading.Event:
+        """Return the event which is set when the command is cancelled, creating it if needed"""
+        event = self._event
+        if event is None:
+            with self._create_lock:
+                if self._event is None:
+                    self._event = threading.Event()
+                event = self._event
+        return event
+
+    @property
+    def cancelled(self) -> bool:
+        """True if the command has been cancelled"""
+        return self._event is not None and self._event.is_set()
+
+    def cancel(self, reason: str = 'cancelled') -> None:
+        """Cancel the command. This is safe to call from any thread."""
+        self.reason = reason
+        self._get_event().set()
+
+    def check(self) -> None:
+        """Raise an exception if the command has been cancelled"""
+        if self.cancelled:
+            if self.reason == 'timeout':
+                raise CommandTimeout()
+            raise CommandCancelled()
+
+    def wait(self, seconds: Optional[float] = None) -> None:
+        """Sleep for up to seconds, raising an exception if cancelled in the meantime"""
+        self._get_event().wait(seconds)
+        self.check()
+
+
+def timeout(seconds: float) -> Callable:
+    """Decorator which sets the number of seconds a command may run"""
+    def decorator(func: Callable) -> Callable:
+        func.cmdsh_timeout = seconds
+        return func
+    return decorator
+
+
+class Deadline:
+    """A context manager which cancels a token when time runs out"""
+    def __init__(self, seconds: Optional[float], token: CancellationToken):
+        self.seconds = seconds
+        self.token = token
+        self._timer = None
+        self._previous_handler = None
+        # seconds left on an outer deadline, and when we took it over
+        self._previous_delay = 0.0
+        self._started = 0.0
+
+    def __enter__(self):
+        if not self.seconds:
+            return self
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGALRM, self._alarm)
+            self._started = time.monotonic()
+            self._previous_delay = signal.setitimer(signal.ITIMER_REAL, self.seconds)[0]
+            if self._previous_delay and self._previous_delay < self.seconds:
+                # don't outlive the outer deadline
+                signal.setitimer(signal.ITIMER_REAL, self._previous_delay)
+        else:
+            self._timer = threading.Timer(self.seconds, self.token.cancel, args=('timeout',))
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, *args):
+        if self._previous_handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            if self._previous_delay:
+                # hand the timer back to the outer deadline, which fires right away
+                # if it ran out while we were using the timer
+                remaining = self._previous_delay - (time.monotonic() - self._started)
+                signal.setitimer(signal.ITIMER_REAL, max(remaining, 1e-6))
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _alarm(self, _signum, _frame):
+        """signal handler for SIGALRM"""
+        self.token.cancel('timeout')
+        raise CommandTimeout()
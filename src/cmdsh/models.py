@@ -23,11 +23,50 @@
 #
 """Classes with essentially no functionality, they are data containers."""
 
-from typing import List
+import itertools
+
+from collections.abc import Sequence
+from typing import List, Optional, Tuple, Union
 
 import attr
 
 
+class ArgumentView(Sequence):
+    """A read-only view of the arguments after the command, without copying them
+
+    ``Statement.arglist`` returns one of these when ``argv`` is a tuple.
+    """
+    __slots__ = ('_argv',)
+
+    def __init__(self, argv: Tuple[str, ...]):
+        self._argv = argv
+
+    def __len__(self) -> int:
+        return max(0, len(self._argv) - 1)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._argv[1:][index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('argument index out of range')
+        return self._argv[index + 1]
+
+    def __iter__(self):
+        return itertools.islice(self._argv, 1, None)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, tuple, ArgumentView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'ArgumentView({!r})'.format(list(self))
+
+
 @attr.s
 class Statement:
     """The result of parsing user input
@@ -40,27 +79,44 @@ class Statement:
 
     argv - this is a list of arguments in the style of ``sys.argv``. The first element of
            the list is the command. Subsequent elements of the list contain any additional
-           arguments, with quotes removed, just like bash would. This is very useful if
-           you are going to use ``argparse.parse_args()``:
+           arguments, with quotes removed, just like bash would. Parsers created with
+           ``intern=True`` make this a tuple instead, which may be shared by many
+           statements. Rather than parsing ``argv`` with ``argparse`` in every command,
+           declare the arguments once with the ``cmdsh.with_arguments`` decorator,
+           which builds the parser the first time the command is used:
            ```
-           def do_mycommand(stmt):
-               mycommand_argparser.parse_args(stmt.argv)
+           @cmdsh.with_arguments(cmdsh.argument('name'))
+           def do_mycommand(self, stmt, args):
                ...
             ```
 
     command - the name of the command, same as ``statement.argv[0]``
 
-    arglist - the arguments to the command, same as ``statement.argv[1:]``
+    arglist - the arguments to the command, same as ``statement.argv[1:]``. If ``argv``
+              is a tuple, this is an ``ArgumentView`` which doesn't copy them
 
     raw - if you want full access to exactly what the user typed at the input prompt you
           can get it, but you'll have to parse it on your own
+
+    operator - when the user enters a compound statement like ``one && two``, each command
+               gets it's own statement. This is the control operator (``;``, ``&&``, ``||``,
+               or ``|``) which preceeded this statement, or an empty string for the first one
+
+    input - for a statement following ``|``, the ``payload`` of the result of the previous
+            statement. The payload is passed as is, without being copied or rendered as text
     """
 
     # string containing exactly what was input by the user
     raw = attr.ib(default='', validator=attr.validators.instance_of(str))
 
-    # the list of arguments in the user input
-    argv = attr.ib(default=[], validator=attr.validators.instance_of(list))
+    # the list (or tuple) of arguments in the user input
+    argv = attr.ib(default=[], validator=attr.validators.instance_of((list, tuple)))
+
+    # the control operator joining this statement to the previous one
+    operator = attr.ib(default='', validator=attr.validators.instance_of(str))
+
+    # the payload piped to this statement
+    input = attr.ib(default=None)
 
     @property
     def command(self) -> str:
@@ -71,21 +127,94 @@ class Statement:
         return cmd
 
     @property
-    def arglist(self) -> List:
+    def arglist(self) -> Union[List, ArgumentView]:
         """The list of arguments to the command."""
+        if isinstance(self.argv, tuple):
+            return ArgumentView(self.argv)
         return self.argv[1:]
 
 
+class BytesStatement(Statement):
+    """The result of parsing bytes input
+
+    ``Shell.do()`` creates one of these when it's passed ``bytes``, ``bytearray``, or a
+    ``memoryview`` and the parser can parse bytes. Instead of copying each argument
+    out of the input, the parser records where each one is in ``spans``, a list of
+    (start, end) offsets into ``raw``.
+
+    views - a list of zero-copy ``memoryview`` slices of ``raw``, one for each argument
+
+    argv - the arguments decoded to strings, which only happens the first time you
+           access this attribute. ``command`` only decodes the first argument.
+    """
+    def __init__(self, raw=b'', spans=None, operator='', encoding='utf-8'):
+        # pylint: disable=super-init-not-called
+        self.raw = raw
+        self.spans = spans or []
+        self.operator = operator
+        self.input = None
+        self.encoding = encoding
+        self._argv = None
+
+    def copy(self) -> 'BytesStatement':
+        """Return a copy of this statement which has it's own copy of raw as ``bytes``"""
+        new = BytesStatement(bytes(self.raw), list(self.spans), self.operator, self.encoding)
+        new.input = self.input
+        new._argv = self._argv
+        return new
+
+    def _decode(self, span: Tuple[int, int]) -> str:
+        """Decode a single argument"""
+        start, end = span
+        return str(memoryview(self.raw)[start:end], self.encoding, 'surrogateescape')
+
+    @property
+    def views(self) -> List[memoryview]:
+        """The arguments as memoryview slices of the raw input"""
+        view = memoryview(self.raw)
+        return [view[start:end] for start, end in self.spans]
+
+    @property
+    def argv(self) -> List[str]:
+        """The arguments decoded to strings"""
+        if self._argv is None:
+            self._argv = [self._decode(span) for span in self.spans]
+        return self._argv
+
+    @argv.setter
+    def argv(self, value: List[str]) -> None:
+        self._argv = value
+
+    @property
+    def command(self) -> str:
+        """The name of the command."""
+        if self._argv is None:
+            if self.spans:
+                return self._decode(self.spans[0])
+            return ''
+        return super().command
+
+
 @attr.s
 class Result:
     """The result of running a command
 
     The default result has an exit_code of 0 (indicating no errors or success), and stop
     is False (meaning the cmdloop() continues)
+
+    The shell creates a result with an exit_code of ``cancellation.EXIT_TIMEOUT`` for a
+    command which timed out, and ``cancellation.EXIT_INTERRUPTED`` for a command which
+    was interrupted.
+
+    A command may return data in ``payload``, like a list of dicts or a buffer, instead
+    of writing it as text. Hooks and programs which call ``Shell.do()`` get the data as
+    is. If the next statement follows ``|``, the payload becomes it's ``input``.
+    Otherwise the command loop renders it as text with ``Shell.render_payload()``.
     """
     # pylint: disable=too-few-public-methods
     exit_code = attr.ib(default=0, validator=attr.validators.instance_of(int))
     stop = attr.ib(default=False, validator=attr.validators.instance_of(bool))
+    payload = attr.ib(default=None)
 
 
 @attr.s
@@ -93,9 +222,33 @@ class Record:
     """
     A record of a statement and it's result
 
+    For a compound statement, ``statement`` contains the entire line, and ``statements``
+    contains each of the statements which were executed. ``result`` is the result of
+    the last statement executed, without it's payload, and the ``input`` of each
+    statement is cleared, so the history doesn't keep payloads alive.
+
+    A ``BytesStatement`` parsed from a ``bytearray`` or ``memoryview`` is copied,
+    so the record has it's own ``bytes``, even if the caller reuses it's buffer.
+
+    ``started`` and ``finished`` are the times, in seconds since the epoch, when
+    execution of the statements started and finished.
+
+    ``memory`` is filled in by the ``cmdsh.modules.MemoryStats`` module, if it's
+    loaded.
     """
     statement = attr.ib(default=None)
     result = attr.ib(default=None)
+    statements = attr.ib(default=attr.Factory(list))
+    memory = attr.ib(default=None)
+    started = attr.ib(default=None)
+    finished = attr.ib(default=None)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """The number of seconds it took to execute the statements"""
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
 
 
 class CommandNotFound(Exception):
@@ -103,3 +256,7 @@ class CommandNotFound(Exception):
     def __init__(self, statement: Statement):
         super().__init__()
         self.statement = statement
+
+
+class ModuleDependencyError(Exception):
+    """Exception when modules can't be loaded because of their requirements or attributes"""
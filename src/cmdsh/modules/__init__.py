@@ -26,3 +26,8 @@ The modules package includes
 """
 
 from .modules import DefaultResult, ExitCommand, History  # noqa F401
+from .alias import Alias  # noqa F401
+from .memstats import MemoryStats  # noqa F401
+from .help import Help  # noqa F401
+from .autopager import AutoPager  # noqa F401
+from .rewrite import Rewrite  # noqa F401
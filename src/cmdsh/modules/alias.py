@@ -0,0 +1,220 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A module which expands aliases and macros before input is parsed"""
+# pylint: disable=no-self-use
+
+import re
+import shlex
+
+from ..models import Statement, Result
+from ..parsers import split_list
+from ..utils import rebind_method
+
+
+class AliasTemplate:
+    """An alias expansion, compiled once into literal text and argument references
+
+    The expansion may refer to the arguments given after the alias using ``$1``
+    through ``$9`` (or ``${10}`` and beyond), and to all of the arguments using
+    ``$@`` or ``$*``. Use ``$$`` for a literal dollar sign. If the expansion
+    refers to any arguments, it's a macro, and the arguments are consumed by the
+    expansion. Otherwise the arguments are appended to the expansion unchanged.
+    """
+    # pylint: disable=too-few-public-methods
+    _PARAMETER = re.compile(r'\$(?:(\d)|\{(\d+)\}|([@*$]))')
+
+    def __init__(self, expansion: str):
+        self.expansion = expansion
+        # a list of literal strings, integer argument positions, and '@' for
+        # all of the arguments
+        self.pieces = []
+        self.macro = False
+        pos = 0
+        for match in self._PARAMETER.finditer(expansion):
+            self.pieces.append(expansion[pos:match.start()])
+            if match.group(3) == '$':
+                self.pieces.append('$')
+            elif match.group(3):
+                self.pieces.append(None)
+                self.macro = True
+            else:
+                self.pieces.append(int(match.group(1) or match.group(2)))
+                self.macro = True
+            pos = match.end()
+        self.pieces.append(expansion[pos:])
+
+    def expand(self, rest: str) -> str:
+        """Expand this alias, given the text which followed it"""
+        if not self.macro:
+            return ''.join(self.pieces) + rest
+        args = shlex.split(rest)
+        expanded = []
+        for piece in self.pieces:
+            if isinstance(piece, str):
+                expanded.append(piece)
+            elif piece is None:
+                expanded.append(' '.join(shlex.quote(arg) for arg in args))
+            elif 0 < piece <= len(args):
+                expanded.append(shlex.quote(args[piece - 1]))
+        return ''.join(expanded)
+
+
+class Alias:
+    """Add alias and unalias commands, and expand aliases before parsing
+
+    An alias is only expanded when it's the first word of a statement. If the
+    shell parses compound statements, the first word of each statement is
+    checked. When the expansion of an alias begins with another alias, that
+    one is expanded too, but an alias is never expanded inside itself.
+
+    Expanded input is cached, so repeating the same input doesn't expand it
+    again. The cache is emptied whenever an alias is defined or removed.
+    """
+    provides = (
+        'do_alias', 'do_unalias',
+        '_alias_aliases', '_alias_cache', '_alias_cache_size', '_alias_compound',
+        '_alias_expand', '_alias_expand_statement', '_alias_preparse_hook',
+    )
+    _FIRST_WORD = re.compile(r'(\s*)(\S+)(.*)', re.DOTALL)
+
+    def __init__(self, aliases: dict = None, cache_size: int = 1000):
+        self._aliases = aliases or {}
+        self._cache_size = cache_size
+
+    def load(self, shell):
+        """Load and initialize this module"""
+        shell._alias_aliases = {
+            name: AliasTemplate(expansion) for name, expansion in self._aliases.items()
+        }
+        shell._alias_cache = {}
+        shell._alias_cache_size = self._cache_size
+        shell._alias_compound = hasattr(shell._personality.parser, 'parse_list')
+
+        rebind_method(self.do_alias, shell)
+        rebind_method(self.do_unalias, shell)
+        rebind_method(self._alias_expand, shell)
+        rebind_method(self._alias_expand_statement, shell)
+        rebind_method(self._alias_preparse_hook, shell)
+        shell.register_preparse_hook(shell._alias_preparse_hook)
+
+    def snapshot(self, shell):
+        """Return the alias definitions to be saved in a snapshot"""
+        return {name: template.expansion for name, template in shell._alias_aliases.items()}
+
+    def restore(self, shell, state):
+        """Restore the alias definitions from a snapshot"""
+        shell._alias_aliases = {name: AliasTemplate(expansion) for name, expansion in state.items()}
+        shell._alias_cache.clear()
+
+    #
+    # rebound methods
+    #
+    # these methods end up bound to the shell, not to the module
+    # that means `self` references the shell object, not the module
+    # object
+    def do_alias(self, statement: Statement) -> Result:
+        """Define or show aliases
+
+        alias                  show all aliases
+        alias name             show the alias for name
+        alias name=expansion   define an alias
+        """
+        definition = statement.raw.strip().split(None, 1)[1:]
+        if not definition:
+            for name in sorted(self._alias_aliases):
+                self.wout('alias {}={}\n'.format(
+                    name,
+                    shlex.quote(self._alias_aliases[name].expansion),
+                ))
+            return Result()
+
+        name, equals, expansion = definition[0].partition('=')
+        name = name.strip()
+        if not equals:
+            if name not in self._alias_aliases:
+                self.werr('alias: {}: not found\n'.format(name))
+                return Result(exit_code=1)
+            self.wout('alias {}={}\n'.format(
+                name,
+                shlex.quote(self._alias_aliases[name].expansion),
+            ))
+            return Result()
+
+        expansion = expansion.strip()
+        if len(expansion) > 1 and expansion[0] == expansion[-1] and expansion[0] in '\'"':
+            expansion = expansion[1:-1]
+        self._alias_aliases[name] = AliasTemplate(expansion)
+        self._alias_cache.clear()
+        return Result()
+
+    def do_unalias(self, statement: Statement) -> Result:
+        """Remove aliases"""
+        exit_code = 0
+        for name in statement.arglist:
+            try:
+                del self._alias_aliases[name]
+            except KeyError:
+                self.werr('unalias: {}: not found\n'.format(name))
+                exit_code = 1
+        self._alias_cache.clear()
+        return Result(exit_code=exit_code)
+
+    def _alias_expand_statement(self, text: str) -> str:
+        """Expand the alias at the beginning of a single statement"""
+        seen = set()
+        while True:
+            match = Alias._FIRST_WORD.match(text)
+            if not match:
+                return text
+            leading, name, rest = match.groups()
+            template = self._alias_aliases.get(name)
+            if template is None or name in seen:
+                return text
+            seen.add(name)
+            text = leading + template.expand(rest)
+
+    def _alias_expand(self, line: str) -> str:
+        """Expand all the aliases in a line of input"""
+        if not self._alias_compound:
+            return self._alias_expand_statement(line)
+        parts = split_list(line)
+        if len(parts) == 1:
+            return self._alias_expand_statement(line)
+        return ''.join(
+            operator + self._alias_expand_statement(text) for operator, text in parts
+        )
+
+    def _alias_preparse_hook(self, line: str) -> str:
+        """preparsing hook to expand aliases"""
+        if not self._alias_aliases:
+            return line
+        try:
+            return self._alias_cache[line]
+        except KeyError:
+            pass
+        expanded = self._alias_expand(line)
+        if len(self._alias_cache) >= self._alias_cache_size:
+            self._alias_cache.clear()
+        self._alias_cache[line] = expanded
+        return expanded
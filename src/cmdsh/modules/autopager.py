@@ -0,0 +1,158 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A module which pages long output in an interactive shell"""
+# pylint: disable=no-self-use
+
+import shutil
+import sys
+
+from typing import Iterable, Optional
+
+from ..models import Statement, Result
+from ..pager import Pager
+from ..utils import rebind_method
+
+
+class _Capture:
+    """Collect the output of a command, spooling it to a pager once it's longer than a page"""
+    # pylint: disable=too-few-public-methods
+    def __init__(self, shell, height: Optional[int]):
+        self.shell = shell
+        self.height = height
+        self.chunks = []
+        self.lines = 0
+        self.pager = None
+        # capture output by hiding the wout method of the shell
+        self.original = shell.wout
+        shell.wout = self.write
+
+    def write(self, data: str) -> None:
+        """Capture output written with wout"""
+        if self.pager:
+            self.pager.feed(data)
+            return
+        self.chunks.append(data)
+        self.lines += data.count('\n')
+        if self.lines > (self.height or self._terminal_height()):
+            self.pager = Pager(height=self.height, write=self.original)
+            for chunk in self.chunks:
+                self.pager.feed(chunk)
+            self.chunks = []
+
+    def _terminal_height(self) -> int:
+        """The height of the terminal, less a line for the prompt, computed once"""
+        self.height = max(shutil.get_terminal_size().lines - 1, 1)
+        return self.height
+
+    def finish(self) -> None:
+        """Stop capturing output, and show what we captured"""
+        del self.shell.wout
+        if self.pager:
+            self.pager.run()
+        elif self.chunks:
+            self.original(''.join(self.chunks))
+
+
+class AutoPager:
+    """Page the output of commands which is longer than the terminal
+
+    When stdin and stdout are a tty, the output each command writes with ``wout``
+    is captured. Output which fits in the terminal is written when the command
+    finishes, and longer output is displayed with a ``cmdsh.pager.Pager``.
+    Otherwise output is written as usual.
+
+    Also adds a ``page()`` method to the shell, which a command can use to page
+    output it generates lazily.
+
+    height
+        the number of lines on a page, which defaults to the height of the terminal
+    """
+    provides = ('_autopager_height', '_autopager_capture', '_autopager_interactive',
+                'page', '_autopager_postparse_hook', '_autopager_postexecute_hook')
+
+    def __init__(self, height: Optional[int] = None):
+        self.height = height
+
+    def load(self, shell):
+        """Load and initialize this module"""
+        shell._autopager_height = self.height
+        shell._autopager_capture = None
+
+        rebind_method(self.page, shell)
+        rebind_method(self._autopager_interactive, shell)
+        rebind_method(self._autopager_postparse_hook, shell)
+        rebind_method(self._autopager_postexecute_hook, shell)
+        shell.register_postparse_hook(shell._autopager_postparse_hook)
+        shell.register_postexecute_hook(shell._autopager_postexecute_hook)
+
+    #
+    # rebound methods
+    #
+    # these methods end up bound to the shell, not to the module
+    # that means `self` references the shell object, not the module
+    # object
+    def page(self, source: Iterable[str]) -> None:
+        """Page text from an iterable of strings, like a generator, if the shell is interactive
+
+        Only as much of source is read as is needed to display the current page.
+        If the shell isn't interactive, everything is written with ``wout``.
+        """
+        capture = self._autopager_capture
+        if capture:
+            # write what the command has output so far, and page from here
+            capture.finish()
+            self._autopager_capture = None
+        if self._autopager_interactive():
+            Pager(source, height=self._autopager_height, write=self.wout).run()
+        else:
+            for text in source:
+                self.wout(text)
+
+    def _autopager_interactive(self) -> bool:
+        """True if output should be paged"""
+        # a shell with it's own wout, like one served by cmdsh.server, isn't writing
+        # to our terminal
+        return 'wout' not in self.__dict__ and sys.stdin.isatty() and sys.stdout.isatty()
+
+    def _autopager_postparse_hook(self, statement: Statement) -> Statement:
+        """Start capturing output"""
+        if self._autopager_capture:
+            # the last command raised an exception before we could finish
+            self._autopager_capture.finish()
+            self._autopager_capture = None
+        if self._autopager_interactive():
+            self._autopager_capture = _Capture(self, self._autopager_height)
+        return statement
+
+    def _autopager_postexecute_hook(
+            self,
+            _statement: Statement,
+            result: Result,
+    ) -> Result:
+        """Write or page the output we captured"""
+        if self._autopager_capture:
+            capture = self._autopager_capture
+            self._autopager_capture = None
+            capture.finish()
+        return result
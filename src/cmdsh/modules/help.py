@@ -0,0 +1,130 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A module which adds a help command"""
+# pylint: disable=no-self-use
+
+import inspect
+
+from typing import Optional
+
+from ..models import Statement, Result
+from ..utils import rebind_method
+
+
+class Help:
+    """Add a help command which lists commands and shows the help for each one
+
+    The help for a command is the help from it's argument spec, if it was decorated
+    with ``cmdsh.with_arguments``, or it's docstring. Nothing is looked up until
+    the help command is first used, and help which has been rendered is cached
+    until commands are added to or removed from the shell. Listing the commands
+    doesn't load lazy modules, but showing the help for one of their commands does.
+
+    width
+        the width of the command listing
+    """
+    provides = ('_help_width', '_help_generation', '_help_cache', 'do_help',
+                '_help_listing', '_help_command')
+
+    def __init__(self, width: int = 80):
+        self.width = width
+
+    def load(self, shell):
+        """Load and initialize this module"""
+        shell._help_width = self.width
+        # the command generation the cached help was rendered for
+        shell._help_generation = None
+        # command name -> rendered help, and None -> the list of commands
+        shell._help_cache = {}
+
+        rebind_method(self.do_help, shell)
+        rebind_method(self._help_listing, shell)
+        rebind_method(self._help_command, shell)
+
+    #
+    # rebound methods
+    #
+    # these methods end up bound to the shell, not to the module
+    # that means `self` references the shell object, not the module
+    # object
+    def do_help(self, statement: Statement) -> Result:
+        """List the commands, or show the help for a command
+
+        Usage: help [command]
+        """
+        if self._help_generation != self.command_generation:
+            self._help_cache.clear()
+            self._help_generation = self.command_generation
+        if len(statement.arglist) > 1:
+            self.werr('usage: help [command]\n')
+            return Result(exit_code=2)
+        name = statement.arglist[0] if statement.arglist else None
+
+        text = self._help_cache.get(name)
+        if text is None:
+            text = self._help_command(name) if name else self._help_listing()
+            if text is None:
+                self.werr('help: no help for {}\n'.format(name))
+                return Result(exit_code=1)
+            # showing help may have loaded a lazy module
+            if self._help_generation != self.command_generation:
+                self._help_cache.clear()
+                self._help_generation = self.command_generation
+            self._help_cache[name] = text
+        self.wout(text)
+        return Result(exit_code=0)
+
+    def _help_listing(self) -> str:
+        """Render the list of commands with the first line of their help"""
+        names = self.commands()
+        summaries = []
+        for name in names:
+            summary = ''
+            if name not in self._lazy_modules:
+                doc = inspect.getdoc(getattr(self, 'do_' + name))
+                if doc:
+                    summary = doc.splitlines()[0]
+            summaries.append(summary)
+
+        width = max((len(name) for name in names), default=0) + 2
+        lines = ['Commands:']
+        for name, summary in zip(names, summaries):
+            line = '  {:<{}}{}'.format(name, width, summary).rstrip()
+            if len(line) > self._help_width:
+                line = line[:self._help_width - 3] + '...'
+            lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+    def _help_command(self, name: str) -> Optional[str]:
+        """Render the help for a command, or return None if there isn't any"""
+        func = self._command_func(name)
+        if not func:
+            return None
+        spec = getattr(func, 'cmdsh_arguments', None)
+        if spec:
+            return spec.format_help()
+        doc = inspect.getdoc(func)
+        if doc:
+            return doc + '\n'
+        return None
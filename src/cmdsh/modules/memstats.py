@@ -0,0 +1,221 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A module which measures the memory used by each command
+
+By default the resident set size of the process is sampled before and after each
+statement, which is cheap but coarse. With ``tracemalloc=True``, Python's
+``tracemalloc`` module traces every allocation, so the measurements are precise,
+peak memory is measured, and the lines of code which allocated the most memory
+are reported, at the cost of making everything run slower.
+"""
+# pylint: disable=no-self-use
+
+import collections
+import os
+import tracemalloc as _tracemalloc
+
+import attr
+
+from ..models import Statement, Result
+from ..utils import rebind_method
+
+try:
+    import resource
+except ImportError:  # pragma: nocover
+    resource = None
+
+
+@attr.s
+class MemoryUsage:
+    """The memory used by the statements in a ``Record``
+
+    ``allocated`` is the change in the number of bytes of memory in use, which
+    is negative if memory was freed. ``peak`` is the most memory, in bytes, in use
+    at any point above the memory in use when the statement started. ``peak`` is
+    None unless peak memory can be traced.
+    """
+    # pylint: disable=too-few-public-methods
+    allocated = attr.ib(default=0)
+    peak = attr.ib(default=None)
+
+
+def rss() -> int:
+    """Return the resident set size of this process in bytes
+
+    Uses ``/proc/self/statm`` if it exists, otherwise the maximum resident set size
+    from the ``resource`` module, or 0 if neither is available.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # linux reports kilobytes, macOS reports bytes
+        return maxrss if os.uname().sysname == 'Darwin' else maxrss * 1024
+    return 0
+
+
+class MemoryStats:
+    """Measure the memory used by each command and add a memstat command
+
+    tracemalloc
+        trace allocations with the ``tracemalloc`` module instead of sampling the
+        resident set size of the process
+
+    top
+        the number of commands and call sites shown by the memstat command
+    """
+    provides = (
+        '_memstats_tracemalloc', '_memstats_top', '_memstats_start',
+        '_memstats_commands', '_memstats_sites', 'do_memstat',
+        '_memstats_postparse_hook', '_memstats_postexecute_hook',
+    )
+
+    # don't count the memory tracemalloc uses to trace memory
+    _FILTERS = (
+        _tracemalloc.Filter(False, _tracemalloc.__file__),
+        _tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        _tracemalloc.Filter(False, '<unknown>'),
+    )
+
+    def __init__(self, tracemalloc: bool = False, top: int = 10):
+        self.tracemalloc = tracemalloc
+        self.top = top
+
+    def load(self, shell):
+        """Load and initialize this module"""
+        shell._memstats_tracemalloc = self.tracemalloc
+        shell._memstats_top = self.top
+        # the measurements taken when the current statement started
+        shell._memstats_start = None
+        self.clone(shell)
+        if self.tracemalloc and not _tracemalloc.is_tracing():
+            _tracemalloc.start()
+
+        rebind_method(self.do_memstat, shell)
+        rebind_method(self._memstats_postparse_hook, shell)
+        rebind_method(self._memstats_postexecute_hook, shell)
+        shell.register_postparse_hook(shell._memstats_postparse_hook)
+        shell.register_postexecute_hook(shell._memstats_postexecute_hook)
+
+    def clone(self, shell):
+        """Give a cloned shell it's own statistics"""
+        # command name -> [times run, total bytes allocated, highest peak]
+        shell._memstats_commands = {}
+        # 'filename:lineno' -> total bytes allocated
+        shell._memstats_sites = collections.Counter()
+
+    #
+    # rebound methods
+    #
+    # these methods end up bound to the shell, not to the module
+    # that means `self` references the shell object, not the module
+    # object
+    def do_memstat(self, statement: Statement) -> Result:
+        """Show the commands and lines of code which allocated the most memory
+
+        Usage: memstat [clear]
+        """
+        if statement.arglist == ['clear']:
+            self._memstats_commands.clear()
+            self._memstats_sites.clear()
+            return Result(exit_code=0)
+        if statement.arglist:
+            self.werr('usage: memstat [clear]\n')
+            return Result(exit_code=2)
+
+        ranked = sorted(
+            self._memstats_commands.items(),
+            key=lambda item: item[1][1],
+            reverse=True,
+        )
+        lines = ['{:>12} {:>12} {:>6}  command'.format('allocated', 'peak', 'runs')]
+        for command, (runs, allocated, peak) in ranked[:self._memstats_top]:
+            lines.append('{:>12} {:>12} {:>6}  {}'.format(
+                allocated, '-' if peak is None else peak, runs, command,
+            ))
+        if self._memstats_sites:
+            lines.append('')
+            lines.append('{:>12}  call site'.format('allocated'))
+            for site, allocated in self._memstats_sites.most_common(self._memstats_top):
+                lines.append('{:>12}  {}'.format(allocated, site))
+        self.wout('\n'.join(lines) + '\n')
+        return Result(exit_code=0)
+
+    def _memstats_postparse_hook(self, statement: Statement) -> Statement:
+        """Take measurements before a statement is executed"""
+        if self._memstats_tracemalloc and _tracemalloc.is_tracing():
+            reset_peak = getattr(_tracemalloc, 'reset_peak', None)
+            if reset_peak:
+                reset_peak()
+            snapshot = _tracemalloc.take_snapshot().filter_traces(MemoryStats._FILTERS)
+            current, _ = _tracemalloc.get_traced_memory()
+            self._memstats_start = (current, snapshot, bool(reset_peak))
+        else:
+            self._memstats_start = (rss(), None, False)
+        return statement
+
+    def _memstats_postexecute_hook(
+            self,
+            statement: Statement,
+            result: Result,
+    ) -> Result:
+        """Measure the memory used by a statement and add it to the record"""
+        if self._memstats_start is None:
+            return result
+        start, snapshot, peak_traced = self._memstats_start
+        self._memstats_start = None
+
+        peak = None
+        if snapshot is not None and _tracemalloc.is_tracing():
+            current, traced_peak = _tracemalloc.get_traced_memory()
+            after = _tracemalloc.take_snapshot().filter_traces(MemoryStats._FILTERS)
+            for stat in after.compare_to(snapshot, 'lineno'):
+                if stat.size_diff > 0:
+                    frame = stat.traceback[0]
+                    site = '{}:{}'.format(frame.filename, frame.lineno)
+                    self._memstats_sites[site] += stat.size_diff
+            if peak_traced:
+                peak = max(0, traced_peak - start)
+        else:
+            current = rss()
+        allocated = current - start
+
+        usage = self.current_record.memory if self.current_record else None
+        if usage is None:
+            usage = MemoryUsage(peak=peak)
+            if self.current_record:
+                self.current_record.memory = usage
+        elif peak is not None:
+            usage.peak = max(usage.peak or 0, peak)
+        usage.allocated += allocated
+
+        stats = self._memstats_commands.setdefault(statement.command, [0, 0, None])
+        stats[0] += 1
+        stats[1] += allocated
+        if peak is not None:
+            stats[2] = max(stats[2] or 0, peak)
+        return result
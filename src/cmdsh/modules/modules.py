@@ -35,6 +35,26 @@ A module can be any object that has a ``load(self, shell)`` method.
 When you request the shell to load some object as a module, it calls the load
 method on that object.
 
+A module may also have a ``clone(self, shell)`` method. When a shell is cloned,
+this method is called with the new shell so the module can give it fresh copies
+of any private data.
+
+A module can declare how it relates to other modules and the shell with these
+optional attributes:
+
+- ``requires``: a sequence of module classes which the shell loads before this one
+- ``provides``: a sequence of the names of attributes this module adds to the
+  shell. The shell refuses to load a module which provides an attribute that
+  the shell or another module already has.
+- ``prepare()``: a method for expensive setup which doesn't touch the shell, like
+  reading files. When several modules are loaded with ``Shell.load_modules()``,
+  the ``prepare()`` methods of modules which don't depend on each other are
+  called concurrently.
+
+A module can save it's private data in a snapshot of the shell by implementing
+``snapshot(self, shell)`` and ``restore(self, shell, state)`` methods. See
+``cmdsh.snapshots`` for details.
+
 Module Writing Conventions
 --------------------------
 
@@ -72,6 +92,8 @@ from ..utils import rebind_method
 
 class DefaultResult:
     """Create a default result if a do_command() method doesn't return one"""
+    provides = ('_default_result_hook',)
+
     def load(self, shell):
         """Load and iniitalize this module"""
 
@@ -99,6 +121,8 @@ class DefaultResult:
 
 class ExitCommand:
     """Add an exit command to a shell"""
+    provides = ('do_exit',)
+
     def load(self, shell):
         """Load and initialize this module"""
         # bind the command method to the shell
@@ -117,6 +141,8 @@ class ExitCommand:
 
 class History:
     """Add a history of entered commands"""
+    provides = ('_history', '_history_file', 'do_hist', '_add_to_history')
+
     def __init__(self, file="history.txt"):
         self._history_file = file
 
@@ -131,6 +157,21 @@ class History:
         rebind_method(self._add_to_history, shell)
         shell.register_postparse_hook(shell._add_to_history)
 
+    def clone(self, shell):
+        """Give a cloned shell it's own empty history"""
+        # pylint: disable=no-self-use
+        shell._history = []
+
+    def snapshot(self, shell):
+        """Return the history to be saved in a snapshot"""
+        # pylint: disable=no-self-use
+        return shell._history
+
+    def restore(self, shell, state):
+        """Restore the history from a snapshot"""
+        # pylint: disable=no-self-use
+        shell._history = state
+
     #
     # rebound methods
     #
@@ -143,6 +184,22 @@ class History:
         return Result(exit_code=0, stop=False)
 
     def _add_to_history(self, statement: Statement) -> Statement:
-        """postparsing hook to add the statement to history"""
-        self._history.append(statement.raw)
+        """postparsing hook to add the statement to history
+
+        A compound statement is added once, when the first of it's statements is
+        about to be executed.
+        Bytes input is decoded.
+        """
+        record = self.current_record
+        if record is None:
+            raw = statement.raw
+        elif not record.statements:
+            # the record only has a statement yet if the input was compound
+            raw = (record.statement or statement).raw
+        else:
+            return statement
+        if not isinstance(raw, str):
+            # bytes input may be a buffer the caller reuses, so keep it decoded
+            raw = str(raw, getattr(statement, 'encoding', 'utf-8'), 'surrogateescape')
+        self._history.append(raw)
         return statement
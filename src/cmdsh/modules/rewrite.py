@@ -0,0 +1,300 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A module which rewrites input with regular expression and prefix rules before it is parsed"""
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..utils import rebind_method
+
+
+class RuleMatch:
+    """The part of a match of the combined rules which belongs to one rule
+
+    Callable replacements are given one of these instead of the match of the
+    combined pattern, so they can refer to groups by the numbers and names used
+    in the pattern of their own rule.
+    """
+    def __init__(self, match, rule: '_Rule'):
+        self._match = match
+        self._rule = rule
+
+    def _index(self, group: Union[int, str]) -> Union[int, str]:
+        """Return the number or name of a group of the rule in the combined pattern"""
+        if isinstance(group, str):
+            if group not in self._rule.groupindex:
+                raise IndexError('no such group')
+            return self._rule.prefix + group
+        if not 0 <= group <= self._rule.groups:
+            raise IndexError('no such group')
+        return self._rule.offset + group
+
+    @property
+    def string(self) -> str:
+        """The string which was searched"""
+        return self._match.string
+
+    def group(self, *groups):
+        """Return one or more groups of the match, like ``re.Match.group()``"""
+        if not groups:
+            groups = (0,)
+        values = tuple(self._match.group(self._index(group)) for group in groups)
+        return values[0] if len(values) == 1 else values
+
+    def groups(self, default=None) -> tuple:
+        """Return all the numbered groups of the match, like ``re.Match.groups()``"""
+        start = self._rule.offset + 1
+        return self._match.groups(default)[start - 1:start - 1 + self._rule.groups]
+
+    def groupdict(self, default=None) -> dict:
+        """Return the named groups of the match, like ``re.Match.groupdict()``"""
+        values = {}
+        for name in self._rule.groupindex:
+            value = self._match.group(self._rule.prefix + name)
+            # a group which matched an empty string isn't the default
+            values[name] = default if value is None else value
+        return values
+
+    def start(self, group: Union[int, str] = 0) -> int:
+        """Return the index where a group starts"""
+        return self._match.start(self._index(group))
+
+    def end(self, group: Union[int, str] = 0) -> int:
+        """Return the index where a group ends"""
+        return self._match.end(self._index(group))
+
+    def span(self, group: Union[int, str] = 0) -> Tuple[int, int]:
+        """Return the start and end of a group"""
+        return self._match.span(self._index(group))
+
+
+class _Rule:
+    """A rule, with the group numbers and names it has in the combined pattern"""
+    # pylint: disable=too-few-public-methods
+    _GLOBAL_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+    def __init__(self, pattern: str, replacement, flags: int):
+        match = self._GLOBAL_FLAGS.match(pattern)
+        if match:
+            # flags at the start of the expression only apply at the start of
+            # the combined expression, so scope them to this rule
+            rest = pattern[match.end():]
+            if 'x' in match.group(1):
+                # end any comment on the last line before the group ends
+                rest += '\n'
+            pattern = '(?{}:{})'.format(match.group(1), rest)
+        compiled = re.compile(pattern, flags)
+        self.pattern = pattern
+        self.replacement = replacement
+        self.groups = compiled.groups
+        self.groupindex = dict(compiled.groupindex)
+        # set when the rules are combined
+        self.offset = 0
+        self.prefix = ''
+        self.template = None
+
+
+class RewriteRules:
+    """Rewrite lines of input using a list of rules, in a single scan of each line
+
+    Each rule has a regular expression and a replacement. The replacement may be
+    a string, which can refer to the groups of the expression like it could
+    with ``re.sub()``, or a function which is called with a ``RuleMatch`` and
+    returns the replacement.
+
+    Instead of searching the line once for each rule, the expressions of all the
+    rules are combined into a single alternation, with the groups of each rule,
+    and references to them, including conditionals like ``(?(1)...)``, renumbered
+    and renamed so they don't collide. The combined expression is compiled when
+    rules are added, so errors are raised then, instead of when input is
+    rewritten. Where more than one rule matches at the same place, the rule
+    added first wins, and rewritten text isn't rewritten again.
+
+    Inline flags at the start of an expression, like ``(?i)``, are changed to
+    apply only to that rule. Backreferences within an expression can refer to
+    at most the 99th group of the combined expression, so rules which use them
+    should be added first.
+    """
+    _PATTERN_TOKEN = re.compile(r"""
+        \\([1-9][0-9]?)                     # numbered backreference
+      | \\.                                 # other escape
+      | \[\^?\]?(?:\\.|[^\]\\])*\]          # character class
+      | \(\?P<(\w+)>                        # named group
+      | \(\?P=(\w+)\)                       # named backreference
+      | \(\?\((\w+)\)                        # conditional on a group
+    """, re.VERBOSE | re.DOTALL)
+    _TEMPLATE_TOKEN = re.compile(r'\\(?:g<([^>]*)>|([1-9][0-9]?)|.)', re.DOTALL)
+
+    def __init__(self, rules: Iterable[Tuple[str, Union[str, Callable]]] = (), flags: int = 0):
+        self.flags = flags
+        self._rules = []
+        self._combined = None
+        self._by_group = {}
+        self.extend(rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def add(self, pattern: str, replacement: Union[str, Callable[[RuleMatch], str]]) -> None:
+        """Add a rule which replaces matches of a regular expression
+
+        Raises ``re.error`` if the expression is invalid, if it can't be combined
+        with the other rules, or if the replacement refers to a group which isn't
+        in it. The rule isn't added if an error is raised.
+        """
+        self.extend([(pattern, replacement)])
+
+    def extend(self, rules: Iterable[Tuple[str, Union[str, Callable]]]) -> None:
+        """Add several rules, compiling the combined expression only once
+
+        Raises ``re.error`` like ``add()`` does, in which case none of the rules
+        are added.
+        """
+        rules = self._rules + [
+            _Rule(pattern, replacement, self.flags) for pattern, replacement in rules
+        ]
+        self._combined, self._by_group = self._combine(rules)
+        self._rules = rules
+
+    def add_prefix(self, prefix: str, replacement: Union[str, Callable[[RuleMatch], str]]) -> None:
+        """Add a rule which replaces prefix when a line begins with it
+
+        If replacement is a string, it's used literally.
+        """
+        if isinstance(replacement, str):
+            replacement = replacement.replace('\\', r'\\')
+        self.add(r'\A' + re.escape(prefix), replacement)
+
+    def copy(self) -> 'RewriteRules':
+        """Return a copy of these rules which can be changed independently"""
+        return RewriteRules(
+            ((rule.pattern, rule.replacement) for rule in self._rules),
+            flags=self.flags,
+        )
+
+    def rewrite(self, line: str) -> str:
+        """Return line, rewritten by the rules"""
+        if self._combined is None:
+            return line
+        return self._combined.sub(self._replace, line)
+
+    def _combine(self, rules: List[_Rule]) -> Tuple[Any, Dict[int, _Rule]]:
+        """Compile the expressions of rules into one
+
+        Returns the compiled expression, or None if there are no rules, and a dict
+        which maps the number of the group containing each rule to the rule.
+        """
+        if not rules:
+            return None, {}
+        alternatives = []
+        by_group = {}
+        offset = 0
+        for number, rule in enumerate(rules):
+            # the whole rule is a group too
+            offset += 1
+            rule.offset = offset
+            rule.prefix = '_r{}_'.format(number)
+            alternatives.append('({})'.format(self._renumber(rule)))
+            if not callable(rule.replacement):
+                rule.template = self._renumber_template(rule)
+            by_group[offset] = rule
+            offset += rule.groups
+        return re.compile('|'.join(alternatives), self.flags), by_group
+
+    def _renumber(self, rule: _Rule) -> str:
+        """Return the expression of a rule, with groups and references to them renumbered"""
+        def renumber(match):
+            if match.group(1):
+                group = int(match.group(1)) + rule.offset
+                if group > 99:
+                    raise re.error(
+                        'backreference to group {} of the combined rules'.format(group)
+                    )
+                return r'(?:\{})'.format(group)
+            if match.group(2):
+                return '(?P<{}{}>'.format(rule.prefix, match.group(2))
+            if match.group(3):
+                return '(?P={}{})'.format(rule.prefix, match.group(3))
+            if match.group(4):
+                if match.group(4).isdigit():
+                    return '(?({})'.format(int(match.group(4)) + rule.offset)
+                return '(?({}{})'.format(rule.prefix, match.group(4))
+            return match.group(0)
+        return self._PATTERN_TOKEN.sub(renumber, rule.pattern)
+
+    def _renumber_template(self, rule: _Rule) -> str:
+        """Return the replacement of a rule, with references to groups renumbered"""
+        def renumber(match):
+            group = match.group(2) or match.group(1)
+            if group is None:
+                return match.group(0)
+            if group.isdigit():
+                if int(group) > rule.groups:
+                    raise re.error('invalid group reference {}'.format(group))
+                return r'\g<{}>'.format(int(group) + rule.offset)
+            if group not in rule.groupindex:
+                raise re.error('unknown group name {!r}'.format(group))
+            return r'\g<{}{}>'.format(rule.prefix, group)
+        return self._TEMPLATE_TOKEN.sub(renumber, rule.replacement)
+
+    def _replace(self, match) -> str:
+        """Return the replacement for a match of the combined expression"""
+        # the group of the whole rule closes last, so it's the last index
+        rule = self._by_group[match.lastindex]
+        if rule.template is None:
+            return rule.replacement(RuleMatch(match, rule))
+        return match.expand(rule.template)
+
+
+class Rewrite:
+    """Rewrite input using ``RewriteRules`` before it's parsed
+
+    Each shell gets it's own copy of the rules, as ``shell._rewrite_rules``.
+    """
+    provides = ('_rewrite_rules', '_rewrite_preparse_hook')
+
+    def __init__(self, rules: Optional[Union[RewriteRules, Iterable[Tuple]]] = None):
+        if not isinstance(rules, RewriteRules):
+            rules = RewriteRules(rules or ())
+        self._rules = rules
+
+    def load(self, shell):
+        """Load and initialize this module"""
+        shell._rewrite_rules = self._rules.copy()
+        rebind_method(self._rewrite_preparse_hook, shell)
+        shell.register_preparse_hook(shell._rewrite_preparse_hook)
+
+    def clone(self, shell):
+        """Give a cloned shell it's own copy of the rules"""
+        shell._rewrite_rules = shell._rewrite_rules.copy()
+
+    #
+    # rebound methods
+    #
+    # these methods end up bound to the shell, not to the module
+    # that means `self` references the shell object, not the module
+    # object
+    def _rewrite_preparse_hook(self, line: str) -> str:
+        """Rewrite the input before it's parsed"""
+        return self._rewrite_rules.rewrite(line)
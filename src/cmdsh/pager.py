@@ -0,0 +1,202 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A pager for output longer than the terminal
+
+A ``Pager`` reads text from an iterable, like a generator, only as far as it needs
+to display the current page. Text which has been read is spooled to a temporary
+file, with an index of where each line starts, so paging backwards, searching,
+and jumping to the end don't hold the output in memory.
+
+At the prompt, the pager understands these commands:
+
+- Enter, space, or ``f``: the next page
+- ``b``: the previous page
+- ``g``: the first page
+- ``G``: the last page
+- ``/pattern``: search forward for a regular expression
+- ``n``: search for the same pattern again
+- ``q``: quit
+
+The ``cmdsh.modules.AutoPager`` module pages the output of commands in an
+interactive shell.
+"""
+
+import array
+import re
+import shutil
+import sys
+import tempfile
+
+from typing import Callable, Iterable, List, Optional
+
+
+class Pager:
+    """Page text from an iterable of strings
+
+    source
+        strings of text, which don't have to be whole lines
+
+    height
+        the number of lines on each page, which defaults to one less than the
+        height of the terminal, to leave room for the prompt
+
+    write
+        a function to write output, which defaults to writing to stdout
+
+    read
+        a function which displays a prompt and returns a line of input, which
+        defaults to ``input()``
+    """
+    def __init__(
+            self,
+            source: Iterable[str] = (),
+            height: Optional[int] = None,
+            write: Optional[Callable[[str], None]] = None,
+            read: Optional[Callable[[str], str]] = None,
+    ):
+        self.height = height or max(shutil.get_terminal_size().lines - 1, 1)
+        self.write = write or sys.stdout.write
+        self.read = read or input
+        self._source = iter(source)
+        self._exhausted = False
+        self._spool = tempfile.TemporaryFile()
+        self._size = 0
+        # the offset in the spool where each line starts
+        self._offsets = array.array('Q', [0])
+        self._pattern = None
+
+    def close(self) -> None:
+        """Remove the spool file"""
+        self._spool.close()
+
+    def feed(self, text: str) -> None:
+        """Add text to the end of the output"""
+        data = text.encode('utf-8', 'surrogateescape')
+        self._spool.seek(self._size)
+        self._spool.write(data)
+        start = 0
+        while True:
+            pos = data.find(b'\n', start)
+            if pos == -1:
+                break
+            self._offsets.append(self._size + pos + 1)
+            start = pos + 1
+        self._size += len(data)
+
+    @property
+    def line_count(self) -> int:
+        """The number of lines read so far, including an unterminated last line"""
+        count = len(self._offsets) - 1
+        if self._size > self._offsets[-1]:
+            count += 1
+        return count
+
+    def _fill(self, count: Optional[int] = None) -> bool:
+        """Read from the source until there are count complete lines, or all of them
+
+        Returns True if there are at least count lines.
+        """
+        while not self._exhausted and (count is None or len(self._offsets) - 1 < count):
+            try:
+                self.feed(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+        return count is not None and self.line_count >= count
+
+    def line(self, num: int) -> str:
+        """Return a line, without it's line ending, reading more of the source if needed"""
+        self._fill(num + 1)
+        if num >= self.line_count:
+            raise IndexError('line number out of range')
+        start = self._offsets[num]
+        end = self._offsets[num + 1] - 1 if num + 1 < len(self._offsets) else self._size
+        self._spool.seek(start)
+        return self._spool.read(end - start).decode('utf-8', 'surrogateescape')
+
+    def lines(self, start: int, count: int) -> List[str]:
+        """Return up to count lines beginning with line start"""
+        self._fill(start + count)
+        return [self.line(num) for num in range(start, min(start + count, self.line_count))]
+
+    def search(self, pattern: str, start: int = 0) -> Optional[int]:
+        """Return the number of the first line at or after start which matches pattern"""
+        regex = re.compile(pattern)
+        num = start
+        while self._fill(num + 1):
+            if regex.search(self.line(num)):
+                return num
+            num += 1
+        return None
+
+    def fits(self) -> bool:
+        """True if all of the output fits on a single page"""
+        return not self._fill(self.height + 1)
+
+    def run(self) -> None:
+        """Display the output a page at a time until the user quits or reaches the end"""
+        top = 0
+        try:
+            while True:
+                for line in self.lines(top, self.height):
+                    self.write(line + '\n')
+                at_end = not self._fill(top + self.height + 1)
+                if at_end and top == 0:
+                    # it all fit on one page
+                    return
+                command = self.read('(END) ' if at_end else ':').strip()
+                top = self._next_top(command, top, at_end)
+                if top is None:
+                    return
+        finally:
+            self.close()
+
+    def _next_top(self, command: str, top: int, at_end: bool) -> Optional[int]:
+        """Interpret a command, returning the new top line, or None to quit"""
+        if command in ('', ' ', 'f'):
+            return None if at_end else top + self.height
+        if command == 'q':
+            return None
+        if command == 'b':
+            return max(top - self.height, 0)
+        if command == 'g':
+            return 0
+        if command == 'G':
+            self._fill()
+            return max(self.line_count - self.height, 0)
+        if command.startswith('/') or command == 'n':
+            if command != 'n':
+                self._pattern = command[1:]
+            if not self._pattern:
+                return top
+            try:
+                found = self.search(self._pattern, top + 1)
+            except re.error as err:
+                self.write('bad pattern: {}\n'.format(err))
+                return top
+            if found is None:
+                self.write('pattern not found\n')
+                return top
+            return found
+        return top
+
@@ -30,29 +30,328 @@ parse(self, statement: Statement) -> Statement
 The statement object passed into the parse method will only have the ``.raw``
 attribute set. The parse method must parse that line and return a new statement
 object with both ``.raw`` and ``.argv`` attributes set. ``.argv`` is a list
-of arguments similar to ``sys.argv``.
+of arguments similar to ``sys.argv``, or a tuple if the parser shares it between
+statements.
 
 Any exceptions thrown by the parse method prevent the shell from executing
 the statement.
+
+A parser may also implement:
+
+parse_list(self, statement: Statement) -> List[Statement]
+
+which splits a compound statement like ``one; two && three`` into a list of
+statements, setting the ``.operator`` attribute of each one to the control
+operator which preceeds it. If a parser has this method, the shell uses it
+instead of ``parse()``, and executes the statements in order, skipping a
+statement after ``&&`` if the previous one failed, and after ``||`` if the
+previous one succeeded. A statement after ``|`` is given the payload of the
+previous one's result as it's ``.input``.
+
+A parser which has a true ``parses_bytes`` attribute accepts a ``BytesStatement``
+in addition to a ``Statement``, and sets it's ``.spans`` attribute instead of
+``.argv``. When the shell is given bytes input and the parser doesn't parse
+bytes, the input is decoded and parsed as a string.
+
+A parser may also implement:
+
+parse_many(self, lines: Union[str, Iterable[str]]) -> Iterator[Statement]
+
+which generates statements from a buffer containing many lines, or from an
+iterable of lines, such as the lines of a script. Parsers implement this to
+avoid repeating setup work for every line.
+
+A parser which has a true ``multiline`` attribute must also implement:
+
+scanner(self) -> ListScanner
+
+The command loop feeds each line of input to a new scanner, and as long as the
+scanner reports the input is incomplete, it reads another line using the
+continuation prompt. Then the complete statement is passed to the shell.
 """
 # pylint: disable=no-self-use
 
+import io
+import re
 import shlex
+import sys
+
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+
+from .models import Statement, BytesStatement
+
+# control operators which must have a statement on both sides
+_OPERAND_OPERATORS = ('&&', '||', '|')
+
+
+class ListScanner:
+    """Incrementally scan input for quotes, escapes, comments, and control operators
+
+    Text is fed to the scanner a piece at a time, and the scanner remembers
+    whether it's inside quotes or following a backslash, so each piece is only
+    scanned once no matter how many pieces there are. ``parts()`` splits all the
+    text fed so far at the unquoted control operators ``;``, ``&&``, ``||``, and ``|``,
+    and at unquoted newlines, using the same rules as ``PosixShellParser``.
+
+    ``feed_line()`` joins lines the way a posix shell does: a line ending with
+    a backslash is continued on the next line, a newline inside quotes is
+    kept as part of the quoted string, and a line ending with ``&&``, ``||``, or
+    ``|`` is continued with the statement on the next line.
+    """
+    _UNQUOTED = re.compile(r'[\\\'"#;&|\n]')
+    _DOUBLE_QUOTED = re.compile(r'[\\"]')
+
+    def __init__(self):
+        self._chunks = []
+        self._length = 0
+        self._quote = None
+        self._escape = False
+        self._comment = False
+        # the first character of a possible && or || at the end of the last chunk
+        self._pending = ''
+        # completed parts as (operator, start, end) tuples, and the current part
+        self._parts = []
+        self._operator = ''
+        self._start = 0
+        self._end = None
+
+    @property
+    def complete(self) -> bool:
+        """False if more input is needed to close a quote, continue a line, or follow an operator"""
+        return self._quote is None and not self._escape and not self._needs_operand()
+
+    def _needs_operand(self, end: int = None) -> bool:
+        """True if the text up to end is ``&&``, ``||``, or ``|`` with nothing after it"""
+        if self._pending == '|':
+            return True
+        if self._operator not in _OPERAND_OPERATORS:
+            return False
+        if self._end is not None:
+            end = self._end
+        elif end is None:
+            end = self._length
+        return not self.text[self._start:end].strip()
+
+    @property
+    def text(self) -> str:
+        """All of the text fed to the scanner"""
+        if len(self._chunks) > 1:
+            self._chunks = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ''
+
+    def feed_line(self, line: str) -> bool:
+        """Feed a line of input without it's line ending
+
+        Returns True if the input is complete, or False if another line is needed.
+        """
+        if self._escape and self._quote != "'":
+            # backslash newline is a line continuation, remove the backslash
+            self._chunks[-1] = self._chunks[-1][:-1]
+            self._length -= 1
+            self._escape = False
+            self.feed(line)
+        elif self._quote or self._needs_operand():
+            self.feed('\n' + line)
+        else:
+            self.feed(line)
+        return self.complete
+
+    def feed(self, text: str) -> None:
+        """Scan some more text"""
+        base = self._length
+        self._chunks.append(text)
+        self._length += len(text)
+        pos = 0
+        end = len(text)
+        while pos < end:
+            if self._escape:
+                self._escape = False
+                pos += 1
+            elif self._pending:
+                if text[pos] == self._pending:
+                    self._split(self._pending * 2, base + pos - 1, base + pos + 1)
+                    pos += 1
+                elif self._pending == '|':
+                    self._split('|', base + pos - 1, base + pos)
+                self._pending = ''
+            elif self._comment:
+                pos = text.find('\n', pos)
+                if pos == -1:
+                    break
+                self._comment = False
+            elif self._quote == "'":
+                pos = text.find("'", pos)
+                if pos == -1:
+                    break
+                self._quote = None
+                pos += 1
+            elif self._quote == '"':
+                match = self._DOUBLE_QUOTED.search(text, pos)
+                if not match:
+                    break
+                pos = match.end()
+                if match.group() == '"':
+                    self._quote = None
+                else:
+                    self._escape = True
+            else:
+                match = self._UNQUOTED.search(text, pos)
+                if not match:
+                    break
+                pos = match.end()
+                char = match.group()
+                if char == '\\':
+                    self._escape = True
+                elif char in '\'"':
+                    self._quote = char
+                elif char == '#':
+                    if self._end is None:
+                        self._end = base + pos - 1
+                    self._comment = True
+                elif char == '\n' and self._needs_operand(base + pos - 1):
+                    # the statement after the operator is on the next line
+                    self._start = base + pos
+                    self._end = None
+                elif char in ';\n':
+                    self._split(';', base + pos - 1, base + pos)
+                elif pos < end:
+                    if text[pos] == char:
+                        self._split(char * 2, base + pos - 1, base + pos + 1)
+                        pos += 1
+                    elif char == '|':
+                        self._split('|', base + pos - 1, base + pos)
+                else:
+                    self._pending = char
+
+    def _split(self, operator: str, end: int, start: int) -> None:
+        """End the current part at end, and start a new one at start"""
+        if self._end is None:
+            self._end = end
+        self._parts.append((self._operator, self._start, self._end))
+        self._operator = operator
+        self._start = start
+        self._end = None
+
+    def parts(self) -> List[Tuple[str, str]]:
+        """Split the text at unquoted control operators and newlines
+
+        Returns a list of (operator, text) tuples, where operator is the control
+        operator which preceeds text, and is an empty string for the first one.
+        Comments are removed.
+        """
+        text = self.text
+        if self._pending == '|':
+            # the text ends with a pipe
+            end = self._length - 1 if self._end is None else self._end
+            parts = self._parts + [
+                (self._operator, self._start, end), ('|', self._length, self._length),
+            ]
+        else:
+            end = self._length if self._end is None else self._end
+            parts = self._parts + [(self._operator, self._start, end)]
+        return [(operator, text[start:end]) for operator, start, end in parts]
+
+
+def split_list(raw: str) -> List[Tuple[str, str]]:
+    """Split input at the unquoted control operators ``;``, ``&&``, ``||``, and ``|``
+
+    Returns a list of (operator, text) tuples, where operator is the control
+    operator which preceeds text, and is an empty string for the first one.
+    Quotes, backslash escapes, and comments are respected using the same rules
+    as ``PosixShellParser``.
+    """
+    scanner = ListScanner()
+    scanner.feed(raw)
+    return scanner.parts()
+
+
+def _lines(lines: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Split a buffer into lines, or remove the line endings from an iterable of lines"""
+    if isinstance(lines, str):
+        return iter(lines.splitlines())
+    return (line.rstrip('\r\n') for line in lines)
+
+
+def _reuse_lexer(lexer: shlex.shlex, raw: str) -> shlex.shlex:
+    """Reset a lexer to split a new string, which is much faster than creating a new one"""
+    lexer.instream = io.StringIO(raw)
+    lexer.state = ' '
+    lexer.token = ''
+    lexer.lineno = 1
+    lexer.pushback.clear()
+    if hasattr(lexer, '_pushback_chars'):
+        lexer._pushback_chars.clear()  # pylint: disable=protected-access
+    return lexer
+
 
-from .models import Statement
+class InternCache:
+    """A bounded cache of input to tuples of interned arguments
+
+    When the same input is parsed again, the statement gets the same tuple, and
+    identical arguments in different input share the same string. The cache is
+    emptied when it's full.
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(self, size: int = 10000):
+        self.size = size
+        self._cache = {}
+
+    def argv(self, raw: str, split: Callable[[str], Iterable[str]]) -> Tuple[str, ...]:
+        """Return the interned arguments for raw, using split to split it if we must"""
+        argv = self._cache.get(raw)
+        if argv is None:
+            argv = tuple(sys.intern(arg) for arg in split(raw))
+            if len(self._cache) >= self.size:
+                self._cache.clear()
+            self._cache[raw] = argv
+        return argv
 
 
 class SimpleParser:
     """A simple parser which break the input arguments by whitespace
 
     Quoted arguments are properly handled
+
+    If intern is True, ``argv`` is a tuple of interned strings, shared by all
+    statements with the same input. cache_size limits how many different inputs
+    are remembered.
     """
     # pylint: disable=too-few-public-methods
+    def __init__(self, intern: bool = False, cache_size: int = 10000):
+        self.intern = intern
+        self._interned = InternCache(cache_size) if intern else None
+
+    @staticmethod
+    def _split(raw: str) -> Iterable[str]:
+        """Split a string into arguments"""
+        return shlex.shlex(raw, posix=False)
+
     def parse(self, stmt: Statement) -> Statement:
         """Split the input on whitespace"""
-        stmt.argv = list(shlex.shlex(stmt.raw, posix=False))
+        if self._interned:
+            stmt.argv = self._interned.argv(stmt.raw, self._split)
+        else:
+            stmt.argv = list(self._split(stmt.raw))
         return stmt
 
+    def parse_many(self, lines: Union[str, Iterable[str]]) -> Iterator[Statement]:
+        """Generate a statement for each line of input which isn't blank
+
+        lines may be a string containing many lines, or an iterable of lines.
+        """
+        lexer = shlex.shlex('', posix=False)
+
+        def split(raw):
+            return _reuse_lexer(lexer, raw)
+
+        for line in _lines(lines):
+            if self._interned:
+                argv = self._interned.argv(line, split)
+            else:
+                argv = list(split(line))
+            if argv:
+                yield Statement(raw=line, argv=argv)
+
 
 class PosixShellParser:
     """Parse using POSIX shell rules
@@ -61,9 +360,127 @@ class PosixShellParser:
     - Quotes do not separate words
     - Escape sequences are interpreted
     - Everything after an unquoted/unescaped # is treated as a comment
+
+    If multiline is True, a statement with unclosed quotes, a trailing backslash,
+    or a trailing ``&&``, ``||``, or ``|`` is continued on the next line of input.
+
+    If intern is True, ``argv`` is a tuple of interned strings, shared by all
+    statements with the same input. cache_size limits how many different inputs
+    are remembered.
     """
-    # pylint: disable=too-few-public-methods
+    def __init__(self, multiline: bool = False, intern: bool = False, cache_size: int = 10000):
+        self.multiline = multiline
+        self.intern = intern
+        self._interned = InternCache(cache_size) if intern else None
+
+    @staticmethod
+    def _split(raw: str) -> Iterable[str]:
+        """Split a string into arguments"""
+        return shlex.shlex(raw, posix=True, punctuation_chars=True)
+
+    def _argv(
+            self,
+            raw: str,
+            split: Callable[[str], Iterable[str]] = None,
+    ) -> Union[List[str], Tuple[str, ...]]:
+        """Split a string into a list of arguments, or a tuple if we are interning"""
+        split = split or self._split
+        if self._interned:
+            return self._interned.argv(raw, split)
+        return list(split(raw))
+
+    def scanner(self) -> ListScanner:
+        """Create a scanner which finds the end of a statement spanning multiple lines"""
+        return ListScanner()
+
     def parse(self, stmt: Statement) -> Statement:
         """Posix split the input"""
-        stmt.argv = list(shlex.shlex(stmt.raw, posix=True, punctuation_chars=True))
+        stmt.argv = self._argv(stmt.raw)
+        return stmt
+
+    def parse_list(self, stmt: Statement) -> List[Statement]:
+        """Split the input into a list of statements at the control operators
+
+        Raises ValueError if ``&&``, ``||``, or ``|`` doesn't have a statement on
+        both sides.
+        """
+        parts = split_list(stmt.raw)
+        if len(parts) == 1:
+            return [self.parse(stmt)]
+        statements = list(self._statements(parts))
+        if not statements:
+            return [self.parse(stmt)]
+        return statements
+
+    def _statements(
+            self,
+            parts: List[Tuple[str, str]],
+            split: Callable[[str], Iterable[str]] = None,
+    ) -> Iterator[Statement]:
+        """Generate statements from the parts of a compound statement, skipping empty ones"""
+        previous = None
+        for operator, text in parts:
+            text = text.strip()
+            argv = self._argv(text, split)
+            if operator in _OPERAND_OPERATORS and not (previous and argv):
+                raise ValueError('syntax error near {}'.format(operator))
+            if argv:
+                yield Statement(raw=text, argv=argv, operator=operator)
+            previous = argv
+
+    def parse_many(self, lines: Union[str, Iterable[str]]) -> Iterator[Statement]:
+        """Generate statements from many lines of input
+
+        lines may be a string containing many lines, or an iterable of lines.
+        Compound statements are split like ``parse_list()`` does, so the first
+        statement from each line has an empty ``operator``. Blank lines and comments
+        don't generate statements. If multiline is True, statements with unclosed
+        quotes, a trailing backslash, or a trailing ``&&``, ``||``, or ``|`` are
+        continued on the next line.
+
+        Raises ValueError like ``parse_list()`` does.
+        """
+        lexer = shlex.shlex('', posix=True, punctuation_chars=True)
+
+        def split(raw):
+            return _reuse_lexer(lexer, raw)
+
+        scanner = ListScanner()
+        for line in _lines(lines):
+            if not scanner.feed_line(line) and self.multiline:
+                continue
+            yield from self._statements(scanner.parts(), split)
+            scanner = ListScanner()
+        # the input ended in the middle of a statement
+        yield from self._statements(scanner.parts(), split)
+
+
+class BytesParser:
+    """A fast parser which splits input on whitespace without copying it
+
+    Arguments are separated by ASCII whitespace. An argument surrounded by double
+    or single quotes may contain whitespace, and the quotes are not part of the
+    argument. No escape sequences are interpreted.
+
+    A ``BytesStatement`` is parsed by recording the location of each argument,
+    and a ``Statement`` is parsed into an ``argv`` list of strings.
+    """
+    # pylint: disable=too-few-public-methods
+    parses_bytes = True
+
+    _BYTES_ARGUMENT = re.compile(rb'"([^"]*)"|\'([^\']*)\'|(\S+)')
+    _STR_ARGUMENT = re.compile(r'"([^"]*)"|\'([^\']*)\'|(\S+)')
+
+    def parse(self, stmt: Statement) -> Statement:
+        """Split the input on whitespace"""
+        if isinstance(stmt, BytesStatement):
+            stmt.spans = [
+                match.span(match.lastindex)
+                for match in self._BYTES_ARGUMENT.finditer(stmt.raw)
+            ]
+        else:
+            stmt.argv = [
+                match.group(match.lastindex)
+                for match in self._STR_ARGUMENT.finditer(stmt.raw)
+            ]
         return stmt
@@ -0,0 +1,176 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Discover modules and personalities distributed in separate packages
+
+A package makes modules and personalities available to cmdsh using entry points
+in the ``cmdsh.modules`` and ``cmdsh.personalities`` groups:
+
+    setup(
+        ...
+        entry_points={
+            'cmdsh.modules': ['greeter = mypackage.greeter:Greeter'],
+        },
+    )
+
+Then an application can load all the installed modules:
+
+    shell = cmdsh.Shell()
+    cmdsh.plugins.load_modules(shell)
+
+Reading the metadata of every installed distribution to find entry points is
+slow, so the entry points are saved in an index file. The index is rebuilt
+when the fingerprint of the directories on ``sys.path`` changes, which happens
+when distributions are installed or removed. Call ``PluginIndex.refresh()`` to
+rebuild it yourself.
+"""
+
+import json
+import os
+import sys
+
+from typing import Dict, List, Optional
+
+from . import utils
+
+MODULES = 'cmdsh.modules'
+PERSONALITIES = 'cmdsh.personalities'
+GROUPS = (MODULES, PERSONALITIES)
+
+
+def default_index_path() -> str:
+    """The path of the index file, in the user's cache directory"""
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache, 'cmdsh', 'plugins.json')
+
+
+def _scan(search_path: List[str]) -> Dict[str, Dict[str, str]]:
+    """Read the entry points for all our groups from installed distributions"""
+    plugins = {group: {} for group in GROUPS}
+    try:
+        from importlib import metadata  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        import pkg_resources  # pylint: disable=import-outside-toplevel
+        working_set = pkg_resources.WorkingSet(search_path)
+        for group in GROUPS:
+            for entry_point in working_set.iter_entry_points(group):
+                plugins[group].setdefault(entry_point.name, '{}:{}'.format(
+                    entry_point.module_name,
+                    '.'.join(entry_point.attrs),
+                ))
+        return plugins
+
+    for dist in metadata.distributions(path=search_path):
+        for entry_point in dist.entry_points:
+            if entry_point.group in plugins:
+                # like sys.path, the first one found wins
+                plugins[entry_point.group].setdefault(entry_point.name, entry_point.value)
+    return plugins
+
+
+class PluginIndex:
+    """An index of the cmdsh entry points of installed distributions
+
+    path
+        where to save the index, by default in the user's cache directory
+
+    search_path
+        the directories to search for distributions, by default ``sys.path``
+    """
+    def __init__(self, path: Optional[str] = None, search_path: Optional[List[str]] = None):
+        self.path = path or default_index_path()
+        self.search_path = sys.path if search_path is None else search_path
+        self._plugins = None
+
+    def fingerprint(self) -> list:
+        """Identify the installed distributions without reading their metadata
+
+        Installing or removing a distribution adds or removes directories in one of
+        the directories on the search path, which changes it's modification time.
+        """
+        entries = [sys.version]
+        for entry in self.search_path:
+            try:
+                entries.append([entry, os.stat(entry or os.curdir).st_mtime_ns])
+            except OSError:
+                entries.append([entry, None])
+        return entries
+
+    def plugins(self, group: str) -> Dict[str, str]:
+        """Return a dict of entry point names to object references for a group"""
+        if self._plugins is None:
+            self._plugins = self._read() or self.refresh()
+        return self._plugins.get(group, {})
+
+    def refresh(self) -> Dict[str, Dict[str, str]]:
+        """Scan installed distributions and save a new index"""
+        self._plugins = _scan(self.search_path)
+        index = {'fingerprint': self.fingerprint(), 'plugins': self._plugins}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmppath = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(tmppath, 'w') as file:
+                json.dump(index, file)
+            os.replace(tmppath, self.path)
+        except OSError:
+            # we can still use the plugins even if we can't cache them
+            pass
+        return self._plugins
+
+    def _read(self) -> Optional[Dict[str, Dict[str, str]]]:
+        """Read the saved index, if it's still valid"""
+        try:
+            with open(self.path) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if index.get('fingerprint') != self.fingerprint():
+            return None
+        return index.get('plugins')
+
+    def load(self, group: str, name: str):
+        """Import and return the object for an entry point"""
+        try:
+            spec = self.plugins(group)[name]
+        except KeyError:
+            raise LookupError('no {} plugin named {}'.format(group, name)) from None
+        return utils.import_object(spec)
+
+
+def load_modules(shell, names: Optional[List[str]] = None, index: Optional[PluginIndex] = None):
+    """Load installed plugin modules into shell
+
+    Load the modules with the given entry point names, or all of them if names
+    is None. Modules are loaded with ``Shell.load_modules()``, so their
+    requirements are honored.
+    """
+    index = index or PluginIndex()
+    if names is None:
+        names = sorted(index.plugins(MODULES))
+    shell.load_modules([index.load(MODULES, name) for name in names])
+
+
+def load_personality(name: str, index: Optional[PluginIndex] = None):
+    """Create an instance of an installed plugin personality"""
+    index = index or PluginIndex()
+    return index.load(PERSONALITIES, name)()
@@ -0,0 +1,292 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""A bounded, thread-safe input queue which applies backpressure to producers
+
+By default ``Shell.input_queue`` is a list, which is fine when the shell
+itself is the only thing putting input in it. When other threads or
+coroutines produce input, use an ``InputQueue`` instead:
+
+    shell.input_queue = cmdsh.queues.InputQueue(
+        maxsize=1000,
+        rate_limits={'deploy': (2, 5)},
+    )
+
+Producers call ``put()``, which blocks while the queue is full, or
+``await put_async()`` from a coroutine. ``rate_limits`` maps command names to a
+tuple of (statements per second, burst size), and putting a statement for a
+rate limited command also waits until the rate limit allows it.
+
+``stats()`` reports the depth of the queue and how long statements and
+producers have been waiting.
+"""
+
+import asyncio
+import collections
+import queue
+import threading
+import time
+
+from typing import Dict, Optional, Tuple
+
+import attr
+
+
+class TokenBucket:
+    """Allow an average of rate events per second, in bursts of up to burst events"""
+    def __init__(self, rate: float, burst: Optional[float] = None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def take(self) -> float:
+        """Take a token if one is available
+
+        Returns 0 if a token was taken, otherwise the number of seconds until
+        one will be available.
+        """
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+
+@attr.s
+class QueueStats:
+    """A point in time summary of the activity of an InputQueue"""
+    # pylint: disable=too-few-public-methods
+    # the number of statements in the queue, and the most there have ever been
+    depth = attr.ib(default=0)
+    max_depth = attr.ib(default=0)
+    # the number of statements put into and taken out of the queue
+    puts = attr.ib(default=0)
+    gets = attr.ib(default=0)
+    # the number of non-blocking puts which failed because the queue was full
+    # or a rate limit was exceeded
+    rejected = attr.ib(default=0)
+    # the average and longest time, in seconds, statements spent in the queue
+    mean_wait = attr.ib(default=0.0)
+    max_wait = attr.ib(default=0.0)
+    # the total time, in seconds, producers spent blocked in put()
+    blocked = attr.ib(default=0.0)
+
+
+class InputQueue:
+    """A bounded, thread-safe queue of input for a shell
+
+    maxsize
+        the most statements the queue will hold, or 0 for no limit
+
+    rate_limits
+        a dict of command names to (statements per second, burst) tuples
+
+    wait
+        if True, the command loop waits for statements to be put in the queue
+        instead of reading input from the user when the queue is empty. Call
+        ``close()`` to signal the end of input, which ends the command loop
+
+    This class supports the list methods the shell uses: ``append()``, ``extend()``,
+    ``pop(0)``, ``clear()``, ``len()``, and iteration. ``append()`` and ``extend()``
+    never block, and raise ``queue.Full`` if a statement can't be added.
+    """
+    def __init__(
+            self,
+            maxsize: int = 0,
+            rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+            wait: bool = False,
+            clock=time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.rate_limits = dict(rate_limits or {})
+        self.wait = wait
+        self._clock = clock
+        self._buckets = {
+            command: TokenBucket(rate, burst, clock)
+            for command, (rate, burst) in self.rate_limits.items()
+        }
+        # (statement, time it was put in the queue)
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._not_empty = threading.Condition(self._lock)
+        self._async_waiters = []
+        self._closed = False
+        self._stats = QueueStats()
+        self._total_wait = 0.0
+
+    def empty_copy(self) -> 'InputQueue':
+        """Create a new empty queue with the same settings"""
+        return InputQueue(self.maxsize, self.rate_limits, self.wait, self._clock)
+
+    #
+    # producers
+    #
+    def put(self, line: str, block: bool = True, timeout: Optional[float] = None) -> None:
+        """Put a statement in the queue
+
+        If block is True, wait until there is room in the queue and any rate limit
+        for the command allows it, for up to timeout seconds. Raises ``queue.Full``
+        if the statement can't be put in the queue.
+        """
+        start = self._clock()
+        with self._not_full:
+            while True:
+                delay = self._try_put(line)
+                if delay == 0:
+                    break
+                remaining = None if timeout is None else start + timeout - self._clock()
+                if not block or (remaining is not None and remaining <= 0):
+                    self._stats.rejected += 1
+                    raise queue.Full()
+                if delay is None or (remaining is not None and remaining < delay):
+                    delay = remaining
+                self._not_full.wait(delay)
+            self._stats.blocked += self._clock() - start
+
+    async def put_async(self, line: str) -> None:
+        """Put a statement in the queue, waiting without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+        start = self._clock()
+        while True:
+            with self._lock:
+                delay = self._try_put(line)
+                if delay == 0:
+                    self._stats.blocked += self._clock() - start
+                    return
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            try:
+                await asyncio.wait_for(future, delay)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if (loop, future) in self._async_waiters:
+                        self._async_waiters.remove((loop, future))
+
+    def _try_put(self, line: str) -> Optional[float]:
+        """Put a statement in the queue if we can, the lock must be held
+
+        Returns 0 if the statement was added, None if the queue is full, or the
+        number of seconds until the rate limit for the command allows it.
+        """
+        if self._closed:
+            raise ValueError('put to a closed queue')
+        if self.maxsize and len(self._items) >= self.maxsize:
+            return None
+        if self._buckets:
+            words = line.split(None, 1)
+            bucket = self._buckets.get(words[0]) if words else None
+            if bucket:
+                delay = bucket.take()
+                if delay:
+                    return delay
+        self._items.append((line, self._clock()))
+        self._stats.puts += 1
+        self._stats.max_depth = max(self._stats.max_depth, len(self._items))
+        self._not_empty.notify()
+        return 0
+
+    def append(self, line: str) -> None:
+        """Put a statement in the queue without blocking"""
+        self.put(line, block=False)
+
+    def extend(self, lines) -> None:
+        """Put several statements in the queue without blocking"""
+        for line in lines:
+            self.put(line, block=False)
+
+    def close(self) -> None:
+        """Signal that no more statements will be put in the queue"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    #
+    # consumers
+    #
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> str:
+        """Remove and return the next statement
+
+        Raises ``queue.Empty`` if no statement is available, or ``EOFError`` if the
+        queue is empty and has been closed.
+        """
+        with self._not_empty:
+            if block:
+                self._not_empty.wait_for(lambda: self._items or self._closed, timeout)
+            if not self._items:
+                if self._closed:
+                    raise EOFError()
+                raise queue.Empty()
+            line, enqueued = self._items.popleft()
+            waited = self._clock() - enqueued
+            self._total_wait += waited
+            self._stats.gets += 1
+            self._stats.max_wait = max(self._stats.max_wait, waited)
+            self._not_full.notify()
+            for loop, future in self._async_waiters:
+                loop.call_soon_threadsafe(_wake, future)
+            del self._async_waiters[:]
+            return line
+
+    def pop(self, index: int = 0) -> str:
+        """Remove and return the next statement, like ``list.pop(0)``"""
+        if index != 0:
+            raise IndexError('can only pop from the front of an InputQueue')
+        try:
+            return self.get(block=False)
+        except queue.Empty:
+            raise IndexError('pop from empty InputQueue') from None
+
+    def clear(self) -> None:
+        """Remove all statements from the queue"""
+        with self._lock:
+            self._items.clear()
+            self._not_full.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        with self._lock:
+            lines = [line for line, _ in self._items]
+        return iter(lines)
+
+    def stats(self) -> QueueStats:
+        """Return a summary of the activity of the queue"""
+        with self._lock:
+            stats = attr.evolve(self._stats, depth=len(self._items))
+            if stats.gets:
+                stats.mean_wait = self._total_wait / stats.gets
+        return stats
+
+
+def _wake(future) -> None:
+    """Wake up a coroutine waiting to put a statement"""
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,216 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Replay recorded sessions against new shells
+
+A session can be loaded from a file with one statement per line, or from a
+``cmdsh.store.RecordStore``, and replayed against one or more shells, each on it's
+own thread:
+
+    session = cmdsh.replay.load_store(store, since=time.time() - 86400)
+    report = cmdsh.replay.Replay(MyShell, session, shells=4, speed=None).run()
+    print(report.format())
+
+With ``speed=None`` statements are replayed as fast as possible. Otherwise they
+are replayed with the gaps between them in the original session, divided by
+``speed``. The report summarizes the throughput of all the shells, and the
+latency of each command.
+"""
+
+import threading
+import time
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import attr
+
+from .utils import percentile
+
+# a statement to replay, and the time it started in the original session, if known
+Entry = Tuple[str, Optional[float]]
+
+
+def load_file(path: str, encoding: str = 'utf-8') -> List[Entry]:
+    """Load a session from a file with one statement on each line"""
+    with open(path, encoding=encoding) as file:
+        return [(line.rstrip('\n'), None) for line in file if line.strip()]
+
+
+def load_store(store, **kwargs) -> List[Entry]:
+    """Load a session from a record store
+
+    Keyword arguments are passed to ``store.query()`` to select the records.
+    """
+    return [(record.statement.raw, record.started) for record in store.query(**kwargs)]
+
+
+@attr.s
+class ReplayReport:
+    """The statistics from replaying a session"""
+    # the number of statements executed, and how many of them raised exceptions
+    statements = attr.ib(default=0)
+    errors = attr.ib(default=0)
+    # the number of seconds from the start of the replay until the last shell finished
+    elapsed = attr.ib(default=0.0)
+    # command name -> sorted list of latencies in seconds
+    latencies = attr.ib(default=attr.Factory(dict))
+
+    @property
+    def throughput(self) -> float:
+        """Statements per second, for all of the shells together"""
+        return self.statements / self.elapsed if self.elapsed else 0.0
+
+    def summary(self, percentiles=(50, 90, 99)) -> Dict[str, Dict[str, float]]:
+        """Summarize the latencies of each command
+
+        Returns a dict of command names to dicts with the number of times it
+        was executed, each of the requested percentiles, and the maximum latency.
+        """
+        summary = {}
+        for command, latencies in self.latencies.items():
+            stats = {'count': len(latencies)}
+            for pct in percentiles:
+                stats['p{}'.format(pct)] = percentile(latencies, pct)
+            stats['max'] = latencies[-1]
+            summary[command] = stats
+        return summary
+
+    def format(self) -> str:
+        """Format the report as a table, with latencies in milliseconds"""
+        lines = [
+            '{} statements, {} errors in {:.3f} seconds, {:.1f} statements/second'.format(
+                self.statements, self.errors, self.elapsed, self.throughput,
+            ),
+            '{:<20} {:>8} {:>10} {:>10} {:>10} {:>10}'.format(
+                'command', 'count', 'p50', 'p90', 'p99', 'max',
+            ),
+        ]
+        for command, stats in sorted(self.summary().items()):
+            lines.append('{:<20} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                command, stats['count'], stats['p50'] * 1000, stats['p90'] * 1000,
+                stats['p99'] * 1000, stats['max'] * 1000,
+            ))
+        return '\n'.join(lines)
+
+
+class Replay:
+    """Replay a session against one or more new shells
+
+    factory
+        a callable which returns a new shell, like a ``Shell`` subclass or the
+        ``clone`` method of a template shell
+
+    session
+        a list of (statement, started) tuples, from ``load_file()`` or
+        ``load_store()``
+
+    shells
+        the number of shells which each replay the whole session concurrently
+
+    speed
+        None to replay as fast as possible, or how many times faster than the
+        original session to replay it. Entries without a start time are replayed
+        as fast as possible
+
+    quiet
+        discard the output of the shells
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(
+            self,
+            factory: Callable,
+            session: List[Entry],
+            shells: int = 1,
+            speed: Optional[float] = None,
+            quiet: bool = True,
+    ):
+        self.factory = factory
+        self.session = session
+        self.shells = shells
+        self.speed = speed
+        self.quiet = quiet
+
+    def run(self) -> ReplayReport:
+        """Replay the session and return a report"""
+        shells = [self._make_shell() for _ in range(self.shells)]
+        results = [None] * self.shells
+        barrier = threading.Barrier(self.shells + 1)
+        threads = [
+            threading.Thread(target=self._replay, args=(shell, barrier, results, num))
+            for num, shell in enumerate(shells)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        report = ReplayReport(elapsed=elapsed)
+        for statements, errors, latencies in results:
+            report.statements += statements
+            report.errors += errors
+            for command, values in latencies.items():
+                report.latencies.setdefault(command, []).extend(values)
+        for values in report.latencies.values():
+            values.sort()
+        return report
+
+    def _make_shell(self):
+        """Create a shell, silenced if requested"""
+        shell = self.factory()
+        if self.quiet:
+            shell.wout = _discard
+            shell.werr = _discard
+        return shell
+
+    def _replay(self, shell, barrier, results, num) -> None:
+        """Replay the session against a single shell, on it's own thread"""
+        statements = 0
+        errors = 0
+        latencies = {}
+        origin = next((started for _, started in self.session if started is not None), None)
+        clock = time.perf_counter
+        barrier.wait()
+        begin = clock()
+        for line, started in self.session:
+            if self.speed and started is not None:
+                delay = begin + (started - origin) / self.speed - clock()
+                if delay > 0:
+                    time.sleep(delay)
+            words = line.split(None, 1)
+            command = words[0] if words else ''
+            before = clock()
+            try:
+                shell.do(line)
+            except Exception:  # pylint: disable=broad-except
+                # includes CommandNotFound
+                errors += 1
+            latencies.setdefault(command, []).append(clock() - before)
+            statements += 1
+        results[num] = (statements, errors, latencies)
+
+
+def _discard(_data: str) -> None:
+    """Throw away output"""
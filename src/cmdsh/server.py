@@ -0,0 +1,254 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Serve shells to many concurrent clients over a socket
+
+A ``ShellServer`` listens on a Unix domain socket or a TCP port. Every
+connection gets a new shell created by calling a factory you provide, so each
+client has it's own history, input queue, and module state. All of the
+sessions share a single asyncio event loop:
+
+    import cmdsh
+    import cmdsh.server
+
+    cmdsh.server.serve(cmdsh.Shell, path='/tmp/cmdsh.sock')
+
+The output a shell writes with ``wout()`` and ``werr()`` is sent to the
+connection which the shell is serving.
+
+Commands are still ordinary synchronous ``do_*`` methods, and while a command
+runs it has the event loop to itself. Sessions interleave between statements,
+so this works well for many clients running short commands.
+"""
+
+import asyncio
+
+from .models import CommandNotFound
+
+
+class Session:
+    """A single client connection and the shell which serves it"""
+    # pylint: disable=too-few-public-methods
+    def __init__(self, server, shell, reader, writer):
+        self.server = server
+        self.shell = shell
+        self.reader = reader
+        self.writer = writer
+        self.statements = 0
+        # route the output of the shell to this connection
+        shell.wout = self.write
+        shell.werr = self.write
+
+    def write(self, data: str) -> None:
+        """Queue data to be sent to the client"""
+        self.writer.write(data.encode(self.server.encoding, errors='replace'))
+
+    async def readline(self):
+        """Read a line of input from the client, enforcing the idle timeout
+
+        Returns None when the client goes away or a limit is exceeded.
+        """
+        try:
+            data = await asyncio.wait_for(
+                self.reader.readline(),
+                timeout=self.server.idle_timeout,
+            )
+        except asyncio.TimeoutError:
+            self.write('session idle too long\n')
+            return None
+        except ValueError:
+            # raised by the stream reader when a line is longer than it's limit
+            self.write('line too long\n')
+            return None
+        if not data:
+            return None
+        return data.decode(self.server.encoding, errors='replace').rstrip('\r\n')
+
+    async def run(self):
+        """Run the command loop for this session"""
+        shell = self.shell
+        for func in shell._preloop_hooks:
+            func()
+        while True:
+            if self.server.send_prompt:
+                self.write(shell.render_prompt())
+            await self.writer.drain()
+
+            line = await self.readline()
+            if line is None:
+                break
+            if line == '':
+                continue
+
+            if self.server.max_statements and self.statements >= self.server.max_statements:
+                self.write('statement limit reached\n')
+                break
+            self.statements += 1
+
+            try:
+                result = shell.do(line)
+                shell.render_payloads()
+                if result and result.stop:
+                    break
+            except CommandNotFound as err:
+                shell.render_payloads()
+                shell.command_not_found(err.statement)
+
+        for func in shell._postloop_hooks:
+            func()
+
+
+class ShellServer:
+    """Create a shell for each connection and run them all on one event loop
+
+    factory
+        a callable which returns a new, fully configured shell. Usually this
+        is a ``cmdsh.Shell`` subclass
+
+    max_sessions
+        the maximum number of concurrent sessions. Connections beyond this limit
+        are sent an error message and closed
+
+    max_line_length
+        the longest line of input, in bytes, that a session will accept. A longer
+        line ends the session
+
+    idle_timeout
+        seconds to wait for input before ending a session, None to wait forever
+
+    max_statements
+        the number of statements a session may execute before it is ended, None
+        for no limit
+
+    send_prompt
+        if True, send the rendered prompt to the client before reading each line
+    """
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self,
+            factory,
+            max_sessions=1000,
+            max_line_length=65536,
+            idle_timeout=None,
+            max_statements=None,
+            send_prompt=True,
+            encoding='utf-8',
+    ):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.max_line_length = max_line_length
+        self.idle_timeout = idle_timeout
+        self.max_statements = max_statements
+        self.send_prompt = send_prompt
+        self.encoding = encoding
+        self.sessions = set()
+        self._server = None
+
+    async def start_unix(self, path: str):
+        """Start listening for connections on a Unix domain socket"""
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection,
+            path=path,
+            limit=self.max_line_length,
+        )
+        return self._server
+
+    async def start_tcp(self, host: str = '127.0.0.1', port: int = 0):
+        """Start listening for connections on a TCP port
+
+        The default host only accepts connections from the local machine.
+        """
+        self._server = await asyncio.start_server(
+            self._handle_connection,
+            host=host,
+            port=port,
+            limit=self.max_line_length,
+        )
+        return self._server
+
+    @property
+    def sockets(self):
+        """The sockets the server is listening on"""
+        if self._server:
+            return self._server.sockets
+        return []
+
+    def close(self) -> None:
+        """Stop accepting connections and disconnect all sessions"""
+        if self._server:
+            self._server.close()
+        for session in list(self.sessions):
+            session.writer.close()
+
+    async def wait_closed(self):
+        """Wait until the server is closed"""
+        if self._server:
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        """Create and run a session for a new connection"""
+        if len(self.sessions) >= self.max_sessions:
+            writer.write('too many sessions\n'.encode(self.encoding))
+            await writer.drain()
+            writer.close()
+            return
+
+        session = Session(self, self.factory(), reader, writer)
+        self.sessions.add(session)
+        try:
+            await session.run()
+        except Exception as err:  # pylint: disable=broad-except
+            # end this session but keep serving all the others
+            session.write('{}: {}\n'.format(type(err).__name__, err))
+        finally:
+            self.sessions.discard(session)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+
+def serve(factory, path: str = None, host: str = '127.0.0.1', port: int = None, **kwargs) -> None:
+    """Serve shells created by factory until interrupted
+
+    Listen on the Unix domain socket at ``path`` if given, otherwise on ``host``
+    and ``port``. Any additional keyword arguments are passed to ``ShellServer``.
+    """
+    if path is None and port is None:
+        raise ValueError('either path or port must be given')
+    server = ShellServer(factory, **kwargs)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        if path is not None:
+            loop.run_until_complete(server.start_unix(path))
+        else:
+            loop.run_until_complete(server.start_tcp(host, port))
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
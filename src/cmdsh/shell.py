@@ -29,14 +29,28 @@ A python library for creating interactive language shells.
 """
 # pylint: disable=too-many-instance-attributes
 
+import concurrent.futures
+import copy
 import inspect
+import itertools
 import sys
+import time
+import types
 
-from typing import Any, Callable, Optional
+from collections.abc import Iterator
+from typing import Any, Callable, Iterable, List, Optional, Union
 
+import attr
+
+from . import snapshots
+from .cancellation import CancellationToken, CommandCancelled, CommandTimeout, Deadline
+from .cancellation import EXIT_INTERRUPTED, EXIT_TIMEOUT
 from . import utils
-from .models import Statement, Result, Record, CommandNotFound
+from .models import Statement, BytesStatement, Result, Record
+from .models import CommandNotFound, ModuleDependencyError
 from .personalities import SimplePersonality
+from .suggestions import DeletionIndex
+from .tables import TableWriter
 
 
 class Shell:
@@ -48,11 +62,33 @@ class Shell:
     input_queue
         a list of input, as if it came from the user. The cmdloop pops items
         from this list before reading stdin parser the parser class to use
-        to parse input into a Statement object
+        to parse input into a Statement object. Use a ``cmdsh.queues.InputQueue``
+        when other threads put input in the queue
 
     prompt
         a static prompt to output before accepting user input
 
+    continuation_prompt
+        a static prompt to output before accepting another line of input for
+        a statement which spans multiple lines
+
+    timeout
+        the number of seconds any command may run before it is cancelled, or
+        None for no limit. Use the ``cmdsh.timeout`` decorator to give a single
+        command a different limit
+
+    cancel_token
+        while a command is running, the ``CancellationToken`` which tells it
+        when it has been cancelled
+
+    current_record
+        while ``do()`` is executing a statement, the ``Record`` which will be
+        added to the history, so hooks can attach information to it
+
+    record_store
+        if not None, a ``cmdsh.store.RecordStore`` which every record added to the
+        history is also written to
+
     Methods:
 
     eof()
@@ -67,16 +103,32 @@ class Shell:
 
     def __init__(self, personality=SimplePersonality()):
         # initialize private variables
+        self._command_generation = 0
         self._preloop_hooks = []
         self._postloop_hooks = []
+        self._preparse_hooks = []
         self._postparse_hooks = []
         self._postexecute_hooks = []
         self._modules = {}
+        self._lazy_modules = {}
+        # payloads from the last call to do() which haven't been rendered
+        self._payloads = []
+        # index of command names used to suggest commands, and the
+        # command generation it was built for
+        self._suggestion_index = None
+        self._suggestion_generation = None
+        # true if the index may be shared with a clone of this shell
+        self._suggestion_shared = False
 
         # public attributes get sensible defaults
         self.input_queue = []
         self.history = []
         self.prompt = 'cmdsh: '
+        self.continuation_prompt = '> '
+        self.timeout = None
+        self.cancel_token = None
+        self.current_record = None
+        self.record_store = None
 
         # set and bind the personality
         self._personality = personality
@@ -94,18 +146,21 @@ class Shell:
 
         # enter the command loop
         while True:
-            if self.input_queue:
-                # we have enqueued commands, use the first one
-                line = self.input_queue.pop(0)
-            else:
-                try:
-                    line = input(self.render_prompt())
-                except EOFError:
-                    result = self.eof()
-                    if result.stop:
-                        break
-                    else:
-                        continue
+            try:
+                line = self._read_line(self.render_prompt())
+                parser = self._personality.parser
+                if getattr(parser, 'multiline', False):
+                    line = self._read_continuation(parser.scanner(), line)
+            except EOFError:
+                if getattr(self.input_queue, 'wait', False):
+                    # the queue is our only source of input, and it's been closed
+                    result = Result(exit_code=0, stop=True)
+                    break
+                result = self.eof()
+                if result.stop:
+                    break
+                else:
+                    continue
 
             if line == '':
                 continue
@@ -113,10 +168,12 @@ class Shell:
             # Run the command along with all associated pre and post hooks
             try:
                 result = self.do(line)
+                self.render_payloads()
                 if result.stop:
                     break
             except CommandNotFound as err:
-                self.werr("{}: command not found\n".format(err.statement.command))
+                self.render_payloads()
+                self.command_not_found(err.statement)
 
         # run all the registered postloop hooks
         for func in self._postloop_hooks:
@@ -124,47 +181,314 @@ class Shell:
 
         return result
 
-    def do(self, line: str) -> Result:
+    def _read_line(self, prompt: str) -> str:
+        """Get the next line of input from the input queue, or from the user"""
+        if getattr(self.input_queue, 'wait', False):
+            # the queue is our only source of input
+            return self.input_queue.get()
+        if self.input_queue:
+            # we have enqueued commands, use the first one
+            return self.input_queue.pop(0)
+        return input(prompt)
+
+    def _read_continuation(self, scanner, line: str) -> str:
+        """Read more lines until scanner says we have a complete statement"""
+        while not scanner.feed_line(line):
+            line = self._read_line(self.render_continuation_prompt())
+        return scanner.text
+
+    def do(self, line: Union[str, bytes, memoryview]) -> Result:
         """Parse input and execute the statement, including all applicable hooks.
 
+        Input may be ``bytes``, ``bytearray``, or a ``memoryview``. If the parser can
+        parse bytes, a ``BytesStatement`` is parsed without copying or decoding the
+        input, otherwise the input is decoded as UTF-8.
+
+        If the parser splits the input into a compound statement, each statement
+        is executed in turn, honoring the short-circuit behavior of the ``&&`` and
+        ``||`` control operators. A statement following ``|`` gets the payload of
+        the previous result as it's ``input``. Like in a posix shell, ``|`` binds
+        tighter than ``&&`` and ``||``, so they skip or run a whole pipeline. A
+        single record is added to the history, and the result of the last
+        statement executed is returned.
+
+        When a pipeline ends with ``;``, ``&&`` or ``||``, a payload it didn't pipe
+        is rendered with ``render_payload()`` right away, so it's output comes before
+        the output of the statements which follow. The payload of the last pipeline
+        isn't rendered. Call ``render_payloads()`` to render it.
+
         Raises any exceptions thrown by hook methods or by the command function
         """
         # pylint: disable=invalid-name
 
-        # for func in self._preparse_hooks:
-        #     line = func(line)
+        parser = self._personality.parser
+        if not isinstance(line, str) and not getattr(parser, 'parses_bytes', False):
+            line = str(line, 'utf-8')
 
-        stmt = Statement(line)
-        stmt = self._personality.parser.parse(stmt)
-        for func in self._postparse_hooks:
-            stmt = func(stmt)
+        if isinstance(line, str):
+            for func in self._preparse_hooks:
+                line = func(line)
 
-        record = Record(statement=stmt)
+        if not isinstance(line, str):
+            statements = [parser.parse(BytesStatement(line))]
+        elif hasattr(parser, 'parse_list'):
+            statements = parser.parse_list(Statement(line))
+        else:
+            statements = [parser.parse(Statement(line))]
+
+        record = Record()
+        if len(statements) > 1:
+            argv = []
+            for stmt in statements:
+                if stmt.operator:
+                    argv.append(stmt.operator)
+                argv.extend(stmt.argv)
+            record.statement = Statement(raw=line, argv=argv)
+
+        result = None
+        # True once the payload of result has been piped or rendered
+        handled = False
+        # True if the pipeline the current statement is part of is being skipped
+        skipped = False
+        self._payloads = []
+        # a command may call do() itself, so put the outer record back when we're done
+        previous_record = self.current_record
+        self.current_record = record
+        record.started = time.time()
+        try:
+            for stmt in statements:
+                if stmt.operator != '|':
+                    # && and || apply to the whole pipeline which starts here
+                    skipped = not self._should_execute(stmt, result)
+                if skipped:
+                    continue
+                if stmt.operator == '|':
+                    stmt.input = result.payload if result else None
+                elif result is not None and result.payload is not None:
+                    # render it now, before anything the next pipeline writes
+                    self.render_payload(result.payload)
+                handled = True
+                for func in self._postparse_hooks:
+                    stmt = func(stmt)
+                if record.statement is None:
+                    record.statement = stmt
+                result = self._execute(stmt)
+                handled = False
+                record.statements.append(stmt)
+                if result and (result.stop or result.exit_code == EXIT_INTERRUPTED):
+                    break
+        finally:
+            self.current_record = previous_record
+            if result is not None and result.payload is not None:
+                if not handled:
+                    self._payloads.append(result.payload)
+                record.result = attr.evolve(result, payload=None)
+            else:
+                record.result = result
+            if record.statements:
+                record.finished = time.time()
+                for index, stmt in enumerate(record.statements):
+                    # like the payload of the result, don't keep piped payloads alive
+                    stmt.input = None
+                    if isinstance(stmt, BytesStatement) and not isinstance(stmt.raw, bytes):
+                        # the caller may reuse it's buffer, so keep a copy
+                        copied = stmt.copy()
+                        if record.statement is stmt:
+                            record.statement = copied
+                        record.statements[index] = copied
+                self.history.append(record)
+                if self.record_store is not None:
+                    self.record_store.add(record)
+        return result
 
+    def _should_execute(self, stmt: Statement, previous: Optional[Result]) -> bool:
+        """Apply the control operator of a statement to the result of the previous one"""
+        # pylint: disable=no-self-use
+        succeeded = previous is None or previous.exit_code == 0
+        if stmt.operator == '&&':
+            return succeeded
+        if stmt.operator == '||':
+            return not succeeded
+        # ; always executes
+        return True
+
+    def _execute(self, stmt: Statement) -> Result:
+        """Execute a single parsed statement and run the post-execute hooks
+
+        The command is cancelled if it runs longer than it's timeout, or if the user
+        interrupts it, and a result with the appropriate exit code is returned.
+        """
         func = self._command_func(stmt.command)
-        if func:
-            result = func(stmt)
+        if not func:
+            raise CommandNotFound(stmt)
+        # a command may call do() itself, so put the outer token back when we're done
+        previous_token = self.cancel_token
+        self.cancel_token = CancellationToken()
+        seconds = getattr(func, 'cmdsh_timeout', self.timeout)
+        try:
+            if seconds:
+                with Deadline(seconds, self.cancel_token):
+                    result = func(stmt)
+            else:
+                result = func(stmt)
+        except CommandTimeout:
+            self.werr('{}: timed out\n'.format(stmt.command))
+            result = Result(exit_code=EXIT_TIMEOUT)
+        except (CommandCancelled, KeyboardInterrupt):
+            self.werr('{}: interrupted\n'.format(stmt.command))
+            result = Result(exit_code=EXIT_INTERRUPTED)
+        finally:
+            self.cancel_token = previous_token
+        for hook in self._postexecute_hooks:
+            result = hook(stmt, result)
+        return result
 
-            for func in self._postexecute_hooks:
-                result = func(stmt, result)
+    def clone(self) -> 'Shell':
+        """Create a new shell configured exactly like this one
+
+        Binding the personality and loading modules can be expensive, so you
+        can configure a shell once and use it as a template to quickly create
+        as many new shells as you need. The personality isn't bound again, and
+        modules aren't loaded again.
+
+        The new shell has an empty history and input queue. Methods bound to
+        this shell by the personality or by modules are rebound to the new shell,
+        and the lists, dicts, and sets which hold hooks and module data are copied,
+        so changes to the new shell don't affect this one.
+
+        If a loaded module has a ``clone(shell)`` method, it is called with the new
+        shell, so the module can reinitialize any other private state.
+        """
+        new = copy.copy(self)
+        for name, value in self.__dict__.items():
+            if name not in ('history', 'input_queue'):
+                new.__dict__[name] = self._clone_value(value, new)
+        empty_copy = getattr(self.input_queue, 'empty_copy', None)
+        new.input_queue = empty_copy() if empty_copy else []
+        new.history = []
+        # the index of commands is copied by whichever shell changes it first
+        self._suggestion_shared = new._suggestion_shared = self._suggestion_index is not None
+
+        for module in new._modules.values():
+            func = getattr(module, 'clone', None)
+            if callable(func):
+                func(new)
+        return new
+
+    def snapshot(self, path: str) -> None:
+        """Save the history, input queue, and module state of this shell to a file
+
+        Modules which implement ``snapshot()`` and ``restore()`` methods have their
+        private state saved too. See ``cmdsh.snapshots`` for details.
+        """
+        snapshots.write_snapshot(self, path)
 
-            self.history.append(record)
+    def restore(self, path: str) -> None:
+        """Restore the history, input queue, and module state from a snapshot file
 
-            return result
-        raise CommandNotFound(stmt)
+        Restore into a shell configured the same way as the one which created
+        the snapshot. Records in the history are read from the file as they are
+        accessed, so restoring is fast even with a very long history.
+        """
+        snapshots.read_snapshot(self, path)
+
+    def _clone_value(self, value: Any, new: 'Shell') -> Any:
+        """Copy an attribute value for a clone of this shell"""
+        if isinstance(value, types.MethodType) and value.__self__ is self:
+            return types.MethodType(value.__func__, new)
+        if isinstance(value, (list, dict, set)):
+            # copy.copy() keeps subclasses like defaultdict and Counter intact
+            value = copy.copy(value)
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    value[index] = self._clone_value(item, new)
+            elif isinstance(value, dict):
+                for key, item in list(value.items()):
+                    value[key] = self._clone_value(item, new)
+        return value
 
     def _command_func(self, command: str) -> Optional[Callable]:
-        """Find the function to call for a given command"""
+        """Find the function to call for a given command
+
+        If the command is provided by a module registered with ``register_lazy_module()``,
+        the module is loaded.
+        """
         func_name = 'do_' + command
         func = None
         try:
             func = getattr(self, func_name)
-            if not callable(func):
-                func = None
         except AttributeError:
-            pass
+            if self._load_lazy_module(command):
+                func = getattr(self, func_name, None)
+        if not callable(func):
+            func = None
         return func
 
+    @property
+    def command_generation(self) -> int:
+        """A number which changes whenever commands are added to or removed from the shell
+
+        Use this to tell when something computed from the list of commands, like
+        an index of help, is out of date.
+
+        It changes when a command is bound with ``utils.rebind_method()`` or
+        ``utils.bind_function()``, when modules are loaded, and when a lazy module
+        is registered. If you add or remove a ``do_`` attribute any other way, call
+        ``commands_changed()``.
+        """
+        return self._command_generation
+
+    def commands_changed(self) -> None:
+        """Tell the shell that commands have been added or removed"""
+        self._command_generation += 1
+
+    def commands(self) -> List[str]:
+        """Return a sorted list of the names of all the commands in this shell
+
+        Commands provided by modules registered with ``register_lazy_module()`` are
+        included, without loading those modules.
+        """
+        names = set(self._lazy_modules.keys())
+        for name in dir(self):
+            if name.startswith('do_') and callable(getattr(self, name, None)):
+                names.add(name[3:])
+        return sorted(names)
+
+    def suggest_commands(self, command: str, max_distance: Optional[int] = None,
+                         limit: int = 3) -> List[str]:
+        """Return the names of up to limit commands which are spelled like command
+
+        Commands are found by Levenshtein edit distance, closest first. If
+        max_distance isn't given, names which are one edit away are suggested for
+        commands shorter than four characters, and two edits away otherwise.
+
+        The index of command names is built the first time it's needed. After
+        that, only the commands added or removed since it was last used are
+        changed in the index, so this stays fast with thousands of commands. The
+        index is shared with clones of this shell until one of them changes it.
+        """
+        if max_distance is None:
+            max_distance = 1 if len(command) < 4 else 2
+        index = self._suggestion_index
+        if index is None:
+            index = DeletionIndex(self.commands())
+        elif self._suggestion_generation != self._command_generation:
+            names = set(self.commands())
+            added = names - index.words
+            removed = index.words - names
+            if (added or removed) and self._suggestion_shared:
+                # copy so clones sharing the index aren't affected
+                index = index.copy()
+                self._suggestion_shared = False
+            for name in sorted(added):
+                index.add(name)
+            for name in removed:
+                index.remove(name)
+        self._suggestion_index = index
+        self._suggestion_generation = self._command_generation
+        matches = index.search(command, max_distance)
+        return [name for _, name in matches if name != command][:limit]
+
     #
     # modules
     #
@@ -183,13 +507,145 @@ class Shell:
     def load_module(self, module: Any) -> None:
         """Load an instantiated module object
 
-        If the module has already been loaded, it will not be loaded again
+        If the module has already been loaded, it will not be loaded again. Any
+        modules it requires are loaded first.
         """
-        if inspect.isclass(module):
-            module = module()
-        if not self.is_module_loaded(module):
+        self.load_modules([module])
+
+    def load_modules(self, modules: Iterable[Any], max_workers: Optional[int] = None) -> None:
+        """Load several modules, and any modules they require, in dependency order
+
+        A module may have these optional attributes:
+
+        requires
+            a sequence of module classes which must be loaded before this one
+        provides
+            a sequence of the names of attributes the module adds to the shell
+        prepare()
+            a method with expensive setup, like reading files or connecting to
+            a server, which doesn't touch the shell
+
+        Raises ``ModuleDependencyError`` if the requirements are circular, or if a
+        module provides an attribute another module, or the shell instance, already
+        has. Methods defined by the class of the shell may be replaced.
+
+        The ``prepare()`` methods of modules which don't depend on each other are
+        called concurrently, using a thread pool with up to max_workers threads.
+        Then each module is loaded, one at a time.
+        """
+        ordered = self._resolve_modules(modules)
+        self._check_provides(ordered)
+        self._prepare_modules(ordered, max_workers)
+        for module in ordered:
             module.load(self)
             self._modules[module.__class__] = module
+        if ordered:
+            self.commands_changed()
+
+    def _resolve_modules(self, modules: Iterable[Any]) -> List[Any]:
+        """Instantiate modules and their requirements, and sort them into load order"""
+        ordered = []
+        visiting = []
+        visited = set()
+
+        def visit(module):
+            klass = module if inspect.isclass(module) else module.__class__
+            if klass in self._modules or klass in visited:
+                return
+            if klass in visiting:
+                cycle = visiting[visiting.index(klass):] + [klass]
+                raise ModuleDependencyError('circular module requirements: {}'.format(
+                    ' -> '.join(item.__name__ for item in cycle)
+                ))
+            visiting.append(klass)
+            for required in getattr(module, 'requires', ()):
+                visit(required)
+            visiting.pop()
+            visited.add(klass)
+            ordered.append(module() if inspect.isclass(module) else module)
+
+        for module in modules:
+            visit(module)
+        return ordered
+
+    def _check_provides(self, modules: List[Any]) -> None:
+        """Make sure modules don't provide attributes which collide
+
+        Methods defined by the shell's class, like a ``do_exit()`` in a subclass,
+        don't collide: the module's attribute replaces them, as it always has. Only
+        attributes set on the shell itself, like those set by a module which is
+        already loaded, do.
+        """
+        providers = {}
+        for module in modules:
+            for name in getattr(module, 'provides', ()):
+                if name in providers:
+                    raise ModuleDependencyError('{} and {} both provide {}'.format(
+                        providers[name].__class__.__name__,
+                        module.__class__.__name__,
+                        name,
+                    ))
+                if name in self.__dict__:
+                    raise ModuleDependencyError(
+                        '{} provides {}, which the shell already has'.format(
+                            module.__class__.__name__,
+                            name,
+                        )
+                    )
+                providers[name] = module
+
+    def _prepare_modules(self, modules: List[Any], max_workers: Optional[int]) -> None:
+        """Call the prepare() methods of modules, concurrently when we can"""
+        # modules in the same level don't depend on each other
+        levels = {}
+        for module in modules:
+            levels[module.__class__] = 1 + max(
+                (levels.get(required, 0) for required in getattr(module, 'requires', ())),
+                default=0,
+            )
+        waves = {}
+        for module in modules:
+            if callable(getattr(module, 'prepare', None)):
+                waves.setdefault(levels[module.__class__], []).append(module)
+
+        for level in sorted(waves):
+            wave = waves[level]
+            if len(wave) == 1:
+                wave[0].prepare()
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    for future in [executor.submit(module.prepare) for module in wave]:
+                        future.result()
+
+    def register_lazy_module(self, module: Any, commands: Iterable[str]) -> None:
+        """Register a module to be loaded the first time one of it's commands is used
+
+        Instead of paying the cost of importing and loading a module when the shell
+        starts, tell the shell which commands the module provides. The module is
+        loaded the first time one of those commands is executed.
+
+        module can be anything ``load_module()`` accepts, or a string naming a
+        module class, like ``package.module:ClassName``, which isn't imported until
+        the module is loaded.
+        """
+        for command in commands:
+            self._lazy_modules[command] = module
+        self.commands_changed()
+
+    def _load_lazy_module(self, command: str) -> bool:
+        """Load the lazy module which provides command
+
+        Returns False if no lazy module provides command.
+        """
+        module = self._lazy_modules.get(command)
+        if module is None:
+            return False
+        for name in [name for name, value in self._lazy_modules.items() if value is module]:
+            del self._lazy_modules[name]
+        if isinstance(module, str):
+            module = utils.import_object(module)
+        self.load_module(module)
+        return True
 
     #
     # hooks
@@ -206,6 +662,17 @@ class Shell:
         utils.validate_callable_return(func, None)
         self._postloop_hooks.append(func)
 
+    def register_preparse_hook(self, func: Callable[[str], str]) -> None:
+        """Register a function to be called with the raw input before it is parsed.
+
+        The function must return the input, which it may have modified. Pre-parse
+        hooks are not called for bytes input which is parsed without being decoded.
+        """
+        utils.validate_callable_param_count(func, 1)
+        utils.validate_callable_argument(func, 1, str)
+        utils.validate_callable_return(func, str)
+        self._preparse_hooks.append(func)
+
     def register_postparse_hook(self, func: Callable[[Statement], Statement]) -> None:
         """Register a method to be called after parsing input but before the command execution."""
         utils.validate_callable_param_count(func, 1)
@@ -234,6 +701,52 @@ class Shell:
         # pylint: disable=no-self-use
         sys.stderr.write(data)
 
+    def render_payloads(self) -> None:
+        """Render the payload of the last pipeline from the last call to ``do()``"""
+        payloads, self._payloads = self._payloads, []
+        for payload in payloads:
+            self.render_payload(payload)
+
+    def render_payload(self, payload: Any) -> None:
+        """Render the payload of a result as text and write it with ``wout()``
+
+        Strings are written as is, and buffers are decoded as UTF-8. A dict, or a
+        sequence or iterator of dicts, is written as a table using the keys of the
+        first dict as the columns. The items of any other sequence or iterator are
+        written one per line, and anything else is converted with ``str()``.
+
+        Override this method to render payloads differently.
+        """
+        if payload is None:
+            return
+        if isinstance(payload, str):
+            text = payload
+        elif isinstance(payload, (bytes, bytearray, memoryview)):
+            text = str(payload, 'utf-8', 'replace')
+        elif isinstance(payload, dict):
+            with TableWriter(self.wout, ['key', 'value']) as table:
+                table.writerows(payload.items())
+            return
+        elif isinstance(payload, (list, tuple, Iterator)):
+            items = iter(payload)
+            first = next(items, None)
+            if first is None:
+                return
+            items = itertools.chain([first], items)
+            if isinstance(first, dict):
+                columns = list(first)
+                with TableWriter(self.wout, columns) as table:
+                    table.writerows([row.get(column) for column in columns] for row in items)
+            else:
+                for item in items:
+                    self.wout('{}\n'.format(item))
+            return
+        else:
+            text = str(payload)
+        if text and not text.endswith('\n'):
+            text += '\n'
+        self.wout(text)
+
     def render_prompt(self) -> str:
         """Generate the prompt which is displayed before user input.
 
@@ -242,6 +755,13 @@ class Shell:
         """
         return self.prompt
 
+    def render_continuation_prompt(self) -> str:
+        """Generate the prompt which is displayed before a continuation line of input.
+
+        Like ``render_prompt()``, subclasses, modules, or personalities can over-ride this.
+        """
+        return self.continuation_prompt
+
     #
     # behaviors - a personality or module may over-ride these methods
     # to customize the behavior of the shell
@@ -259,3 +779,14 @@ class Shell:
         else:
             result = Result(exit_code=0, stop=True)
         return result
+
+    def command_not_found(self, statement: Statement) -> None:
+        """This method is called by the command loop when a statement contains an unknown command.
+
+        The default implementation writes an error message using ``werr()``,
+        followed by the commands from ``suggest_commands()``, if there are any.
+        """
+        self.werr("{}: command not found\n".format(statement.command))
+        suggestions = self.suggest_commands(statement.command)
+        if suggestions:
+            self.werr("did you mean: {}?\n".format(', '.join(suggestions)))
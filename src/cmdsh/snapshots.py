@@ -0,0 +1,222 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Save the state of a shell to a file, and restore it later
+
+A snapshot file contains these sections, in this order:
+
+- the history section, one pickled ``Record`` after another
+- the index section, an array of little-endian 64 bit offsets into the
+  history section, one more than the number of records
+- the state section, a pickled dict containing the input queue, the prompt,
+  and the private state of each module which supports snapshots
+- a trailer with the offsets of the index and state sections, the number
+  of records, and a magic number
+
+Restoring a snapshot reads the state section right away, but the history section
+is memory mapped and records are only unpickled when they are accessed, so
+restoring is fast no matter how long the history is.
+
+Snapshots are pickles. Only restore snapshots you created or otherwise trust.
+
+A module can save and restore it's private state by implementing two methods:
+
+    def snapshot(self, shell) -> Any:
+        '''return a picklable object containing the private state of this module'''
+
+    def restore(self, shell, state: Any) -> None:
+        '''restore the private state of this module from state'''
+"""
+
+import array
+import collections.abc
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+MAGIC = b'CMDSHSN1'
+# index offset, state offset, number of records, magic
+TRAILER = struct.Struct('<QQQ8s')
+
+
+def _module_key(module) -> str:
+    """The key used to store the state of a module in a snapshot"""
+    klass = module.__class__
+    return '{}.{}'.format(klass.__module__, klass.__qualname__)
+
+
+def write_snapshot(shell, path: str) -> None:
+    """Write the state of shell to a snapshot file
+
+    The snapshot is written to a temporary file which then replaces path, so
+    an existing snapshot is never left half written. If writing fails, the
+    temporary file is removed.
+    """
+    modules = {}
+    for module in shell._modules.values():
+        func = getattr(module, 'snapshot', None)
+        if callable(func):
+            modules[_module_key(module)] = func(shell)
+    state = {
+        'prompt': shell.prompt,
+        'input_queue': list(shell.input_queue),
+        'modules': modules,
+    }
+
+    offsets = array.array('Q')
+    tmppath = '{}.tmp'.format(path)
+    try:
+        with open(tmppath, 'wb') as file:
+            offset = 0
+            for record in shell.history:
+                offsets.append(offset)
+                data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                file.write(data)
+                offset += len(data)
+            offsets.append(offset)
+            index_offset = offset
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+            offsets.tofile(file)
+            state_offset = file.tell()
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.write(TRAILER.pack(index_offset, state_offset, len(offsets) - 1, MAGIC))
+        os.replace(tmppath, path)
+    except BaseException:
+        try:
+            os.remove(tmppath)
+        except OSError:
+            pass
+        raise
+
+
+def read_snapshot(shell, path: str) -> None:
+    """Restore the state of shell from a snapshot file
+
+    Module state is only restored for modules which are loaded in shell.
+    """
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(data) < TRAILER.size:
+        raise ValueError('{} is not a cmdsh snapshot'.format(path))
+    index_offset, state_offset, count, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    if magic != MAGIC:
+        raise ValueError('{} is not a cmdsh snapshot'.format(path))
+    state = pickle.loads(data[state_offset:len(data) - TRAILER.size])
+
+    shell.prompt = state['prompt']
+    shell.input_queue.clear()
+    shell.input_queue.extend(state['input_queue'])
+    for module in shell._modules.values():
+        key = _module_key(module)
+        func = getattr(module, 'restore', None)
+        if key in state['modules'] and callable(func):
+            func(shell, state['modules'][key])
+    shell.history = LazyHistory(data, index_offset, count)
+
+
+class LazyHistory(collections.abc.MutableSequence):
+    """A list of records which are unpickled from a snapshot only when accessed
+
+    Records appended after the snapshot was restored are kept in memory. Any other
+    modification reads all the records from the snapshot and turns this into an
+    ordinary list.
+    """
+    def __init__(self, data: mmap.mmap, index_offset: int, count: int):
+        self._data = data
+        self._offsets = array.array('Q')
+        self._offsets.frombytes(data[index_offset:index_offset + (count + 1) * 8])
+        if sys.byteorder != 'little':
+            self._offsets.byteswap()
+        self._count = count
+        self._cache = {}
+        # records added after restore, or all the records once materialized
+        self._items = []
+        self._materialized = False
+
+    def _load(self, index: int):
+        """Unpickle the record at index from the snapshot"""
+        try:
+            return self._cache[index]
+        except KeyError:
+            record = pickle.loads(self._data[self._offsets[index]:self._offsets[index + 1]])
+            self._cache[index] = record
+            return record
+
+    def _materialize(self) -> None:
+        """Read every record from the snapshot and stop using it"""
+        if not self._materialized:
+            self._items = [self._load(index) for index in range(self._count)] + self._items
+            self._materialized = True
+            self._cache = {}
+            self._data.close()
+
+    def __len__(self) -> int:
+        if self._materialized:
+            return len(self._items)
+        return self._count + len(self._items)
+
+    def __getitem__(self, index):
+        if self._materialized:
+            return self._items[index]
+        if isinstance(index, slice):
+            return [self[pos] for pos in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('history index out of range')
+        if index < self._count:
+            return self._load(index)
+        return self._items[index - self._count]
+
+    def __setitem__(self, index, value):
+        self._materialize()
+        self._items[index] = value
+
+    def __delitem__(self, index):
+        self._materialize()
+        del self._items[index]
+
+    def insert(self, index, value):
+        if not self._materialized and index >= len(self):
+            self._items.append(value)
+        else:
+            self._materialize()
+            self._items.insert(index, value)
+
+    def clear(self):
+        if not self._materialized:
+            self._materialized = True
+            self._cache = {}
+            self._data.close()
+        self._items = []
+
+    def __eq__(self, other):
+        if isinstance(other, collections.abc.Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return 'LazyHistory({} records)'.format(len(self))
@@ -0,0 +1,256 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Persistent stores for the records of executed statements
+
+``Shell.history`` keeps records in memory, which is fine for a single session but
+can't be searched after the shell exits. Set ``Shell.record_store`` to a
+``RecordStore`` and every record added to the history is also written to the store:
+
+    shell.record_store = cmdsh.store.SQLiteRecordStore('records.db')
+
+``SQLiteRecordStore`` hands records to a background thread, which writes them in
+batches, each batch in a single transaction, so the shell doesn't wait for the
+disk after each statement. Records can be queried by command and by the time
+they were executed:
+
+    for record in shell.record_store.query(command='deploy', since=time.time() - 86400):
+        print(record.statement.raw, record.result.exit_code, record.duration)
+
+To write records somewhere else, subclass ``RecordStore``.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from typing import List, Optional
+
+from .models import Statement, Result, Record
+
+
+class RecordStore:
+    """The interface for stores of records"""
+    def add(self, record: Record) -> None:
+        """Add a record to the store
+
+        This is called by the shell after each statement is executed, so it
+        should return quickly.
+        """
+        raise NotImplementedError
+
+    def query(
+            self,
+            command: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None,
+            limit: Optional[int] = None,
+    ) -> List[Record]:
+        """Return the records for a command, started between since and until, oldest first"""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Wait until all the records which have been added are stored"""
+
+    def close(self) -> None:
+        """Store any remaining records and release the resources of the store"""
+        self.flush()
+
+
+class SQLiteRecordStore(RecordStore):
+    """Store records in a SQLite database
+
+    path
+        the filename of the database, which is created if it doesn't exist, or
+        ``':memory:'``
+
+    batch_size
+        the most records written in a single transaction
+
+    flush_interval
+        the longest time, in seconds, a record waits before it's written
+    """
+    _SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY,
+            command TEXT,
+            raw TEXT,
+            argv TEXT,
+            exit_code INTEGER,
+            started REAL,
+            finished REAL,
+            duration REAL
+        )''',
+        'CREATE INDEX IF NOT EXISTS records_command ON records (command, started)',
+        'CREATE INDEX IF NOT EXISTS records_started ON records (started)',
+    )
+    _INSERT = (
+        'INSERT INTO records (command, raw, argv, exit_code, started, finished, duration)'
+        ' VALUES (?, ?, ?, ?, ?, ?, ?)'
+    )
+    # put on the queue to make the writer thread write what it has, or to stop it
+    _FLUSH = ('flush',)
+    _STOP = ('stop',)
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # the writer thread and the threads which query share a connection, so
+        # an in-memory database works too
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            for sql in self._SCHEMA:
+                self._conn.execute(sql)
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._write, name='cmdsh-record-store')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, record: Record) -> None:
+        """Queue a record to be written by the background thread"""
+        self._queue.put(self._row(record))
+
+    @staticmethod
+    def _row(record: Record) -> tuple:
+        """Convert a record into a row for the records table
+
+        This copies everything the row needs, so the input which a record refers
+        to may be reused as soon as this returns.
+        """
+        statement = record.statement
+        raw = statement.raw
+        if not isinstance(raw, str):
+            raw = str(bytes(raw), 'utf-8', 'replace')
+        return (
+            statement.command,
+            raw,
+            json.dumps(list(statement.argv)),
+            record.result.exit_code if record.result else None,
+            record.started,
+            record.finished,
+            record.duration,
+        )
+
+    def _is_marker(self, item) -> bool:
+        """Is this item on the queue a marker instead of a row"""
+        return item is self._FLUSH or item is self._STOP
+
+    def _write(self) -> None:
+        """Write queued rows to the database in batches, on a background thread"""
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            try:
+                while len(items) < self.batch_size and not self._is_marker(items[-1]):
+                    items.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            stopping = items[-1] is self._STOP
+            rows = [item for item in items if not self._is_marker(item)]
+            try:
+                if rows:
+                    with self._lock, self._conn:
+                        self._conn.executemany(self._INSERT, rows)
+            except sqlite3.Error as err:
+                self._error = err
+            finally:
+                # the queue counts the items we have taken, including markers
+                for _ in items:
+                    self._queue.task_done()
+
+    def flush(self) -> None:
+        """Wait until all the records which have been added are written
+
+        Raises the last ``sqlite3.Error`` the background thread encountered, if any.
+        """
+        if self._thread.is_alive():
+            self._queue.put(self._FLUSH)
+            self._queue.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        """Raise the last error the background thread encountered"""
+        if self._error:
+            err, self._error = self._error, None
+            raise err
+
+    def query(
+            self,
+            command: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None,
+            limit: Optional[int] = None,
+    ) -> List[Record]:
+        """Return the records for a command, started between since and until, oldest first
+
+        Any records which have been added but not yet written are written first.
+        """
+        self.flush()
+        clauses = []
+        params = []
+        if command is not None:
+            clauses.append('command = ?')
+            params.append(command)
+        if since is not None:
+            clauses.append('started >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('started < ?')
+            params.append(until)
+        sql = 'SELECT raw, argv, exit_code, started, finished FROM records'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY started, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        records = []
+        for raw, argv, exit_code, started, finished in rows:
+            statement = Statement(raw=raw, argv=json.loads(argv))
+            records.append(Record(
+                statement=statement,
+                result=Result(exit_code=exit_code) if exit_code is not None else None,
+                statements=[statement],
+                started=started,
+                finished=finished,
+            ))
+        return records
+
+    def close(self) -> None:
+        """Write any queued records, stop the background thread, and close the database"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._conn.close()
+        self._raise_error()
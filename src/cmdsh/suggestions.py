@@ -0,0 +1,179 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Suggest commands which are spelled like an unknown command
+
+A ``DeletionIndex`` maps every string which can be made by deleting a few
+characters from a word back to that word. Two words within a few edits of each
+other share one of those strings, so finding the words near a misspelled one
+only takes a few dictionary lookups and a Levenshtein check of each candidate,
+however many words are indexed. ``Shell.suggest_commands()`` keeps an index of
+its commands, which is updated with only the commands which were added or
+removed since it was last used.
+"""
+
+import collections
+
+from typing import Iterable, List, Optional, Set, Tuple
+
+
+def levenshtein(first: str, second: str, limit: Optional[int] = None) -> int:
+    """Return the edit distance between two strings
+
+    If limit is given, stop as soon as the distance is known to be more than
+    limit, and return limit + 1.
+    """
+    if first == second:
+        return 0
+    if len(first) < len(second):
+        first, second = second, first
+    if limit is not None and len(first) - len(second) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, char in enumerate(first, 1):
+        current = [row]
+        for col, other in enumerate(second, 1):
+            current.append(min(
+                previous[col] + 1,
+                current[col - 1] + 1,
+                previous[col - 1] + (char != other),
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def deletions(word: str, count: int) -> Set[str]:
+    """Return the strings made by deleting up to count characters from word, including word"""
+    result = {word}
+    current = {word}
+    for _ in range(count):
+        current = {item[:pos] + item[pos + 1:] for item in current for pos in range(len(item))}
+        result.update(current)
+    return result
+
+
+class DeletionIndex:
+    """An index of words, searchable by edit distance
+
+    Words can be found if they are within max_distance edits of the word searched
+    for. Searching further than that compares the word to every word in the index.
+    """
+    def __init__(self, words: Iterable[str] = (), max_distance: int = 2):
+        self.max_distance = max_distance
+        self._words = set()
+        # the number of words of each length
+        self._lengths = collections.Counter()
+        # deleted strings map to a single word, or a set of words if more than one
+        self._deletions = {}
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    @property
+    def words(self) -> frozenset:
+        """The words in the index"""
+        return frozenset(self._words)
+
+    def add(self, word: str) -> None:
+        """Add a word to the index"""
+        if word in self._words:
+            return
+        self._words.add(word)
+        self._lengths[len(word)] += 1
+        deletions_ = self._deletions
+        for key in deletions(word, self.max_distance):
+            entry = deletions_.get(key)
+            if entry is None:
+                deletions_[key] = word
+            elif isinstance(entry, set):
+                entry.add(word)
+            else:
+                deletions_[key] = {entry, word}
+
+    def remove(self, word: str) -> None:
+        """Remove a word from the index"""
+        if word not in self._words:
+            return
+        self._words.discard(word)
+        self._lengths[len(word)] -= 1
+        if not self._lengths[len(word)]:
+            del self._lengths[len(word)]
+        deletions_ = self._deletions
+        for key in deletions(word, self.max_distance):
+            entry = deletions_[key]
+            if isinstance(entry, set):
+                entry.discard(word)
+                if len(entry) == 1:
+                    deletions_[key] = entry.pop()
+            else:
+                del deletions_[key]
+
+    def copy(self) -> 'DeletionIndex':
+        """Return a copy of the index which can be changed independently"""
+        new = DeletionIndex(max_distance=self.max_distance)
+        new._words = set(self._words)
+        new._lengths = collections.Counter(self._lengths)
+        new._deletions = {
+            key: set(entry) if isinstance(entry, set) else entry
+            for key, entry in self._deletions.items()
+        }
+        return new
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Return (distance, word) tuples for the words within max_distance of word
+
+        The closest words are first. The number of deleted strings to look up
+        grows with the square of the length of word, so a word which is much
+        longer or shorter than every word in the index is rejected first.
+        """
+        lengths = self._lengths
+        if not lengths:
+            return []
+        if not min(lengths) - max_distance <= len(word) <= max(lengths) + max_distance:
+            return []
+        if max_distance > self.max_distance:
+            candidates = self._words
+        else:
+            candidates = set()
+            for key in deletions(word, max_distance):
+                entry = self._deletions.get(key)
+                if entry is None:
+                    continue
+                elif isinstance(entry, set):
+                    candidates.update(entry)
+                else:
+                    candidates.add(entry)
+        found = []
+        for candidate in candidates:
+            distance = levenshtein(word, candidate, max_distance)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+        found.sort()
+        return found
@@ -0,0 +1,202 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Write large tables without holding them in memory
+
+A ``TableWriter`` writes rows as they are produced. For text output, the width
+of each column is computed from the first rows, or given up front, and then
+rows are formatted and written in batches through the shell's output:
+
+    with cmdsh.tables.TableWriter(self.wout, ['name', 'size']) as table:
+        for entry in os.scandir('.'):
+            table.writerow((entry.name, entry.stat().st_size))
+
+Numbers are right aligned, and everything else is left aligned. A value wider
+than it's column pushes the rest of the row to the right, unless ``truncate``
+is True.
+
+Use ``fmt='csv'`` or ``fmt='jsonl'`` for output intended for other programs.
+JSON lines output writes each row as an object with the column names as keys.
+"""
+
+import csv
+import io
+import json
+import numbers
+
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+
+class TableWriter:
+    """Stream rows of a table to a write function
+
+    write
+        a function which writes a string, like ``Shell.wout``
+
+    columns
+        the names of the columns
+
+    fmt
+        ``text``, ``csv``, or ``jsonl``
+
+    widths
+        the width of each column of text output. If None, the widths are
+        computed from the header and the first ``sample`` rows
+
+    sample
+        the number of rows to examine before writing text output
+
+    batch
+        the number of rows to write at a time
+
+    truncate
+        shorten text values which are wider than their column
+    """
+    # pylint: disable=too-many-instance-attributes
+    FORMATS = ('text', 'csv', 'jsonl')
+
+    def __init__(
+            self,
+            write: Callable[[str], Any],
+            columns: Sequence[str],
+            fmt: str = 'text',
+            widths: Optional[Sequence[int]] = None,
+            sample: int = 100,
+            batch: int = 1000,
+            truncate: bool = False,
+            separator: str = '  ',
+    ):
+        if fmt not in self.FORMATS:
+            raise ValueError('unknown table format: {}'.format(fmt))
+        self.write = write
+        self.columns = list(columns)
+        self.fmt = fmt
+        self.widths = list(widths) if widths is not None else None
+        self.sample = sample
+        self.batch = batch
+        self.truncate = truncate
+        self.separator = separator
+        self.rows_written = 0
+        # rows waiting to be formatted, and formatted text waiting to be written
+        self._rows = []
+        self._pending = []
+        self._started = False
+        if fmt == 'csv':
+            self._buffer = io.StringIO()
+            self._csv = csv.writer(self._buffer, lineterminator='\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def writerow(self, row: Sequence[Any]) -> None:
+        """Add a row to the table"""
+        self._rows.append(row)
+        limit = self.sample if self.fmt == 'text' and not self._started else self.batch
+        if len(self._rows) >= limit:
+            self._format()
+            if len(self._pending) >= self.batch:
+                self.flush()
+
+    def writerows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """Add many rows to the table"""
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self) -> None:
+        """Write all the rows added so far"""
+        self._format()
+        if self._pending:
+            self.write(''.join(self._pending))
+            self._pending = []
+
+    def close(self) -> None:
+        """Write any remaining rows, and the header if there weren't any rows"""
+        self.flush()
+
+    def _format(self) -> None:
+        """Format the rows waiting to be formatted"""
+        if not self._started:
+            self._start()
+        if not self._rows:
+            return
+        if self.fmt == 'text':
+            self._pending.extend(self._format_text(row) for row in self._rows)
+        elif self.fmt == 'csv':
+            self._csv.writerows(self._rows)
+            self._pending.append(self._buffer.getvalue())
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        else:
+            self._pending.extend(
+                json.dumps(dict(zip(self.columns, row)), default=str) + '\n'
+                for row in self._rows
+            )
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def _start(self) -> None:
+        """Compute the column widths and format the header"""
+        self._started = True
+        if self.fmt == 'text':
+            if self.widths is None:
+                self.widths = _sample_widths(self.columns, self._rows)
+            self._pending.append(self._format_text(self.columns))
+        elif self.fmt == 'csv':
+            self._csv.writerow(self.columns)
+            self._pending.append(self._buffer.getvalue())
+            self._buffer.seek(0)
+            self._buffer.truncate()
+
+    def _format_text(self, row: Sequence[Any]) -> str:
+        """Format a row as aligned text"""
+        cells = []
+        last = len(self.widths) - 1
+        for num, (value, width) in enumerate(zip(row, self.widths)):
+            text = _text(value)
+            if self.truncate and len(text) > width:
+                text = text[:max(width - 3, 0)] + '...'[:width]
+            if isinstance(value, numbers.Number) and not isinstance(value, bool):
+                text = text.rjust(width)
+            elif num < last:
+                text = text.ljust(width)
+            cells.append(text)
+        return self.separator.join(cells) + '\n'
+
+
+def _text(value: Any) -> str:
+    """Convert a value in a table to text"""
+    if value is None:
+        return ''
+    return str(value)
+
+
+def _sample_widths(columns: Sequence[str], rows: List[Sequence[Any]]) -> List[int]:
+    """Compute the width of each column from the header and some rows"""
+    widths = [len(column) for column in columns]
+    for row in rows:
+        for num, value in enumerate(row[:len(widths)]):
+            widths[num] = max(widths[num], len(_text(value)))
+    return widths
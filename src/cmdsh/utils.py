@@ -24,10 +24,11 @@
 """
 Utility functions (not classes)
 """
+import importlib
 import inspect
 import types
 
-from typing import Callable
+from typing import Any, Callable, Sequence
 
 
 def validate_callable_param_count(func: Callable, count: int) -> None:
@@ -96,6 +97,7 @@ def rebind_method(method, obj) -> None:
     # exception if the method already exists on obj
     method_name = method.__name__
     setattr(obj, method_name, types.MethodType(method.__func__, obj))
+    _commands_changed(obj, method_name)
 
 
 def bind_function(func, obj) -> None:
@@ -124,6 +126,44 @@ def bind_function(func, obj) -> None:
     #
     func_name = func.__name__
     setattr(obj, func_name, types.MethodType(func, obj))
+    _commands_changed(obj, func_name)
+
+
+def _commands_changed(obj, name: str) -> None:
+    """Tell a shell a command has been bound to it"""
+    func = getattr(obj, 'commands_changed', None)
+    if name.startswith('do_') and callable(func) and not isinstance(obj, type):
+        func()
+
+
+def import_object(spec: str) -> Any:
+    """Import an object given it's module and name
+
+    spec can be in the form ``package.module:ClassName``, like entry points, or
+    in the form ``package.module.ClassName``.
+    """
+    if ':' in spec:
+        module_name, _, attr_name = spec.partition(':')
+    else:
+        module_name, _, attr_name = spec.rpartition('.')
+    obj = importlib.import_module(module_name)
+    for name in attr_name.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the pct percentile of a sorted sequence of values
+
+    Interpolates linearly between the two closest values. Raises ValueError if
+    there are no values.
+    """
+    if not values:
+        raise ValueError('percentile of an empty sequence')
+    pos = (len(values) - 1) * pct / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
 
 
 # TODO write bind_attribute()
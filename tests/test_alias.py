@@ -0,0 +1,174 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import pytest
+
+import cmdsh
+
+
+class AliasApp(cmdsh.Shell):
+    """An app which records the arguments of each command"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.argvs = []
+
+    def do_echo(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.argvs.append(statement.argv)
+        return cmdsh.Result()
+
+
+class PosixPersonality(cmdsh.personalities.SimplePersonality):
+    def __init__(self):
+        super().__init__()
+        self.parser = cmdsh.parsers.PosixShellParser()
+
+
+@pytest.fixture
+def app():
+    app = AliasApp(personality=PosixPersonality())
+    app.load_module(cmdsh.modules.Alias)
+    return app
+
+
+def test_template_plain():
+    template = cmdsh.modules.alias.AliasTemplate('echo -n')
+    assert not template.macro
+    assert template.expand(' one two') == 'echo -n one two'
+
+
+def test_template_macro():
+    template = cmdsh.modules.alias.AliasTemplate('echo $2 $1 ${1} [$@] $$ $3')
+    assert template.macro
+    assert template.pieces[:4] == ['echo ', 2, ' ', 1]
+    assert template.expand(' one "two three"') == "echo 'two three' one one [one 'two three'] $ "
+
+
+def test_alias_expansion(app):
+    app.do('alias e=echo')
+    app.do('e one two')
+    assert app.argvs == [['echo', 'one', 'two']]
+
+
+def test_alias_quoted_definition(app):
+    app.do('alias e="echo -n"')
+    app.do('e one')
+    assert app.argvs == [['echo', '-n', 'one']]
+
+
+def test_alias_not_first_word(app):
+    app.do('alias e=echo')
+    app.do('echo e')
+    assert app.argvs == [['echo', 'e']]
+
+
+def test_macro_expansion(app):
+    app.do('alias swap="echo $2 $1"')
+    app.do('swap "one two" three')
+    assert app.argvs == [['echo', 'three', 'one two']]
+
+
+def test_alias_chain(app):
+    app.do('alias a=b')
+    app.do('alias b="echo from b"')
+    app.do('a x')
+    assert app.argvs == [['echo', 'from', 'b', 'x']]
+
+
+def test_alias_recursion(app):
+    app.do('alias echo="echo again"')
+    app.do('alias a="b"')
+    app.do('alias b="a"')
+    app.do('echo x')
+    assert app.argvs == [['echo', 'again', 'x']]
+    with pytest.raises(cmdsh.CommandNotFound):
+        app.do('a')
+
+
+def test_alias_compound(app):
+    app.do('alias e=echo')
+    app.do('e one; e two && e three')
+    assert app.argvs == [['echo', 'one'], ['echo', 'two'], ['echo', 'three']]
+
+
+def test_alias_cache(app):
+    app.do('alias e=echo')
+    app.do('e one')
+    assert app._alias_cache == {'e one': 'echo one'}
+    app.do('alias f=echo')
+    assert app._alias_cache == {}
+
+
+def test_alias_cache_size():
+    app = AliasApp()
+    app.load_module(cmdsh.modules.Alias(aliases={'e': 'echo'}, cache_size=2))
+    for num in range(5):
+        app.do('e {}'.format(num))
+    assert len(app._alias_cache) <= 2
+    assert len(app.argvs) == 5
+
+
+def test_alias_list(app, capsys):
+    app.do('alias e="echo -n"')
+    app.do('alias a=echo')
+    capsys.readouterr()
+    app.do('alias')
+    out, _ = capsys.readouterr()
+    assert out == "alias a=echo\nalias e='echo -n'\n"
+    app.do('alias e')
+    out, _ = capsys.readouterr()
+    assert out == "alias e='echo -n'\n"
+
+
+def test_alias_show_not_found(app, capsys):
+    result = app.do('alias nope')
+    _, err = capsys.readouterr()
+    assert result.exit_code == 1
+    assert 'not found' in err
+
+
+def test_unalias(app, capsys):
+    app.do('alias e=echo')
+    result = app.do('unalias e nope')
+    _, err = capsys.readouterr()
+    assert result.exit_code == 1
+    assert 'nope' in err
+    with pytest.raises(cmdsh.CommandNotFound):
+        app.do('e one')
+
+
+def test_alias_clone_and_snapshot(app, tmpdir):
+    app.do('alias e=echo')
+    path = str(tmpdir.join('snapshot'))
+    app.snapshot(path)
+
+    clone = app.clone()
+    clone.do('unalias e')
+    app.do('e one')
+    assert app.argvs == [['echo', 'one']]
+
+    restored = AliasApp(personality=PosixPersonality())
+    restored.load_module(cmdsh.modules.Alias)
+    restored.restore(path)
+    restored.do('e two')
+    assert restored.argvs == [['echo', 'two']]
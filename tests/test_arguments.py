@@ -0,0 +1,168 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import argparse
+
+import pytest
+
+import cmdsh
+from cmdsh.arguments import ArgumentSpec, ParserExit
+
+
+class PosixPersonality(cmdsh.personalities.SimplePersonality):
+    def __init__(self):
+        super().__init__()
+        self.parser = cmdsh.parsers.PosixShellParser()
+
+
+class ArgApp(cmdsh.Shell):
+    """An app with commands which declare their arguments"""
+    def __init__(self):
+        super().__init__(personality=PosixPersonality())
+        self.args = None
+
+    @cmdsh.with_arguments(
+        cmdsh.argument('name'),
+        cmdsh.argument('-l', '--loud', action='store_true', help='shout'),
+    )
+    def do_greet(self, statement, args):
+        """Greet someone"""
+        self.args = args
+        return cmdsh.Result()
+
+    @cmdsh.with_arguments(
+        cmdsh.argument('--count', type=int, default=1),
+        cmdsh.argument('words', nargs='*'),
+    )
+    def do_repeat(self, statement, args):
+        """Repeat some words"""
+        self.args = args
+        return cmdsh.Result()
+
+
+def test_with_arguments():
+    app = ArgApp()
+    result = app.do('greet -l world')
+    assert result.exit_code == 0
+    assert app.args == argparse.Namespace(name='world', loud=True)
+    assert app.do_greet.__doc__ == 'Greet someone'
+
+
+def test_with_arguments_error(capsys):
+    app = ArgApp()
+    result = app.do('greet')
+    assert result.exit_code == 2
+    assert app.args is None
+    out, err = capsys.readouterr()
+    assert not out
+    assert err.startswith('usage: greet')
+    assert 'greet: error: the following arguments are required: name' in err
+
+
+def test_with_arguments_help(capsys):
+    app = ArgApp()
+    result = app.do('greet --help')
+    assert result.exit_code == 0
+    assert app.args is None
+    out, _ = capsys.readouterr()
+    assert 'Greet someone' in out
+    assert 'shout' in out
+
+
+def test_with_arguments_argparse():
+    app = ArgApp()
+    app.do('repeat --count 3 a b')
+    assert app.args == argparse.Namespace(count=3, words=['a', 'b'])
+
+
+def test_parser_is_lazy():
+    spec = ArgApp.do_greet.cmdsh_arguments
+    assert isinstance(spec, ArgumentSpec)
+    spec = ArgumentSpec('test', [cmdsh.argument('name')])
+    assert spec._parser is None
+    spec.parse(['one'])
+    assert spec._parser is None
+    parser = spec.parser
+    assert spec.parser is parser
+
+
+FAST_SPECS = [
+    [cmdsh.argument('name'), cmdsh.argument('-q', '--quiet', action='store_true')],
+    [cmdsh.argument('--no-color', action='store_false', dest='color')],
+    [cmdsh.argument('first', type=int), cmdsh.argument('rest', nargs='*')],
+    [cmdsh.argument('name'), cmdsh.argument('other', nargs='?', default='x')],
+    [cmdsh.argument('words', nargs='*', default=None)],
+    [cmdsh.argument('words', nargs='*', default=['x'])],
+]
+
+
+@pytest.mark.parametrize('arguments, args', [
+    (FAST_SPECS[0], ['bob']),
+    (FAST_SPECS[0], ['-q', 'bob']),
+    (FAST_SPECS[0], ['bob', '--quiet']),
+    (FAST_SPECS[0], ['--', '-bob']),
+    (FAST_SPECS[1], []),
+    (FAST_SPECS[1], ['--no-color']),
+    (FAST_SPECS[2], ['1']),
+    (FAST_SPECS[2], ['1', 'two', 'three']),
+    (FAST_SPECS[3], ['a']),
+    (FAST_SPECS[3], ['a', 'b']),
+    (FAST_SPECS[4], []),
+    (FAST_SPECS[4], ['a']),
+    (FAST_SPECS[5], []),
+    (FAST_SPECS[5], ['a']),
+])
+def test_fast_path_matches_argparse(arguments, args):
+    fast = ArgumentSpec('test', arguments)
+    assert fast._flags is not None
+    assert fast._parse_fast(args) is not None
+    assert fast.parse(args) == ArgumentSpec('test', arguments, fast=False).parse(args)
+
+
+def test_fast_path_new_empty_list():
+    spec = ArgumentSpec('test', [cmdsh.argument('words', nargs='*')])
+    first = spec.parse([]).words
+    assert first == []
+    first.append('x')
+    assert spec.parse([]).words == []
+
+
+@pytest.mark.parametrize('arguments, args', [
+    (FAST_SPECS[0], []),
+    (FAST_SPECS[0], ['-x', 'bob']),
+    (FAST_SPECS[0], ['bob', 'extra']),
+    (FAST_SPECS[0], ['-h']),
+    (FAST_SPECS[2], ['one']),
+])
+def test_fast_path_falls_back(arguments, args):
+    spec = ArgumentSpec('test', arguments)
+    assert spec._parse_fast(args) is None
+    with pytest.raises(ParserExit):
+        spec.parse(args)
+
+
+def test_not_fast():
+    spec = ArgumentSpec('test', [cmdsh.argument('--count', type=int)])
+    assert spec._flags is None
+    assert spec.parse(['--count', '2']).count == 2
@@ -0,0 +1,76 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import pytest
+
+from cmdsh import bench
+
+
+def test_parse_mix():
+    assert bench.parse_mix(['noop@2', 'echo a@b', 'echo x']) == [
+        'noop', 'noop', 'echo a@b', 'echo x',
+    ]
+
+
+@pytest.mark.parametrize('mode, feed', [
+    ('threads', 'do'),
+    ('threads', 'queue'),
+    ('asyncio', 'do'),
+    ('processes', 'do'),
+])
+def test_bench(mode, feed):
+    runner = bench.Bench(
+        mix=['noop', 'echo hi', 'bogus'],
+        shells=2,
+        statements=30,
+        mode=mode,
+        feed=feed,
+        seed=1,
+    )
+    report, memory = runner.run()
+    assert report.statements == 60
+    assert report.errors > 0
+    assert 'bogus' not in report.latencies
+    assert sum(len(values) for values in report.latencies.values()) == 60 - report.errors
+    assert isinstance(memory, int)
+
+
+def test_bad_mode():
+    with pytest.raises(ValueError):
+        bench.Bench(mode='fibers')
+    with pytest.raises(ValueError):
+        bench.Bench(mode='asyncio', feed='queue')
+
+
+def test_main(capsys):
+    assert bench.main(['-n', '2', '-c', '10', '-s', 'noop@3', '-s', 'echo hi', '--seed', '3']) == 0
+    out, _ = capsys.readouterr()
+    assert out.startswith('2 shells on threads')
+    assert '20 statements' in out
+    assert 'KiB per shell' in out
+
+
+def test_main_bad_arguments(capsys):
+    with pytest.raises(SystemExit):
+        bench.main(['--mode', 'asyncio', '--feed', 'queue'])
@@ -0,0 +1,225 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import threading
+import time
+
+import pytest
+
+import cmdsh
+from cmdsh.cancellation import EXIT_INTERRUPTED, EXIT_TIMEOUT
+
+
+class SlowApp(cmdsh.Shell):
+    """An app with commands that take their time"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_module(cmdsh.modules.ExitCommand)
+        self.finished = []
+
+    def do_spin(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        """Never check the cancellation token"""
+        end = time.monotonic() + 5
+        while time.monotonic() < end:
+            pass
+        self.finished.append('spin')
+        return cmdsh.Result()
+
+    def do_poll(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        """Cooperatively check the cancellation token"""
+        for _ in range(500):
+            self.cancel_token.wait(0.01)
+        self.finished.append('poll')
+        return cmdsh.Result()
+
+    @cmdsh.timeout(0.05)
+    def do_limited(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        """A command with it's own timeout"""
+        self.cancel_token.wait(5)
+        return cmdsh.Result()
+
+    def do_fast(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.finished.append('fast')
+        return cmdsh.Result()
+
+    def do_nested(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        """Run another command, then take our time"""
+        token = self.cancel_token
+        record = self.current_record
+        self.do('fast')
+        assert self.cancel_token is token
+        assert self.current_record is record
+        end = time.monotonic() + 2
+        while time.monotonic() < end:
+            self.cancel_token.check()
+        self.finished.append('nested')
+        return cmdsh.Result()
+
+    def do_interrupt(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        """Pretend the user pressed Ctrl-C"""
+        raise KeyboardInterrupt()
+
+
+@pytest.fixture
+def app():
+    return SlowApp()
+
+
+def test_token():
+    token = cmdsh.CancellationToken()
+    assert not token.cancelled
+    token.check()
+    token.cancel()
+    assert token.cancelled
+    with pytest.raises(cmdsh.CommandCancelled):
+        token.check()
+
+
+def test_token_timeout():
+    token = cmdsh.CancellationToken()
+    token.cancel('timeout')
+    with pytest.raises(cmdsh.CommandTimeout):
+        token.wait(1)
+
+
+def test_token_wait_then_cancel():
+    token = cmdsh.CancellationToken()
+    timer = threading.Timer(0.01, token.cancel)
+    timer.start()
+    with pytest.raises(cmdsh.CommandCancelled):
+        token.wait(5)
+    timer.join()
+
+
+def test_no_timeout_no_deadline(app, monkeypatch):
+    def deadline(*args):
+        raise AssertionError('no deadline without a timeout')
+    monkeypatch.setattr(cmdsh.shell, 'Deadline', deadline)
+    assert app.do('fast').exit_code == 0
+
+
+def test_no_timeout(app):
+    assert app.do('fast').exit_code == 0
+    assert app.cancel_token is None
+
+
+def test_global_timeout_preemptive(app, capsys):
+    app.timeout = 0.05
+    start = time.monotonic()
+    result = app.do('spin')
+    assert time.monotonic() - start < 2
+    assert result.exit_code == EXIT_TIMEOUT
+    assert app.finished == []
+    _, err = capsys.readouterr()
+    assert err == 'spin: timed out\n'
+
+
+def test_nested_do_keeps_outer_deadline(app):
+    app.timeout = 0.2
+    start = time.monotonic()
+    result = app.do('nested')
+    assert time.monotonic() - start < 1
+    assert result.exit_code == EXIT_TIMEOUT
+    assert app.finished == ['fast']
+    assert app.cancel_token is None
+    assert app.current_record is None
+
+
+def test_inner_deadline_keeps_outer_deadline():
+    deadline = cmdsh.cancellation.Deadline
+    token = cmdsh.CancellationToken()
+    with deadline(0.2, token):
+        with deadline(60, cmdsh.CancellationToken()):
+            pass
+        with pytest.raises(cmdsh.CommandTimeout):
+            time.sleep(2)
+    assert token.cancelled
+
+
+def test_command_timeout(app):
+    result = app.do('limited')
+    assert result.exit_code == EXIT_TIMEOUT
+
+
+def test_command_timeout_overrides_global(app):
+    app.timeout = 60
+    result = app.do('limited')
+    assert result.exit_code == EXIT_TIMEOUT
+
+
+def test_timeout_cooperative_in_thread(app):
+    app.timeout = 0.05
+    results = []
+    thread = threading.Thread(target=lambda: results.append(app.do('poll')))
+    thread.start()
+    thread.join(5)
+    assert results[0].exit_code == EXIT_TIMEOUT
+    assert app.finished == []
+
+
+def test_timeout_cancelled_after_command(app):
+    app.timeout = 0.05
+    app.do('fast')
+    # the alarm must not go off after the command finished
+    time.sleep(0.1)
+    assert app.finished == ['fast']
+
+
+def test_interrupt(app, capsys):
+    result = app.do('interrupt')
+    assert result.exit_code == EXIT_INTERRUPTED
+    _, err = capsys.readouterr()
+    assert err == 'interrupt: interrupted\n'
+
+
+def test_interrupt_continues_loop(app):
+    app.input_queue.extend(['interrupt', 'fast', 'exit'])
+    result = app.loop()
+    assert result.stop
+    assert app.finished == ['fast']
+
+
+def test_interrupt_stops_compound_statement():
+    class PosixPersonality(cmdsh.personalities.SimplePersonality):
+        def __init__(self):
+            super().__init__()
+            self.parser = cmdsh.parsers.PosixShellParser()
+
+    app = SlowApp(personality=PosixPersonality())
+    result = app.do('interrupt; fast')
+    assert result.exit_code == EXIT_INTERRUPTED
+    assert app.finished == []
+
+
+def test_cancel_from_another_thread(app):
+    def cancel_soon():
+        while app.cancel_token is None:
+            time.sleep(0.01)
+        app.cancel_token.cancel()
+
+    thread = threading.Thread(target=cancel_soon)
+    thread.start()
+    result = app.do('poll')
+    thread.join()
+    assert result.exit_code == EXIT_INTERRUPTED
@@ -0,0 +1,128 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import pytest
+
+import cmdsh
+
+
+class HelpApp(cmdsh.Shell):
+    """An app with some commands to get help for"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_module(cmdsh.modules.Help)
+
+    def do_documented(self, statement):
+        """Do something useful
+
+        With a long explanation.
+        """
+        return cmdsh.Result()
+
+    def do_undocumented(self, statement):
+        return cmdsh.Result()
+
+    @cmdsh.with_arguments(cmdsh.argument('name', help='who to greet'))
+    def do_greet(self, statement, args):
+        """Greet someone"""
+        return cmdsh.Result()
+
+
+@pytest.fixture
+def app():
+    return HelpApp()
+
+
+def test_help_listing(app, capsys):
+    assert app.do('help').exit_code == 0
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == [
+        'Commands:',
+        '  documented    Do something useful',
+        '  greet         Greet someone',
+        '  help          List the commands, or show the help for a command',
+        '  undocumented',
+    ]
+
+
+def test_help_docstring(app, capsys):
+    app.do('help documented')
+    out, _ = capsys.readouterr()
+    assert out == 'Do something useful\n\nWith a long explanation.\n'
+
+
+def test_help_arguments(app, capsys):
+    app.do('help greet')
+    out, _ = capsys.readouterr()
+    assert out.startswith('usage: greet')
+    assert 'who to greet' in out
+
+
+def test_no_help(app, capsys):
+    assert app.do('help undocumented').exit_code == 1
+    assert app.do('help bogus').exit_code == 1
+    assert app.do('help too many').exit_code == 2
+    _, err = capsys.readouterr()
+    assert err.splitlines() == [
+        'help: no help for undocumented',
+        'help: no help for bogus',
+        'usage: help [command]',
+    ]
+
+
+def test_help_is_lazy(app):
+    assert app._help_generation is None
+    assert not app._help_cache
+
+
+def test_help_cache(app, capsys, monkeypatch):
+    app.do('help')
+    app.do('help documented')
+    assert set(app._help_cache) == {None, 'documented'}
+
+    def fail(*args):
+        raise AssertionError('help was rendered again')
+
+    monkeypatch.setattr(app, '_help_listing', fail)
+    app.do('help')
+    monkeypatch.undo()
+
+    # adding a command invalidates the cache
+    app.load_module(cmdsh.modules.ExitCommand)
+    app.do('help')
+    out, _ = capsys.readouterr()
+    assert '  exit' in out
+    assert set(app._help_cache) == {None}
+
+
+def test_help_lazy_modules(app, capsys):
+    app.register_lazy_module('cmdsh.modules:History', ['hist'])
+    app.do('help')
+    out, _ = capsys.readouterr()
+    assert '  hist\n' in out
+    assert not app.is_module_loaded(cmdsh.modules.History)
+    app.do('help hist')
+    out, _ = capsys.readouterr()
+    assert out == 'Show the history\n'
+    assert app.is_module_loaded(cmdsh.modules.History)
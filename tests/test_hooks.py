@@ -35,6 +35,7 @@ class SayApp(cmdsh.Shell):
 
     def reset_counters(self):
         """Set hook call counters to zero"""
+        self.called_preparse = 0
         self.called_postparse = 0
         self.called_postexecute = 0
 
@@ -66,6 +67,38 @@ class SayApp(cmdsh.Shell):
     def prepost_hook_no_return_annotation(self):
         """A preloop or postloop hook with no return type annotation"""
 
+    ###
+    #
+    # pre-parse hooks, some valid, some invalid
+    #
+    ###
+    def preparse_hook(self, line: str) -> str:
+        """A pre-parse hook"""
+        self.called_preparse += 1
+        return line
+
+    def preparse_hook_rewrite(self, line: str) -> str:
+        """A pre-parse hook which changes the input"""
+        self.called_preparse += 1
+        return line.replace('hello', 'goodbye')
+
+    def preparse_hook_exception(self, line: str) -> str:
+        """A pre-parse hook which raises an exception"""
+        # pylint: disable=unused-argument
+        self.called_preparse += 1
+        raise ValueError
+
+    def preparse_hook_not_enough_parameters(self) -> str:
+        """A pre-parse hook with no parameters"""
+
+    def preparse_hook_wrong_parameter_annotation(self, line: cmdsh.Statement) -> str:
+        """A pre-parse hook with incorrect parameter annotation"""
+        # pylint: disable=unused-argument
+
+    def preparse_hook_no_return_annotation(self, line: str):
+        """A pre-parse hook with no return annotation"""
+        # pylint: disable=unused-argument
+
     ###
     #
     # post-parse hooks, some valid, some invalid
@@ -275,6 +308,57 @@ def test_postloop_hook_no_return_annotation(sayapp):
         sayapp.register_postloop_hook(sayapp.prepost_hook_no_return_annotation)
 
 
+###
+#
+# test pre-parse hooks
+#
+###
+def test_preparse_hook(sayapp, capsys):
+    sayapp.register_preparse_hook(sayapp.preparse_hook)
+    sayapp.do('say hello')
+    out, err = capsys.readouterr()
+    assert out == 'hello\n'
+    assert not err
+    assert sayapp.called_preparse == 1
+
+
+def test_preparse_hooks(sayapp, capsys):
+    sayapp.register_preparse_hook(sayapp.preparse_hook_rewrite)
+    sayapp.register_preparse_hook(sayapp.preparse_hook)
+    sayapp.do('say hello')
+    out, err = capsys.readouterr()
+    assert out == 'goodbye\n'
+    assert not err
+    assert sayapp.called_preparse == 2
+    assert sayapp.history[0].statement.raw == 'say goodbye'
+
+
+def test_preparse_hook_exception(sayapp, capsys):
+    sayapp.register_preparse_hook(sayapp.preparse_hook_exception)
+    sayapp.register_preparse_hook(sayapp.preparse_hook)
+    with pytest.raises(ValueError):
+        sayapp.do('say hello')
+    out, err = capsys.readouterr()
+    assert not out
+    assert not err
+    assert sayapp.called_preparse == 1
+
+
+def test_preparse_hook_not_enough_parameters(sayapp):
+    with pytest.raises(TypeError):
+        sayapp.register_preparse_hook(sayapp.preparse_hook_not_enough_parameters)
+
+
+def test_preparse_hook_wrong_parameter_annotation(sayapp):
+    with pytest.raises(TypeError):
+        sayapp.register_preparse_hook(sayapp.preparse_hook_wrong_parameter_annotation)
+
+
+def test_preparse_hook_no_return_annotation(sayapp):
+    with pytest.raises(TypeError):
+        sayapp.register_preparse_hook(sayapp.preparse_hook_no_return_annotation)
+
+
 ###
 #
 # test post-parse hooks
@@ -0,0 +1,131 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import tracemalloc
+
+import pytest
+
+import cmdsh
+from cmdsh.modules.memstats import MemoryUsage, rss
+
+
+class HungryApp(cmdsh.Shell):
+    """An app with commands which hold on to memory"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.kept = []
+
+    def do_eat(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.kept.append(bytearray(int(statement.arglist[0])))
+        return cmdsh.Result()
+
+    def do_nibble(self, _statement: cmdsh.Statement) -> cmdsh.Result:
+        return cmdsh.Result()
+
+
+@pytest.fixture
+def traced():
+    was_tracing = tracemalloc.is_tracing()
+    app = HungryApp()
+    app.load_module(cmdsh.modules.MemoryStats(tracemalloc=True, top=5))
+    yield app
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def test_rss():
+    assert rss() > 0
+
+
+def test_rss_sampling():
+    app = HungryApp()
+    app.load_module(cmdsh.modules.MemoryStats)
+    app.do('eat 1000')
+    memory = app.history[-1].memory
+    assert isinstance(memory, MemoryUsage)
+    assert memory.peak is None
+    assert app._memstats_commands['eat'][0] == 1
+
+
+def test_current_record():
+    app = HungryApp()
+    records = []
+
+    def hook(statement: cmdsh.Statement) -> cmdsh.Statement:
+        records.append(app.current_record)
+        return statement
+
+    app.register_postparse_hook(hook)
+    app.do('nibble')
+    assert records == [app.history[-1]]
+    assert app.current_record is None
+
+
+def test_tracemalloc_allocated(traced):
+    traced.do('eat 1000000')
+    memory = traced.history[-1].memory
+    assert memory.allocated >= 1000000
+    if hasattr(tracemalloc, 'reset_peak'):
+        assert memory.peak >= 1000000
+
+
+def test_tracemalloc_compound(traced, monkeypatch):
+    monkeypatch.setattr(traced._personality, 'parser', cmdsh.parsers.PosixShellParser())
+    traced.do('eat 100000; eat 200000')
+    assert traced.history[-1].memory.allocated >= 300000
+    assert traced._memstats_commands['eat'][0] == 2
+
+
+def test_memstat(traced, capsys):
+    traced.do('eat 500000')
+    traced.do('nibble')
+    capsys.readouterr()
+    result = traced.do('memstat')
+    assert result.exit_code == 0
+    out, _ = capsys.readouterr()
+    lines = out.splitlines()
+    assert lines[1].endswith('  eat')
+    assert 'call site' in out
+    assert any('test_memstats.py' in line for line in lines)
+
+
+def test_memstat_clear(traced, capsys):
+    traced.do('eat 1000')
+    traced.do('memstat clear')
+    # memstat itself is measured after it clears the statistics
+    assert list(traced._memstats_commands) == ['memstat']
+    result = traced.do('memstat bogus')
+    assert result.exit_code == 2
+    _, err = capsys.readouterr()
+    assert err.startswith('usage')
+
+
+def test_clone_has_own_stats():
+    app = HungryApp()
+    app.load_module(cmdsh.modules.MemoryStats)
+    app.do('nibble')
+    new = app.clone()
+    assert not new._memstats_commands
+    new.do('nibble')
+    assert app._memstats_commands['nibble'][0] == 1
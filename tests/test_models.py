@@ -54,3 +54,51 @@ def test_statement_args_empty(empty_statement):
 
 def test_statement_args(basic_statement):
     assert basic_statement.arglist == ['arg1', 'arg2', 'arg3']
+
+
+def test_bytes_statement_lazy_argv():
+    stmt = cmdsh.models.BytesStatement(b'command arg1', spans=[(0, 7), (8, 12)])
+    assert stmt.command == 'command'
+    assert stmt._argv is None
+    assert stmt.arglist == ['arg1']
+    assert stmt.argv == ['command', 'arg1']
+
+
+def test_bytes_statement_empty():
+    stmt = cmdsh.models.BytesStatement()
+    assert stmt.command == ''
+    assert stmt.argv == []
+    assert stmt.views == []
+
+
+def test_bytes_statement_set_argv():
+    stmt = cmdsh.models.BytesStatement(b'command arg1', spans=[(0, 7), (8, 12)])
+    stmt.argv = ['other']
+    assert stmt.command == 'other'
+
+
+def test_bytes_statement_decode_errors():
+    stmt = cmdsh.models.BytesStatement(b'say \xff', spans=[(0, 3), (4, 5)])
+    assert stmt.arglist == ['\udcff']
+
+
+def test_statement_tuple_argv():
+    stmt = cmdsh.Statement('command arg1 arg2', argv=('command', 'arg1', 'arg2'))
+    assert stmt.command == 'command'
+    arglist = stmt.arglist
+    assert isinstance(arglist, cmdsh.models.ArgumentView)
+    assert arglist == ['arg1', 'arg2']
+    assert arglist == ('arg1', 'arg2')
+    assert len(arglist) == 2
+    assert arglist[0] == 'arg1'
+    assert arglist[-1] == 'arg2'
+    assert arglist[1:] == ('arg2',)
+    assert list(arglist) == ['arg1', 'arg2']
+    with pytest.raises(IndexError):
+        arglist[2]
+    assert not cmdsh.Statement('', argv=()).arglist
+
+
+def test_statement_argv_type():
+    with pytest.raises(TypeError):
+        cmdsh.Statement('command', argv='command')
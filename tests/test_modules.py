@@ -71,3 +71,30 @@ def test_exit_command():
 #
 # History module
 #
+def test_history_clone():
+    app = cmdsh.Shell()
+    app.load_module(cmdsh.modules.History)
+    app.load_module(cmdsh.modules.ExitCommand)
+    app.do('exit')
+    assert app._history == ['exit']
+
+    clone = app.clone()
+    assert clone._history == []
+    clone.do('exit')
+    assert clone._history == ['exit']
+    assert app._history == ['exit']
+
+
+class PosixPersonality(cmdsh.personalities.SimplePersonality):
+    def __init__(self):
+        super().__init__()
+        self.parser = cmdsh.parsers.PosixShellParser()
+
+
+def test_history_compound_statement():
+    app = cmdsh.Shell(personality=PosixPersonality())
+    app.load_module(cmdsh.modules.History)
+    app.do_a = lambda statement: cmdsh.Result()
+    app.do('a 1; a 2 && a 3')
+    app.do('a 4')
+    assert app._history == ['a 1; a 2 && a 3', 'a 4']
@@ -0,0 +1,197 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import pytest
+
+import cmdsh
+from cmdsh.pager import Pager
+
+
+class Output:
+    """Collect what's written"""
+    def __init__(self):
+        self.text = ''
+
+    def __call__(self, data):
+        self.text += data
+
+
+class Keys:
+    """Answer the pager's prompts with canned input"""
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        return self.keys.pop(0)
+
+
+def numbers(count, consumed=None):
+    """Generate numbered lines, remembering how many were generated"""
+    for num in range(count):
+        if consumed is not None:
+            consumed.append(num)
+        yield 'line {}\n'.format(num)
+
+
+def test_lazy():
+    consumed = []
+    pager = Pager(numbers(1000, consumed), height=10)
+    assert pager.lines(0, 10) == ['line {}'.format(num) for num in range(10)]
+    assert len(consumed) < 20
+    assert pager.line(5) == 'line 5'
+    pager.close()
+
+
+def test_partial_chunks():
+    pager = Pager(['one\ntw', 'o\nthr', 'ee'], height=10)
+    assert pager.lines(0, 10) == ['one', 'two', 'three']
+    assert pager.line_count == 3
+    with pytest.raises(IndexError):
+        pager.line(3)
+    pager.close()
+
+
+def test_search():
+    consumed = []
+    pager = Pager(numbers(1000, consumed), height=10)
+    assert pager.search(r'line 4\d$') == 40
+    assert len(consumed) < 50
+    assert pager.search('line 4', 41) == 41
+    assert pager.search('nothing') is None
+    assert len(consumed) == 1000
+    pager.close()
+
+
+def test_run_fits():
+    out = Output()
+    keys = Keys()
+    Pager(numbers(3), height=10, write=out, read=keys).run()
+    assert out.text == 'line 0\nline 1\nline 2\n'
+    assert not keys.prompts
+
+
+def test_run_pages():
+    out = Output()
+    keys = Keys('', '', '')
+    Pager(numbers(25), height=10, write=out, read=keys).run()
+    assert out.text == ''.join(numbers(25))
+    assert keys.prompts == [':', ':', '(END) ']
+
+
+def test_run_commands():
+    out = Output()
+    keys = Keys('G', 'b', 'g', '/line 1[25]', 'n', 'n', 'q')
+    Pager(numbers(100), height=5, write=out, read=keys).run()
+    pages = out.text.split('line 0\n')
+    assert len(pages) == 3
+    lines = out.text.splitlines()
+    assert lines[5:10] == ['line {}'.format(num) for num in range(95, 100)]
+    assert lines[10] == 'line 90'
+    assert 'line 12' in lines
+    assert lines[-6] == 'pattern not found'
+
+
+def test_run_bad_pattern():
+    out = Output()
+    Pager(numbers(100), height=5, write=out, read=Keys('/[', 'q')).run()
+    assert 'bad pattern' in out.text
+
+
+#
+# AutoPager
+#
+class PagedApp(cmdsh.Shell):
+    """An app which writes lots of output"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_module(cmdsh.modules.AutoPager(height=5))
+
+    def do_lines(self, statement):
+        for line in numbers(int(statement.arglist[0])):
+            self.wout(line)
+        return cmdsh.Result()
+
+    def do_lazy(self, statement):
+        self.wout('start\n')
+        self.page(numbers(int(statement.arglist[0])))
+        return cmdsh.Result()
+
+
+def tty(monkeypatch):
+    """Pretend stdin and stdout are a tty, after capsys has replaced them"""
+    monkeypatch.setattr('sys.stdin.isatty', lambda: True)
+    monkeypatch.setattr('sys.stdout.isatty', lambda: True)
+
+
+def test_autopager_short(capsys, monkeypatch):
+    tty(monkeypatch)
+    monkeypatch.setattr('builtins.input', Keys())
+    app = PagedApp()
+    app.do('lines 3')
+    out, _ = capsys.readouterr()
+    assert out == 'line 0\nline 1\nline 2\n'
+    assert 'wout' not in app.__dict__
+
+
+def test_autopager_long(capsys, monkeypatch):
+    tty(monkeypatch)
+    keys = Keys('', 'q')
+    monkeypatch.setattr('builtins.input', keys)
+    app = PagedApp()
+    app.do('lines 100')
+    out, _ = capsys.readouterr()
+    assert out == ''.join(numbers(10))
+    assert keys.prompts == [':', ':']
+    assert 'wout' not in app.__dict__
+
+
+def test_autopager_page(capsys, monkeypatch):
+    tty(monkeypatch)
+    monkeypatch.setattr('builtins.input', Keys('q'))
+    app = PagedApp()
+    app.do('lazy 1000')
+    out, _ = capsys.readouterr()
+    assert out == 'start\n' + ''.join(numbers(5))
+
+
+def test_autopager_not_tty(capsys):
+    app = PagedApp()
+    app.do('lines 100')
+    app.do('lazy 10')
+    out, _ = capsys.readouterr()
+    assert out == ''.join(numbers(100)) + 'start\n' + ''.join(numbers(10))
+
+
+def test_autopager_exception(capsys, monkeypatch):
+    tty(monkeypatch)
+    monkeypatch.setattr('builtins.input', Keys())
+    app = PagedApp()
+    with pytest.raises(IndexError):
+        app.do('lines')
+    app.do('lines 1')
+    assert 'wout' not in app.__dict__
+    out, _ = capsys.readouterr()
+    assert out == 'line 0\n'
@@ -22,6 +22,8 @@
 # THE SOFTWARE.
 #
 
+import pytest
+
 import cmdsh
 
 
@@ -39,3 +41,263 @@ def test_posix_parser():
     stmt = parser.parse(stmt)
     assert stmt.command == 'command'
     assert stmt.arglist == ['arg1 arg2', 'arg3']
+
+
+def test_split_list():
+    assert cmdsh.parsers.split_list('one; two && three || four') == [
+        ('', 'one'),
+        (';', ' two '),
+        ('&&', ' three '),
+        ('||', ' four'),
+    ]
+
+
+def test_split_list_quoted_operators():
+    assert cmdsh.parsers.split_list('''say ";" '&&' \\|\\| "it's"''') == [
+        ('', '''say ";" '&&' \\|\\| "it's"'''),
+    ]
+
+
+def test_split_list_comment():
+    assert cmdsh.parsers.split_list('one # two; three') == [('', 'one ')]
+
+
+def test_posix_parse_list():
+    parser = cmdsh.parsers.PosixShellParser()
+    stmts = parser.parse_list(cmdsh.Statement('one a;two "b;c"&&three||four'))
+    assert [stmt.argv for stmt in stmts] == [['one', 'a'], ['two', 'b;c'], ['three'], ['four']]
+    assert [stmt.operator for stmt in stmts] == ['', ';', '&&', '||']
+    assert [stmt.raw for stmt in stmts] == ['one a', 'two "b;c"', 'three', 'four']
+
+
+def test_posix_parse_list_single():
+    parser = cmdsh.parsers.PosixShellParser()
+    stmt = cmdsh.Statement('command "arg1 arg2" arg3')
+    assert parser.parse_list(stmt) == [stmt]
+    assert stmt.argv == ['command', 'arg1 arg2', 'arg3']
+
+
+def test_posix_parse_list_empty_statements():
+    parser = cmdsh.parsers.PosixShellParser()
+    stmts = parser.parse_list(cmdsh.Statement('one;;two;'))
+    assert [stmt.argv for stmt in stmts] == [['one'], ['two']]
+
+
+@pytest.mark.parametrize('raw', [
+    'false &&',
+    '&& one',
+    'one || ',
+    'one |',
+    'one; | two',
+    'one && && two',
+    'one && # comment',
+])
+def test_posix_parse_list_missing_operand(raw):
+    parser = cmdsh.parsers.PosixShellParser()
+    with pytest.raises(ValueError):
+        parser.parse_list(cmdsh.Statement(raw))
+
+
+def test_scanner_operator_continuation():
+    scanner = cmdsh.parsers.ListScanner()
+    assert not scanner.feed_line('one &&')
+    assert not scanner.feed_line('')
+    assert not scanner.feed_line('  # comment')
+    assert not scanner.feed_line('two |')
+    assert scanner.feed_line('three')
+    assert [(operator, text.strip()) for operator, text in scanner.parts()] == [
+        ('', 'one'), ('&&', 'two'), ('|', 'three'),
+    ]
+
+
+def test_scanner_unclosed_quote():
+    scanner = cmdsh.parsers.ListScanner()
+    assert not scanner.feed_line('say "hello')
+    assert not scanner.feed_line('there')
+    assert scanner.feed_line('world" again')
+    assert scanner.text == 'say "hello\nthere\nworld" again'
+
+
+def test_scanner_single_quotes():
+    scanner = cmdsh.parsers.ListScanner()
+    assert not scanner.feed_line("say 'it\\")
+    assert scanner.feed_line("s'")
+    assert scanner.text == "say 'it\\\ns'"
+
+
+def test_scanner_backslash_continuation():
+    scanner = cmdsh.parsers.ListScanner()
+    assert not scanner.feed_line('say one \\')
+    assert not scanner.feed_line('two "three\\')
+    assert scanner.feed_line('four"')
+    assert scanner.text == 'say one two "threefour"'
+
+
+def test_scanner_escaped_backslash():
+    scanner = cmdsh.parsers.ListScanner()
+    assert scanner.feed_line('say one \\\\')
+
+
+def test_scanner_comment_is_complete():
+    scanner = cmdsh.parsers.ListScanner()
+    assert scanner.feed_line('say one # "unclosed \\')
+    assert scanner.parts() == [('', 'say one ')]
+
+
+def test_scanner_operator_across_feeds():
+    scanner = cmdsh.parsers.ListScanner()
+    scanner.feed('one |')
+    scanner.feed('| two')
+    assert scanner.parts() == [('', 'one '), ('||', ' two')]
+
+
+def test_scanner_parts_multiline():
+    scanner = cmdsh.parsers.ListScanner()
+    scanner.feed_line('one "a;')
+    scanner.feed_line('b" && two')
+    assert scanner.parts() == [('', 'one "a;\nb" '), ('&&', ' two')]
+
+
+def test_posix_parser_multiline():
+    parser = cmdsh.parsers.PosixShellParser()
+    assert not parser.multiline
+    parser = cmdsh.parsers.PosixShellParser(multiline=True)
+    assert parser.multiline
+    scanner = parser.scanner()
+    scanner.feed_line('command "arg1')
+    scanner.feed_line('arg2" arg3')
+    stmt = parser.parse(cmdsh.Statement(scanner.text))
+    assert stmt.arglist == ['arg1\narg2', 'arg3']
+
+
+def test_bytes_parser():
+    parser = cmdsh.parsers.BytesParser()
+    raw = b'command "arg1 arg2" \'arg3\'  arg4'
+    stmt = parser.parse(cmdsh.models.BytesStatement(raw))
+    assert stmt.spans == [(0, 7), (9, 18), (21, 25), (28, 32)]
+    assert [view.obj is raw for view in stmt.views] == [True] * 4
+    assert [bytes(view) for view in stmt.views] == [b'command', b'arg1 arg2', b'arg3', b'arg4']
+    assert stmt.command == 'command'
+    assert stmt.arglist == ['arg1 arg2', 'arg3', 'arg4']
+
+
+def test_bytes_parser_memoryview():
+    parser = cmdsh.parsers.BytesParser()
+    buffer = memoryview(b'xxcommand argxx')[2:-2]
+    stmt = parser.parse(cmdsh.models.BytesStatement(buffer))
+    assert stmt.argv == ['command', 'arg']
+
+
+def test_bytes_parser_str():
+    parser = cmdsh.parsers.BytesParser()
+    stmt = parser.parse(cmdsh.Statement('command "arg1 arg2" \'arg3\''))
+    assert stmt.argv == ['command', 'arg1 arg2', 'arg3']
+
+
+@pytest.mark.parametrize('parser_class', [
+    cmdsh.parsers.SimpleParser,
+    cmdsh.parsers.PosixShellParser,
+])
+def test_intern(parser_class):
+    parser = parser_class(intern=True)
+    one = parser.parse(cmdsh.Statement('command arg1 arg2'))
+    two = parser.parse(cmdsh.Statement('command arg1 arg2'))
+    assert one.argv == ('command', 'arg1', 'arg2')
+    assert one.argv is two.argv
+    assert one.arglist == ['arg1', 'arg2']
+    # different input shares the strings
+    three = parser.parse(cmdsh.Statement('command ' + 'arg' + str(2)))
+    assert three.argv[1] is one.argv[2]
+
+
+def test_intern_cache_size():
+    parser = cmdsh.parsers.SimpleParser(intern=True, cache_size=2)
+    for num in range(5):
+        parser.parse(cmdsh.Statement('command {}'.format(num)))
+    assert len(parser._interned._cache) <= 2
+
+
+def test_intern_parse_list():
+    parser = cmdsh.parsers.PosixShellParser(intern=True)
+    stmts = parser.parse_list(cmdsh.Statement('one a; one a && two'))
+    assert stmts[0].argv is stmts[1].argv
+    assert stmts[2].argv == ('two',)
+
+
+def test_no_intern():
+    parser = cmdsh.parsers.SimpleParser()
+    assert isinstance(parser.parse(cmdsh.Statement('command')).argv, list)
+
+
+def test_simple_parse_many():
+    parser = cmdsh.parsers.SimpleParser()
+    stmts = parser.parse_many('one "two three"\n\n  \nfour\n')
+    assert not isinstance(stmts, list)
+    assert [stmt.argv for stmt in stmts] == [['one', '"two three"'], ['four']]
+
+
+def test_simple_parse_many_lines():
+    parser = cmdsh.parsers.SimpleParser(intern=True)
+    stmts = list(parser.parse_many(['one two\n', 'one two\r\n']))
+    assert stmts[0].raw == 'one two'
+    assert stmts[0].argv is stmts[1].argv
+
+
+def test_posix_parse_many():
+    parser = cmdsh.parsers.PosixShellParser()
+    stmts = list(parser.parse_many('one "two three"; four && five\n# comment\nsix'))
+    assert [(stmt.operator, stmt.argv) for stmt in stmts] == [
+        ('', ['one', 'two three']),
+        (';', ['four']),
+        ('&&', ['five']),
+        ('', ['six']),
+    ]
+
+
+def test_posix_parse_many_matches_parse():
+    parser = cmdsh.parsers.PosixShellParser()
+    lines = ['say "hello world"', "say 'a b' c\\ d", 'say # comment']
+    many = [stmt.argv for stmt in parser.parse_many(lines)]
+    assert many == [parser.parse(cmdsh.Statement(line)).argv for line in lines]
+
+
+def test_posix_parse_many_multiline():
+    parser = cmdsh.parsers.PosixShellParser(multiline=True)
+    stmts = list(parser.parse_many(['one "two', 'three" \\', 'four', 'five']))
+    assert [stmt.argv for stmt in stmts] == [['one', 'two\nthree', 'four'], ['five']]
+
+
+def test_posix_parse_many_operator_continuation():
+    parser = cmdsh.parsers.PosixShellParser(multiline=True)
+    stmts = list(parser.parse_many(['one ||', '  two', 'three']))
+    assert [(stmt.operator, stmt.argv) for stmt in stmts] == [
+        ('', ['one']), ('||', ['two']), ('', ['three']),
+    ]
+    parser = cmdsh.parsers.PosixShellParser()
+    with pytest.raises(ValueError):
+        list(parser.parse_many(['one ||', '  two']))
+
+
+def test_posix_parse_many_unclosed():
+    parser = cmdsh.parsers.PosixShellParser()
+    stmts = parser.parse_many(['one', 'two "three'])
+    assert next(stmts).argv == ['one']
+    with pytest.raises(ValueError):
+        next(stmts)
+
+
+def test_split_list_pipe():
+    assert cmdsh.parsers.split_list('one | two || three|four "|"') == [
+        ('', 'one '),
+        ('|', ' two '),
+        ('||', ' three'),
+        ('|', 'four "|"'),
+    ]
+
+
+def test_scanner_pipe_across_chunks():
+    scanner = cmdsh.parsers.ListScanner()
+    scanner.feed('one |')
+    scanner.feed(' two |')
+    scanner.feed('| three')
+    assert scanner.parts() == [('', 'one '), ('|', ' two '), ('||', ' three')]
@@ -0,0 +1,158 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import sys
+
+import pytest
+
+import cmdsh
+import cmdsh.plugins
+
+
+PLUGIN_MODULE = '''
+import cmdsh
+
+class Greeter:
+    def load(self, shell):
+        cmdsh.utils.rebind_method(self.do_hello, shell)
+
+    def do_hello(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        return cmdsh.Result(exit_code=42)
+
+class Farewell:
+    requires = (Greeter,)
+
+    def load(self, shell):
+        cmdsh.utils.rebind_method(self.do_goodbye, shell)
+
+    def do_goodbye(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        return cmdsh.Result(exit_code=43)
+
+class Personality(cmdsh.personalities.SimplePersonality):
+    pass
+'''
+
+
+def make_distribution(sitedir, name, entry_points):
+    """create the metadata for an installed distribution"""
+    distinfo = sitedir.mkdir('{}-1.0.dist-info'.format(name))
+    distinfo.join('METADATA').write('Metadata-Version: 2.1\nName: {}\nVersion: 1.0\n'.format(name))
+    distinfo.join('entry_points.txt').write(entry_points)
+
+
+@pytest.fixture
+def sitedir(tmpdir, monkeypatch):
+    sitedir = tmpdir.mkdir('site')
+    sitedir.join('cmdsh_test_plugin.py').write(PLUGIN_MODULE)
+    make_distribution(sitedir, 'greeter', '\n'.join([
+        '[cmdsh.modules]',
+        'greeter = cmdsh_test_plugin:Greeter',
+        'farewell = cmdsh_test_plugin:Farewell',
+        '[cmdsh.personalities]',
+        'polite = cmdsh_test_plugin:Personality',
+        '[console_scripts]',
+        'greet = cmdsh_test_plugin:main',
+    ]))
+    monkeypatch.syspath_prepend(str(sitedir))
+    yield sitedir
+    sys.modules.pop('cmdsh_test_plugin', None)
+
+
+@pytest.fixture
+def index(sitedir, tmpdir):
+    return cmdsh.plugins.PluginIndex(
+        path=str(tmpdir.join('cache', 'plugins.json')),
+        search_path=[str(sitedir)],
+    )
+
+
+def test_plugins(index):
+    assert index.plugins(cmdsh.plugins.MODULES) == {
+        'greeter': 'cmdsh_test_plugin:Greeter',
+        'farewell': 'cmdsh_test_plugin:Farewell',
+    }
+    assert index.plugins(cmdsh.plugins.PERSONALITIES) == {
+        'polite': 'cmdsh_test_plugin:Personality',
+    }
+    assert os.path.exists(index.path)
+
+
+def test_index_is_cached(index, monkeypatch):
+    index.plugins(cmdsh.plugins.MODULES)
+
+    def scan(search_path):
+        raise AssertionError('should have used the cached index')
+
+    monkeypatch.setattr(cmdsh.plugins, '_scan', scan)
+    cached = cmdsh.plugins.PluginIndex(path=index.path, search_path=index.search_path)
+    assert cached.plugins(cmdsh.plugins.MODULES) == index.plugins(cmdsh.plugins.MODULES)
+
+
+def test_index_rebuilt_when_distributions_change(index, sitedir):
+    index.plugins(cmdsh.plugins.MODULES)
+    make_distribution(sitedir, 'another', '[cmdsh.modules]\nanother = cmdsh_test_plugin:Greeter\n')
+    # make sure the directory looks modified even on coarse grained file systems
+    stat = os.stat(str(sitedir))
+    os.utime(str(sitedir), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    rescanned = cmdsh.plugins.PluginIndex(path=index.path, search_path=index.search_path)
+    assert 'another' in rescanned.plugins(cmdsh.plugins.MODULES)
+
+
+def test_index_unwritable(sitedir, tmpdir):
+    blocker = tmpdir.join('blocker')
+    blocker.write('')
+    index = cmdsh.plugins.PluginIndex(
+        path=str(blocker.join('plugins.json')),
+        search_path=[str(sitedir)],
+    )
+    assert 'greeter' in index.plugins(cmdsh.plugins.MODULES)
+
+
+def test_load_modules(index):
+    shell = cmdsh.Shell()
+    cmdsh.plugins.load_modules(shell, index=index)
+    assert shell.do('hello').exit_code == 42
+    assert shell.do('goodbye').exit_code == 43
+
+
+def test_load_some_modules(index):
+    shell = cmdsh.Shell()
+    cmdsh.plugins.load_modules(shell, names=['greeter'], index=index)
+    assert shell.do('hello').exit_code == 42
+    with pytest.raises(cmdsh.CommandNotFound):
+        shell.do('goodbye')
+
+
+def test_load_missing_module(index):
+    shell = cmdsh.Shell()
+    with pytest.raises(LookupError):
+        cmdsh.plugins.load_modules(shell, names=['nope'], index=index)
+
+
+def test_load_personality(index):
+    personality = cmdsh.plugins.load_personality('polite', index=index)
+    assert personality.__class__.__name__ == 'Personality'
+    shell = cmdsh.Shell(personality=personality)
+    assert shell.render_prompt() == 'cmdsh: '
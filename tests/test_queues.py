@@ -0,0 +1,235 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import asyncio
+import queue
+import sys
+import threading
+
+import pytest
+
+import cmdsh
+from cmdsh.queues import InputQueue, TokenBucket
+
+
+class FakeClock:
+    """A clock which only moves when we tell it to"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class QueueApp(cmdsh.Shell):
+    """An app which records the commands it runs"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_module(cmdsh.modules.ExitCommand)
+        self.ran = []
+
+    def do_say(self, statement):
+        """Remember what we were told"""
+        self.ran.append(statement.arglist)
+        return cmdsh.Result()
+
+
+#
+# TokenBucket
+#
+def test_token_bucket_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(1, 2, clock)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(1)
+
+
+def test_token_bucket_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(2, 1, clock)
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.take() == 0
+
+
+#
+# list compatibility
+#
+def test_list_methods():
+    iq = InputQueue()
+    iq.append('one')
+    iq.extend(['two', 'three'])
+    assert len(iq) == 3
+    assert iq
+    assert list(iq) == ['one', 'two', 'three']
+    assert iq.pop(0) == 'one'
+    iq.clear()
+    assert not iq
+    with pytest.raises(IndexError):
+        iq.pop(0)
+    with pytest.raises(IndexError):
+        iq.append('one')
+        iq.pop(-1)
+
+
+def test_shell_reads_from_input_queue():
+    app = QueueApp()
+    app.input_queue = InputQueue(maxsize=5)
+    app.input_queue.extend(['say hello', 'exit'])
+    app.loop()
+    assert app.ran == [['hello']]
+
+
+def test_clone_copies_queue_settings():
+    app = QueueApp()
+    app.input_queue = InputQueue(maxsize=5, rate_limits={'say': (1, 1)})
+    app.input_queue.append('say hello')
+    new = app.clone()
+    assert isinstance(new.input_queue, InputQueue)
+    assert new.input_queue.maxsize == 5
+    assert new.input_queue.rate_limits == {'say': (1, 1)}
+    assert not new.input_queue
+
+
+#
+# backpressure
+#
+def test_put_full_nonblocking():
+    iq = InputQueue(maxsize=1)
+    iq.put('one')
+    with pytest.raises(queue.Full):
+        iq.put('two', block=False)
+    with pytest.raises(queue.Full):
+        iq.put('two', timeout=0.01)
+    assert iq.stats().rejected == 2
+
+
+def test_put_blocks_until_room():
+    iq = InputQueue(maxsize=1)
+    iq.put('one')
+    thread = threading.Thread(target=iq.put, args=('two',))
+    thread.start()
+    thread.join(0.05)
+    assert thread.is_alive()
+    assert iq.pop(0) == 'one'
+    thread.join(1)
+    assert not thread.is_alive()
+    assert list(iq) == ['two']
+
+
+def test_put_async_waits_for_room():
+    iq = InputQueue(maxsize=1)
+    iq.put('one')
+
+    async def produce():
+        await iq.put_async('two')
+
+    loop = asyncio.new_event_loop()
+    try:
+        task = loop.create_task(produce())
+        loop.run_until_complete(asyncio.sleep(0.02))
+        assert not task.done()
+        threading.Thread(target=iq.pop, args=(0,)).start()
+        loop.run_until_complete(asyncio.wait_for(task, 1))
+    finally:
+        loop.close()
+    assert list(iq) == ['two']
+
+
+def test_rate_limit():
+    clock = FakeClock()
+    iq = InputQueue(rate_limits={'say': (1, 1)}, clock=clock)
+    iq.put('say one', block=False)
+    # other commands aren't limited
+    iq.put('exit', block=False)
+    with pytest.raises(queue.Full):
+        iq.put('say two', block=False)
+    clock.now = 1
+    iq.put('say two', block=False)
+    assert list(iq) == ['say one', 'exit', 'say two']
+
+
+#
+# waiting for input
+#
+def test_wait_for_input():
+    app = QueueApp()
+    app.input_queue = InputQueue(wait=True)
+
+    def produce():
+        for num in range(3):
+            app.input_queue.put('say {}'.format(num))
+        app.input_queue.put('exit')
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    app.loop()
+    thread.join()
+    assert app.ran == [['0'], ['1'], ['2']]
+
+
+def test_closed_queue_ends_loop_with_tty(capsys, monkeypatch):
+    monkeypatch.setattr(sys.stdin, 'isatty', lambda: True, raising=False)
+    app = QueueApp()
+    app.input_queue = InputQueue(wait=True)
+    app.input_queue.extend(['say one', 'say two'])
+    app.input_queue.close()
+    result = app.loop()
+    assert result.stop
+    assert app.ran == [['one'], ['two']]
+    out, _ = capsys.readouterr()
+    assert out == ''
+
+
+def test_get_closed():
+    iq = InputQueue()
+    iq.put('one')
+    iq.close()
+    assert iq.get() == 'one'
+    with pytest.raises(EOFError):
+        iq.get()
+    with pytest.raises(ValueError):
+        iq.put('two')
+
+
+#
+# statistics
+#
+def test_stats():
+    clock = FakeClock()
+    iq = InputQueue(clock=clock)
+    iq.extend(['one', 'two'])
+    clock.now = 1
+    iq.pop(0)
+    clock.now = 3
+    iq.pop(0)
+    stats = iq.stats()
+    assert stats.depth == 0
+    assert stats.max_depth == 2
+    assert stats.puts == 2
+    assert stats.gets == 2
+    assert stats.mean_wait == pytest.approx(2)
+    assert stats.max_wait == pytest.approx(3)
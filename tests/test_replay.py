@@ -0,0 +1,106 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import pytest
+
+import cmdsh
+from cmdsh import replay
+from cmdsh.store import SQLiteRecordStore
+from cmdsh.utils import percentile
+
+
+class ReplayApp(cmdsh.Shell):
+    """An app which says things"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_module(cmdsh.modules.DefaultResult)
+
+    def do_say(self, statement):
+        self.wout(' '.join(statement.arglist))
+
+
+def test_percentile():
+    values = [1, 2, 3, 4, 5]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 50) == 3
+    assert percentile(values, 100) == 5
+    assert percentile(values, 90) == pytest.approx(4.6)
+    assert percentile([7], 99) == 7
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def test_load_file(tmpdir):
+    path = tmpdir.join('session.txt')
+    path.write('say one\n\nsay two\n')
+    assert replay.load_file(str(path)) == [('say one', None), ('say two', None)]
+
+
+def test_load_store():
+    store = SQLiteRecordStore(':memory:')
+    app = ReplayApp()
+    app.record_store = store
+    app.do('say one')
+    app.do('say two')
+    session = replay.load_store(store, command='say')
+    store.close()
+    assert [line for line, _ in session] == ['say one', 'say two']
+    assert session[0][1] <= session[1][1]
+
+
+def test_replay(capsys):
+    session = [('say one', None), ('say two', None), ('bogus', None)]
+    report = replay.Replay(ReplayApp, session, shells=3).run()
+    assert report.statements == 9
+    assert report.errors == 3
+    assert report.throughput > 0
+    assert len(report.latencies['say']) == 6
+    summary = report.summary()
+    assert summary['say']['count'] == 6
+    assert summary['say']['p50'] <= summary['say']['max']
+    assert 'say' in report.format()
+    out, err = capsys.readouterr()
+    assert not out
+    assert not err
+
+
+def test_replay_from_template():
+    template = ReplayApp()
+    report = replay.Replay(template.clone, [('say one', None)], shells=2).run()
+    assert report.statements == 2
+    assert not template.history
+
+
+def test_replay_not_quiet(capsys):
+    replay.Replay(ReplayApp, [('say hi', None)], quiet=False).run()
+    out, _ = capsys.readouterr()
+    assert out == 'hi'
+
+
+def test_replay_pacing():
+    session = [('say one', 100.0), ('say two', 100.2)]
+    report = replay.Replay(ReplayApp, session, speed=2).run()
+    assert report.elapsed >= 0.1
+    report = replay.Replay(ReplayApp, session).run()
+    assert report.elapsed < 0.1
@@ -0,0 +1,249 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import re
+
+import pytest
+
+import cmdsh
+from cmdsh.modules.rewrite import RewriteRules
+
+
+#
+# test RewriteRules
+#
+def test_no_rules():
+    assert RewriteRules().rewrite('echo hello') == 'echo hello'
+
+
+def test_rules_in_one_scan():
+    rules = RewriteRules([
+        (r'\bfoo\b', 'bar'),
+        (r'\bbar\b', 'baz'),
+    ])
+    # rewritten text isn't rewritten again
+    assert rules.rewrite('foo bar') == 'bar baz'
+    assert len(rules) == 2
+
+
+def test_first_rule_wins():
+    rules = RewriteRules([
+        (r'ab', '1'),
+        (r'abc', '2'),
+    ])
+    assert rules.rewrite('abc') == '1c'
+
+
+def test_numbered_groups():
+    rules = RewriteRules([
+        (r'(\w+)=(\w+)', r'set \1 \2'),
+        (r'(\d+)\+(\d+)', r'add \2 \g<1>'),
+    ])
+    assert rules.rewrite('x=1; 2+3') == 'set x 1; add 3 2'
+
+
+def test_whole_match():
+    rules = RewriteRules([
+        (r'a', 'A'),
+        (r'\d+', r'<\g<0>>'),
+    ])
+    assert rules.rewrite('a12a') == 'A<12>A'
+
+
+def test_named_groups():
+    rules = RewriteRules([
+        (r'(?P<word>[a-z]+)!', r'\g<word>\g<word>'),
+        (r'(?P<word>[0-9]+)\?', r'[\g<word>]'),
+    ])
+    assert rules.rewrite('hi! 42?') == 'hihi [42]'
+
+
+def test_backreferences_in_expression():
+    rules = RewriteRules([
+        (r'(x)(y)', 'XY'),
+        (r'(\w)\1', r'double \1'),
+        (r'(?P<char>\w)-(?P=char)', r'dash \g<char>'),
+    ])
+    assert rules.rewrite('aa b-b xy') == 'double a dash b XY'
+
+
+def test_conditionals_in_expression():
+    rules = RewriteRules([(r'(x)', 'Y'), (r'(a)(?(1)b|c)', 'X')])
+    assert rules.rewrite('ab ac') == 'X ac'
+    rules = RewriteRules([(r'(?P<q>x)', 'Y'), (r'(?P<q>")?\w+(?(q)")', 'W')])
+    assert rules.rewrite('x "ab" cd') == 'Y W W'
+
+
+def test_groupdict_empty_match():
+    rules = RewriteRules([(r'<(?P<word>\w*)(?P<rest>!)?>', lambda m: repr(m.groupdict('-')))])
+    assert rules.rewrite('<>') == "{'word': '', 'rest': '-'}"
+
+
+def test_character_class_is_not_renumbered():
+    rules = RewriteRules([
+        (r'(a)', 'A'),
+        (r'[\]\1(]+', '_'),
+    ])
+    assert rules.rewrite('a]\x01(') == 'A_'
+
+
+def test_callable_replacement():
+    def upper(match):
+        assert match.groups() == (match.group(1),)
+        assert match.groupdict() == {'word': match.group('word')}
+        assert match.span() == (match.start(), match.end())
+        return match.group('word').upper()
+
+    rules = RewriteRules([
+        (r'(\d)', r'#\1'),
+        (r'\{(?P<word>\w+)\}', upper),
+    ])
+    assert rules.rewrite('1 {abc} 2') == '#1 ABC #2'
+
+
+def test_prefix_rules():
+    rules = RewriteRules()
+    rules.add_prefix('?', 'help ')
+    rules.add_prefix('!', r'shell \1 ')
+    assert rules.rewrite('?alias') == 'help alias'
+    assert rules.rewrite('!ls') == r'shell \1 ls'
+    assert rules.rewrite('echo ?') == 'echo ?'
+
+
+def test_flags():
+    rules = RewriteRules([(r'hello', 'hi')], flags=re.IGNORECASE)
+    assert rules.rewrite('HELLO') == 'hi'
+
+
+def test_leading_inline_flags():
+    rules = RewriteRules([
+        (r'foo', 'bar'),
+        (r'(?i)baz', 'qux'),
+        ('(?x) z+  # some zs', 'Z'),
+    ])
+    assert rules.rewrite('FOO BAZ baz foo zz') == 'FOO qux qux bar Z'
+
+
+def test_errors_raised_when_added():
+    rules = RewriteRules([(r'(a)' * 100, 'many')])
+    with pytest.raises(re.error):
+        rules.add(r'(b)\1', 'bb')
+    with pytest.raises(re.error):
+        rules.extend([(r'c', 'd'), (r'(b)\1', 'bb')])
+    assert len(rules) == 1
+    assert rules.rewrite('a' * 100 + 'bbc') == 'manybbc'
+
+
+def test_extend():
+    rules = RewriteRules()
+    rules.extend([(r'a', 'b'), (r'c', 'd')])
+    assert rules.rewrite('ac') == 'bd'
+
+
+def test_invalid_rules():
+    rules = RewriteRules()
+    with pytest.raises(re.error):
+        rules.add(r'(', 'x')
+    with pytest.raises(re.error):
+        rules.add(r'(a)', r'\2')
+    with pytest.raises(re.error):
+        rules.add(r'(a)', r'\g<name>')
+    assert not rules
+
+
+def test_add_after_rewrite():
+    rules = RewriteRules([(r'a', 'b')])
+    assert rules.rewrite('ac') == 'bc'
+    rules.add(r'c', 'd')
+    assert rules.rewrite('ac') == 'bd'
+
+
+def test_copy():
+    rules = RewriteRules([(r'a', 'b')])
+    other = rules.copy()
+    other.add(r'c', 'd')
+    assert rules.rewrite('ac') == 'bc'
+    assert other.rewrite('ac') == 'bd'
+
+
+def test_many_rules():
+    rules = RewriteRules((r'\bw{}\b'.format(num), 'v{}'.format(num)) for num in range(200))
+    rules.add(r'(\d)(\d)', r'\2\1')
+    assert rules.rewrite('w150 w7 12') == 'v150 v7 21'
+
+
+#
+# test the Rewrite module
+#
+class RewriteApp(cmdsh.Shell):
+    """An app which records the arguments of each command"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.argvs = []
+
+    def do_echo(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.argvs.append(statement.argv)
+        return cmdsh.Result()
+
+
+class PosixPersonality(cmdsh.personalities.SimplePersonality):
+    def __init__(self):
+        super().__init__()
+        self.parser = cmdsh.parsers.PosixShellParser()
+
+
+@pytest.fixture
+def app():
+    app = RewriteApp(personality=PosixPersonality())
+    app.load_module(cmdsh.modules.Rewrite([
+        (r'^say\b', 'echo'),
+        (r'\$HOME', '/home/user'),
+    ]))
+    return app
+
+
+def test_rewrite_module(app):
+    app.do('say $HOME')
+    assert app.argvs == [['echo', '/home/user']]
+
+
+def test_rewrite_module_rules_object():
+    rules = RewriteRules()
+    rules.add_prefix('.', 'echo ')
+    app = RewriteApp()
+    app.load_module(cmdsh.modules.Rewrite(rules))
+    app.do('.hello')
+    assert app.argvs == [['echo', 'hello']]
+    # the shell has it's own copy
+    rules.add_prefix('echo', 'bogus')
+    app.do('echo again')
+    assert app.argvs[-1] == ['echo', 'again']
+
+
+def test_rewrite_module_clone(app):
+    new = app.clone()
+    new._rewrite_rules.add(r'\bworld\b', 'there')
+    new.do('say world')
+    app.do('say world')
+    assert new.argvs == [['echo', 'there']]
+    assert app.argvs == [['echo', 'world']]
@@ -0,0 +1,204 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+import cmdsh
+import cmdsh.server
+
+
+class SayShell(cmdsh.Shell):
+    """A shell with a command which produces output"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prompt = ''
+        self.load_module(cmdsh.modules.ExitCommand)
+
+    def do_say(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        """Repeat back the arguments"""
+        self.wout('{}\n'.format(' '.join(statement.arglist)))
+        return cmdsh.Result()
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def run_server(loop, server, client):
+    """start a tcp server, run the client coroutine against it, and shut it all down"""
+    async def main():
+        await server.start_tcp()
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await client(port)
+        finally:
+            server.close()
+            await server.wait_closed()
+    return loop.run_until_complete(main())
+
+
+async def converse(port, data):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(data)
+    output = await reader.read()
+    writer.close()
+    return output
+
+
+def test_session_output(loop):
+    server = cmdsh.server.ShellServer(SayShell)
+
+    async def client(port):
+        return await converse(port, b'say hello\nsay there\nexit\n')
+
+    assert run_server(loop, server, client) == b'hello\nthere\n'
+
+
+def test_session_command_not_found(loop):
+    server = cmdsh.server.ShellServer(SayShell)
+
+    async def client(port):
+        return await converse(port, b'thisisnotacommand\nexit\n')
+
+    assert b'command not found' in run_server(loop, server, client)
+
+
+def test_concurrent_sessions(loop):
+    server = cmdsh.server.ShellServer(SayShell)
+
+    async def client(port):
+        return await asyncio.gather(*[
+            converse(port, 'say {}\nexit\n'.format(num).encode())
+            for num in range(50)
+        ])
+
+    outputs = run_server(loop, server, client)
+    assert outputs == ['{}\n'.format(num).encode() for num in range(50)]
+
+
+def test_sessions_get_their_own_shell(loop):
+    shells = []
+
+    def factory():
+        shell = SayShell()
+        shells.append(shell)
+        return shell
+
+    server = cmdsh.server.ShellServer(factory)
+
+    async def client(port):
+        await converse(port, b'say one\nexit\n')
+        await converse(port, b'say two\nsay three\nexit\n')
+
+    run_server(loop, server, client)
+    assert len(shells) == 2
+    assert len(shells[0].history) == 2
+    assert len(shells[1].history) == 3
+
+
+def test_max_sessions(loop):
+    server = cmdsh.server.ShellServer(SayShell, max_sessions=1)
+
+    async def client(port):
+        first_reader, first_writer = await asyncio.open_connection('127.0.0.1', port)
+        first_writer.write(b'say first\n')
+        assert await first_reader.readline() == b'first\n'
+        second = await converse(port, b'')
+        first_writer.write(b'exit\n')
+        await first_reader.read()
+        first_writer.close()
+        return second
+
+    assert run_server(loop, server, client) == b'too many sessions\n'
+
+
+def test_max_statements(loop):
+    server = cmdsh.server.ShellServer(SayShell, max_statements=1)
+
+    async def client(port):
+        return await converse(port, b'say one\nsay two\n')
+
+    assert run_server(loop, server, client) == b'one\nstatement limit reached\n'
+
+
+def test_max_line_length(loop):
+    server = cmdsh.server.ShellServer(SayShell, max_line_length=64)
+
+    async def client(port):
+        return await converse(port, b'say ' + b'x' * 200 + b'\n')
+
+    assert run_server(loop, server, client) == b'line too long\n'
+
+
+def test_idle_timeout(loop):
+    server = cmdsh.server.ShellServer(SayShell, idle_timeout=0.05)
+
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        output = await reader.read()
+        writer.close()
+        return output
+
+    assert run_server(loop, server, client) == b'session idle too long\n'
+
+
+def test_prompt(loop):
+    def factory():
+        shell = SayShell()
+        shell.prompt = 'p> '
+        return shell
+
+    server = cmdsh.server.ShellServer(factory)
+
+    async def client(port):
+        return await converse(port, b'say hi\nexit\n')
+
+    assert run_server(loop, server, client) == b'p> hi\np> '
+
+
+@pytest.mark.skipif(not hasattr(asyncio, 'start_unix_server'), reason='requires unix sockets')
+def test_unix_socket(loop):
+    server = cmdsh.server.ShellServer(SayShell)
+    path = os.path.join(tempfile.mkdtemp(), 'cmdsh.sock')
+
+    async def main():
+        await server.start_unix(path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b'say unix\nexit\n')
+            output = await reader.read()
+            writer.close()
+            return output
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    assert loop.run_until_complete(main()) == b'unix\n'
@@ -21,6 +21,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import collections
+import sys
+import threading
+
 import pytest
 
 import cmdsh
@@ -137,3 +141,617 @@ def test_modules_only_load_once(shell):
     assert shell.is_module_loaded(cmdsh.modules.ExitCommand)
     shell.load_module(cmdsh.modules.ExitCommand)
     assert list(shell._modules.keys()) == [cmdsh.modules.ExitCommand]
+
+
+#
+# test cloning
+#
+class Counter:
+    """A module with private state and a hook"""
+    def load(self, shell):
+        shell._counter_count = 0
+        shell._counter_names = []
+        cmdsh.utils.rebind_method(self.do_count, shell)
+        cmdsh.utils.rebind_method(self._counter_hook, shell)
+        shell.register_postparse_hook(shell._counter_hook)
+
+    def do_count(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self._counter_names.append(statement.raw)
+        return cmdsh.Result()
+
+    def _counter_hook(self, statement: cmdsh.Statement) -> cmdsh.Statement:
+        self._counter_count += 1
+        return statement
+
+
+def test_clone_is_independent(shell):
+    shell.load_module(Counter)
+    shell.do('count one')
+    shell.input_queue.append('count two')
+
+    clone = shell.clone()
+    assert clone is not shell
+    assert clone.history == []
+    assert clone.input_queue == []
+    assert clone.is_module_loaded(Counter)
+
+    clone.do('count three')
+    assert clone._counter_count == 2
+    assert clone._counter_names == ['count one', 'count three']
+    assert shell._counter_count == 1
+    assert shell._counter_names == ['count one']
+    assert len(shell.history) == 1
+    assert len(clone.history) == 1
+
+
+def test_clone_rebinds_methods(shell):
+    shell.load_module(cmdsh.modules.ExitCommand)
+    clone = shell.clone()
+    assert clone.do_exit.__self__ is clone
+    assert clone._postparse_hooks is not shell._postparse_hooks
+
+
+def test_clone_keeps_container_types(shell):
+    shell._x_counts = collections.defaultdict(int)
+    shell._x_counter = collections.Counter(['a'])
+    shell._x_ordered = collections.OrderedDict([('b', shell.do)])
+    clone = shell.clone()
+    clone._x_counts['k'] += 1
+    assert clone._x_counts == {'k': 1}
+    assert shell._x_counts == {}
+    assert isinstance(clone._x_counter, collections.Counter)
+    assert clone._x_counter is not shell._x_counter
+    assert isinstance(clone._x_ordered, collections.OrderedDict)
+    assert clone._x_ordered['b'].__self__ is clone
+
+
+class CountingPersonality(cmdsh.personalities.SimplePersonality):
+    """A personality which counts how many times it has been bound"""
+    def __init__(self):
+        super().__init__()
+        self.binds = 0
+
+    def bind(self, shell):
+        self.binds += 1
+
+
+def test_clone_does_not_rebind_personality():
+    personality = CountingPersonality()
+    shell = cmdsh.Shell(personality=personality)
+    shell.clone()
+    assert personality.binds == 1
+
+
+def test_clone_modules_load_once(shell):
+    shell.load_module(cmdsh.modules.ExitCommand)
+    clone = shell.clone()
+    clone.load_module(cmdsh.modules.ExitCommand)
+    assert list(clone._modules.keys()) == [cmdsh.modules.ExitCommand]
+    assert clone.do('exit').stop
+
+
+#
+# test compound statements
+#
+class PosixPersonality(cmdsh.personalities.SimplePersonality):
+    """A personality which uses the posix parser"""
+    def __init__(self, multiline=False):
+        super().__init__()
+        self.parser = cmdsh.parsers.PosixShellParser(multiline=multiline)
+
+
+class CompoundApp(cmdsh.Shell):
+    """An app with commands that succeed and fail"""
+    def __init__(self, multiline=False):
+        super().__init__(personality=PosixPersonality(multiline))
+        self.load_module(cmdsh.modules.ExitCommand)
+        self.executed = []
+
+    def do_true(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.executed.append(statement.raw)
+        return cmdsh.Result(exit_code=0)
+
+    def do_false(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.executed.append(statement.raw)
+        return cmdsh.Result(exit_code=1)
+
+
+@pytest.fixture
+def compound():
+    return CompoundApp()
+
+
+def test_compound_sequence(compound):
+    result = compound.do('true 1; false 2; true 3')
+    assert compound.executed == ['true 1', 'false 2', 'true 3']
+    assert result.exit_code == 0
+
+
+def test_compound_and(compound):
+    result = compound.do('true 1 && false 2 && true 3')
+    assert compound.executed == ['true 1', 'false 2']
+    assert result.exit_code == 1
+
+
+def test_compound_or(compound):
+    result = compound.do('false 1 || true 2 || false 3')
+    assert compound.executed == ['false 1', 'true 2']
+    assert result.exit_code == 0
+
+
+def test_compound_mixed(compound):
+    compound.do('true 1 || false 2 && true 3')
+    assert compound.executed == ['true 1', 'true 3']
+
+
+def test_compound_stop(compound):
+    result = compound.do('true 1; exit; true 2')
+    assert compound.executed == ['true 1']
+    assert result.stop
+
+
+def test_compound_single_history_record(compound):
+    compound.do('true 1 && false 2 || true 3')
+    assert len(compound.history) == 1
+    record = compound.history[0]
+    assert record.statement.raw == 'true 1 && false 2 || true 3'
+    assert record.statement.argv == ['true', '1', '&&', 'false', '2', '||', 'true', '3']
+    assert [stmt.raw for stmt in record.statements] == ['true 1', 'false 2', 'true 3']
+    assert record.result.exit_code == 0
+
+
+def test_compound_command_not_found(compound):
+    with pytest.raises(cmdsh.CommandNotFound):
+        compound.do('true 1; {}; true 2'.format(INVALID_COMMAND))
+    assert compound.executed == ['true 1']
+    assert len(compound.history) == 1
+
+
+def test_history_record(shell):
+    shell.load_module(cmdsh.modules.ExitCommand)
+    result = shell.do('exit')
+    assert len(shell.history) == 1
+    assert shell.history[0].statement.command == 'exit'
+    assert shell.history[0].statements == [shell.history[0].statement]
+    assert shell.history[0].result is result
+
+
+#
+# test payloads and pipes
+#
+class PayloadApp(CompoundApp):
+    """An app with commands which return and consume payloads"""
+    def do_rows(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        rows = [{'name': name, 'size': len(name)} for name in statement.arglist]
+        return cmdsh.Result(payload=rows)
+
+    def do_count(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.received = statement.input
+        return cmdsh.Result(payload=len(statement.input or []))
+
+    def do_text(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        return cmdsh.Result(payload=' '.join(statement.arglist))
+
+    def do_echo(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.wout(' '.join(statement.arglist) + '\n')
+        return cmdsh.Result()
+
+
+@pytest.fixture
+def payloads():
+    return PayloadApp()
+
+
+def test_payload_returned(payloads, capsys):
+    result = payloads.do('rows a bb')
+    assert result.payload == [{'name': 'a', 'size': 1}, {'name': 'bb', 'size': 2}]
+    # do() doesn't render payloads
+    out, _ = capsys.readouterr()
+    assert not out
+    # the history doesn't keep payloads
+    assert payloads.history[-1].result.payload is None
+    assert payloads.history[-1].result.exit_code == 0
+
+
+def test_pipe(payloads):
+    result = payloads.do('rows a bb | count')
+    assert result.payload == 2
+    assert payloads.received == [{'name': 'a', 'size': 1}, {'name': 'bb', 'size': 2}]
+    assert [stmt.operator for stmt in payloads.history[-1].statements] == ['', '|']
+
+
+@pytest.mark.parametrize('line, executed, exit_code', [
+    ('false 1 && true 2 | true 3', ['false 1'], 1),
+    ('true 1 || true 2 | true 3', ['true 1'], 0),
+    ('false 1 || false 2 | true 3', ['false 1', 'false 2', 'true 3'], 0),
+    ('true 1 | false 2 && true 3', ['true 1', 'false 2'], 1),
+    ('false 1 && true 2 | true 3 || true 4 | true 5', ['false 1', 'true 4', 'true 5'], 0),
+])
+def test_pipeline_binds_tighter(payloads, line, executed, exit_code):
+    result = payloads.do(line)
+    assert payloads.executed == executed
+    assert result.exit_code == exit_code
+
+
+def test_pipe_history_drops_input(payloads, monkeypatch, tmpdir):
+    monkeypatch.setattr(
+        payloads, 'do_rows', lambda statement: cmdsh.Result(payload=(x for x in 'abc'))
+    )
+    monkeypatch.setattr(
+        payloads,
+        'do_count',
+        lambda statement: cmdsh.Result(payload=sum(1 for _ in statement.input)),
+    )
+    assert payloads.do('rows | count').payload == 3
+    assert all(stmt.input is None for stmt in payloads.history[-1].statements)
+    payloads.snapshot(str(tmpdir.join('snapshot')))
+
+
+def test_pipe_is_not_copied(payloads, monkeypatch):
+    data = [{'name': 'x'}]
+    monkeypatch.setattr(payloads, 'do_rows', lambda statement: cmdsh.Result(payload=data))
+    payloads.do('rows|count')
+    assert payloads.received is data
+
+
+def test_render_payloads(payloads, capsys):
+    payloads.do('rows a bb | count; text hello && rows ccc')
+    payloads.render_payloads()
+    out, _ = capsys.readouterr()
+    assert out == '2\nhello\nname  size\nccc      3\n'
+    payloads.render_payloads()
+    out, _ = capsys.readouterr()
+    assert not out
+
+
+def test_render_payloads_in_order(payloads, capsys):
+    payloads.do('text first; echo second; text third && echo fourth; text fifth')
+    out, _ = capsys.readouterr()
+    assert out == 'first\nsecond\nthird\nfourth\n'
+    payloads.render_payloads()
+    out, _ = capsys.readouterr()
+    assert out == 'fifth\n'
+
+
+def test_render_payload_types(payloads, capsys):
+    payloads.render_payload('text')
+    payloads.render_payload(b'bytes\n')
+    payloads.render_payload({'one': 1})
+    payloads.render_payload(iter(['a', 'b']))
+    payloads.render_payload([])
+    payloads.render_payload(None)
+    out, _ = capsys.readouterr()
+    assert out == 'text\nbytes\nkey  value\none      1\na\nb\n'
+
+
+def test_loop_renders_payloads(payloads, capsys):
+    payloads.input_queue = ['text one | count', 'text two; bogus', 'exit']
+    payloads.loop()
+    out, err = capsys.readouterr()
+    assert out == '3\ntwo\n'
+    assert err == 'bogus: command not found\n'
+
+
+#
+# test multiline statements
+#
+def test_continuation_prompt(shell):
+    assert shell.render_continuation_prompt() == '> '
+    shell.continuation_prompt = '... '
+    assert shell.render_continuation_prompt() == '... '
+
+
+def test_multiline_statement():
+    app = CompoundApp(multiline=True)
+    app.input_queue.extend(['true "one', 'two" \\', 'three && true four', 'exit'])
+    app.loop()
+    assert app.executed == ['true "one\ntwo" three', 'true four']
+
+
+def test_multiline_operator_continuation():
+    app = CompoundApp(multiline=True)
+    app.input_queue.extend(['true one &&', '# comment', 'true two', 'exit'])
+    app.loop()
+    assert app.executed == ['true one', 'true two']
+
+
+def test_multiline_eof(mocker):
+    app = CompoundApp(multiline=True)
+    app.input_queue.append('true "one')
+    mock_input = mocker.patch('builtins.input')
+    mock_input.side_effect = EOFError()
+    last_result = app.loop()
+    assert last_result.stop
+    assert mock_input.call_args == mocker.call('> ')
+    assert app.executed == []
+
+
+#
+# test bytes input
+#
+class BytesPersonality(cmdsh.personalities.SimplePersonality):
+    """A personality which parses bytes"""
+    def __init__(self):
+        super().__init__()
+        self.parser = cmdsh.parsers.BytesParser()
+
+
+class BytesApp(cmdsh.Shell):
+    """An app which keeps the statements it executes"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = []
+
+    def do_keep(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        self.statements.append(statement)
+        return cmdsh.Result()
+
+
+@pytest.mark.parametrize('line', [
+    b'keep one two',
+    bytearray(b'keep one two'),
+    memoryview(b'keep one two'),
+])
+def test_do_bytes(line):
+    app = BytesApp(personality=BytesPersonality())
+    app.do(line)
+    stmt = app.statements[0]
+    assert isinstance(stmt, cmdsh.models.BytesStatement)
+    assert stmt.raw is line
+    assert stmt.arglist == ['one', 'two']
+
+
+def test_do_bytes_history_copies_buffer(tmpdir):
+    app = BytesApp(personality=BytesPersonality())
+    buffer = bytearray(b'keep one two')
+    app.do(buffer)
+    app.do(memoryview(b'keep three'))
+    buffer[:] = b'xxxx xxx xxx'
+    record = app.history[0]
+    assert record.statement is record.statements[0]
+    assert record.statement.raw == b'keep one two'
+    assert record.statement.arglist == ['one', 'two']
+    assert app.history[1].statement.raw == b'keep three'
+    app.snapshot(str(tmpdir.join('snapshot')))
+
+
+def test_do_bytes_history_module(tmpdir, capsys):
+    app = BytesApp(personality=BytesPersonality())
+    app.load_module(cmdsh.modules.History)
+    buffer = bytearray(b'keep one two')
+    app.do(buffer)
+    app.do(memoryview(b'keep three'))
+    buffer[:] = b'xxxx xxx xxx'
+    assert app._history == ['keep one two', 'keep three']
+    app.snapshot(str(tmpdir.join('snapshot')))
+    app.do_hist(cmdsh.Statement('hist'))
+    out, _ = capsys.readouterr()
+    assert out == 'keep one two\nkeep three'
+
+
+def test_do_bytes_decoded():
+    app = BytesApp()
+    app.do(b'keep one two')
+    stmt = app.statements[0]
+    assert not isinstance(stmt, cmdsh.models.BytesStatement)
+    assert stmt.raw == 'keep one two'
+    assert stmt.arglist == ['one', 'two']
+
+
+def test_do_bytes_command_not_found():
+    app = BytesApp(personality=BytesPersonality())
+    with pytest.raises(cmdsh.CommandNotFound):
+        app.do(INVALID_COMMAND.encode())
+
+
+#
+# test lazy module loading
+#
+LAZY_MODULE = '''
+import cmdsh
+
+class Greeter:
+    def load(self, shell):
+        cmdsh.utils.rebind_method(self.do_hello, shell)
+        cmdsh.utils.rebind_method(self.do_goodbye, shell)
+
+    def do_hello(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        return cmdsh.Result(exit_code=10)
+
+    def do_goodbye(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        return cmdsh.Result(exit_code=20)
+'''
+
+
+@pytest.fixture
+def lazymodule(tmpdir, monkeypatch):
+    tmpdir.join('cmdsh_lazy_greeter.py').write(LAZY_MODULE)
+    monkeypatch.syspath_prepend(str(tmpdir))
+    yield 'cmdsh_lazy_greeter:Greeter'
+    sys.modules.pop('cmdsh_lazy_greeter', None)
+
+
+def test_lazy_module_by_name(shell, lazymodule):
+    shell.register_lazy_module(lazymodule, ['hello', 'goodbye'])
+    assert 'cmdsh_lazy_greeter' not in sys.modules
+    assert shell.do('hello').exit_code == 10
+    assert 'cmdsh_lazy_greeter' in sys.modules
+    assert shell.do('goodbye').exit_code == 20
+    assert len(shell._modules) == 1
+    assert not shell._lazy_modules
+
+
+def test_lazy_module_class(shell):
+    shell.register_lazy_module(cmdsh.modules.ExitCommand, ['exit'])
+    assert not shell.is_module_loaded(cmdsh.modules.ExitCommand)
+    assert shell.do('exit').stop
+    assert shell.is_module_loaded(cmdsh.modules.ExitCommand)
+
+
+def test_lazy_module_wrong_commands(shell):
+    shell.register_lazy_module(cmdsh.modules.ExitCommand, ['quit'])
+    with pytest.raises(cmdsh.CommandNotFound):
+        shell.do('quit')
+    assert shell.is_module_loaded(cmdsh.modules.ExitCommand)
+
+
+def test_commands(shell, lazymodule):
+    shell.load_module(cmdsh.modules.ExitCommand)
+    shell.register_lazy_module(lazymodule, ['hello', 'goodbye'])
+    assert shell.commands() == ['exit', 'goodbye', 'hello']
+    assert 'cmdsh_lazy_greeter' not in sys.modules
+
+
+def test_command_generation(shell):
+    generation = shell.command_generation
+    shell.load_module(cmdsh.modules.ExitCommand)
+    assert shell.command_generation > generation
+    generation = shell.command_generation
+    shell.prompt = 'changed: '
+    assert shell.command_generation == generation
+    shell.register_lazy_module(cmdsh.modules.History, ['hist'])
+    assert shell.command_generation > generation
+    generation = shell.command_generation
+
+    def do_hello(self, statement):
+        return cmdsh.Result()
+    cmdsh.utils.bind_function(do_hello, shell)
+    assert shell.command_generation > generation
+    generation = shell.command_generation
+    del shell.do_hello
+    shell.commands_changed()
+    assert shell.command_generation > generation
+
+
+#
+# test module dependencies
+#
+LOAD_ORDER = []
+
+
+class Base:
+    provides = ('_base_value',)
+
+    def load(self, shell):
+        LOAD_ORDER.append('Base')
+        shell._base_value = 1
+
+
+class Middle:
+    requires = (Base,)
+
+    def load(self, shell):
+        LOAD_ORDER.append('Middle')
+        shell._middle_value = shell._base_value + 1
+
+
+class Top:
+    requires = (Middle, Base)
+
+    def load(self, shell):
+        LOAD_ORDER.append('Top')
+
+
+class CycleA:
+    def load(self, shell):
+        pass
+
+
+class CycleB:
+    requires = (CycleA,)
+
+    def load(self, shell):
+        pass
+
+
+CycleA.requires = (CycleB,)
+
+
+class AlsoProvidesBase:
+    provides = ('_base_value',)
+
+    def load(self, shell):
+        pass
+
+
+@pytest.fixture
+def load_order():
+    LOAD_ORDER.clear()
+    return LOAD_ORDER
+
+
+def test_module_requires(shell, load_order):
+    shell.load_module(Top)
+    assert load_order == ['Base', 'Middle', 'Top']
+    assert shell._middle_value == 2
+    assert shell.is_module_loaded(Base)
+    assert shell.is_module_loaded(Middle)
+
+
+def test_module_requires_already_loaded(shell, load_order):
+    shell.load_module(Base)
+    shell.load_modules([Top, Middle])
+    assert load_order == ['Base', 'Middle', 'Top']
+
+
+def test_module_requires_cycle(shell):
+    with pytest.raises(cmdsh.ModuleDependencyError) as excinfo:
+        shell.load_module(CycleA)
+    assert 'CycleA -> CycleB -> CycleA' in str(excinfo.value)
+    assert not shell._modules
+
+
+def test_module_provides_collision(shell):
+    with pytest.raises(cmdsh.ModuleDependencyError):
+        shell.load_modules([Base, AlsoProvidesBase])
+    assert not shell._modules
+
+
+def test_module_provides_existing_attribute(shell):
+    shell.load_module(Base)
+    with pytest.raises(cmdsh.ModuleDependencyError):
+        shell.load_module(AlsoProvidesBase)
+
+
+def test_module_provides_replaces_class_method():
+    class App(cmdsh.Shell):
+        def do_exit(self, statement):
+            return cmdsh.Result(exit_code=5)
+
+    app = App(personality=cmdsh.personalities.StandardLibraryPersonality())
+    assert app.is_module_loaded(cmdsh.modules.ExitCommand)
+    assert app.do('exit').stop
+
+
+class SlowModule:
+    """A module with slow, independent setup"""
+    def __init__(self):
+        self.prepared = False
+
+    def prepare(self):
+        PREPARE_BARRIER.wait(timeout=5)
+        self.prepared = True
+
+    def load(self, shell):
+        assert self.prepared
+
+
+class SlowModuleOne(SlowModule):
+    pass
+
+
+class SlowModuleTwo(SlowModule):
+    pass
+
+
+PREPARE_BARRIER = threading.Barrier(2)
+
+
+def test_modules_prepare_concurrently(shell):
+    # each prepare() waits for the other, so this only completes if they
+    # run at the same time
+    PREPARE_BARRIER.reset()
+    shell.load_modules([SlowModuleOne, SlowModuleTwo])
+    assert shell.is_module_loaded(SlowModuleOne)
+    assert shell.is_module_loaded(SlowModuleTwo)
+
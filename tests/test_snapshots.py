@@ -0,0 +1,137 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import pickle
+
+import pytest
+
+import cmdsh
+import cmdsh.snapshots
+
+
+class SayApp(cmdsh.Shell):
+    """A simple app with history"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_module(cmdsh.modules.History)
+
+    def do_say(self, statement: cmdsh.Statement) -> cmdsh.Result:
+        """Repeat back the arguments"""
+        self.wout('{}\n'.format(' '.join(statement.arglist)))
+        return cmdsh.Result()
+
+
+@pytest.fixture
+def snapfile(tmpdir):
+    return os.path.join(str(tmpdir), 'shell.snapshot')
+
+
+def test_snapshot_restore(snapfile, capsys):
+    app = SayApp()
+    app.prompt = 'snap: '
+    for num in range(10):
+        app.do('say {}'.format(num))
+    app.input_queue.append('say queued')
+    app.snapshot(snapfile)
+    capsys.readouterr()
+
+    restored = SayApp()
+    restored.restore(snapfile)
+    assert restored.prompt == 'snap: '
+    assert restored.input_queue == ['say queued']
+    assert restored._history == ['say {}'.format(num) for num in range(10)]
+    assert len(restored.history) == 10
+    assert restored.history[3].statement.argv == ['say', '3']
+    assert restored.history[-1].statement.raw == 'say 9'
+    assert [record.statement.raw for record in restored.history[8:]] == ['say 8', 'say 9']
+
+
+def test_restored_history_is_lazy(snapfile, capsys):
+    app = SayApp()
+    for num in range(5):
+        app.do('say {}'.format(num))
+    app.snapshot(snapfile)
+    capsys.readouterr()
+
+    restored = SayApp()
+    restored.restore(snapfile)
+    assert isinstance(restored.history, cmdsh.snapshots.LazyHistory)
+    assert restored.history._cache == {}
+    assert restored.history[2].statement.raw == 'say 2'
+    assert list(restored.history._cache.keys()) == [2]
+
+
+def test_restored_history_append(snapfile, capsys):
+    app = SayApp()
+    app.do('say one')
+    app.snapshot(snapfile)
+
+    restored = SayApp()
+    restored.restore(snapfile)
+    restored.do('say two')
+    capsys.readouterr()
+    assert [record.statement.raw for record in restored.history] == ['say one', 'say two']
+    del restored.history[0]
+    assert [record.statement.raw for record in restored.history] == ['say two']
+
+
+def test_snapshot_empty(snapfile):
+    app = SayApp()
+    app.snapshot(snapfile)
+    restored = SayApp()
+    restored.restore(snapfile)
+    assert restored.history == []
+    assert restored.input_queue == []
+
+
+def test_snapshot_replaces_file(snapfile, capsys):
+    app = SayApp()
+    app.snapshot(snapfile)
+    app.do('say hello')
+    app.snapshot(snapfile)
+    capsys.readouterr()
+    restored = SayApp()
+    restored.restore(snapfile)
+    assert len(restored.history) == 1
+    assert not os.path.exists('{}.tmp'.format(snapfile))
+
+
+def test_restore_not_a_snapshot(snapfile):
+    with open(snapfile, 'wb') as file:
+        file.write(b'this is not a snapshot file at all')
+    app = SayApp()
+    with pytest.raises(ValueError):
+        app.restore(snapfile)
+
+
+def test_snapshot_failure_removes_temp_file(snapfile, capsys):
+    app = SayApp()
+    app.do('say hello')
+    capsys.readouterr()
+    app.prompt = lambda: None
+    with pytest.raises((AttributeError, TypeError, pickle.PicklingError)):
+        app.snapshot(snapfile)
+    assert not os.path.exists('{}.tmp'.format(snapfile))
+    assert not os.path.exists(snapfile)
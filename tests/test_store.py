@@ -0,0 +1,134 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import time
+
+import pytest
+
+import cmdsh
+from cmdsh.store import RecordStore, SQLiteRecordStore
+
+
+class StoreApp(cmdsh.Shell):
+    """An app with a couple of commands"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_module(cmdsh.modules.DefaultResult)
+
+    def do_true(self, _statement):
+        pass
+
+    def do_false(self, _statement):
+        return cmdsh.Result(exit_code=1)
+
+
+@pytest.fixture
+def store(tmpdir):
+    store = SQLiteRecordStore(str(tmpdir.join('records.db')), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def test_record_times():
+    app = StoreApp()
+    before = time.time()
+    app.do('true')
+    record = app.history[-1]
+    assert before <= record.started <= record.finished <= time.time()
+    assert record.duration == record.finished - record.started
+    assert cmdsh.models.Record().duration is None
+
+
+def test_shell_writes_records(store):
+    app = StoreApp()
+    app.record_store = store
+    app.do('true one')
+    app.do('false two')
+    records = store.query()
+    assert [record.statement.raw for record in records] == ['true one', 'false two']
+    assert records[0].statement.argv == ['true', 'one']
+    assert [record.result.exit_code for record in records] == [0, 1]
+    assert records[1].duration >= 0
+
+
+def test_query_by_command(store):
+    app = StoreApp()
+    app.record_store = store
+    for _ in range(3):
+        app.do('true')
+        app.do('false')
+    assert len(store.query(command='false')) == 3
+    assert len(store.query(command='false', limit=2)) == 2
+    assert not store.query(command='bogus')
+
+
+def test_query_by_time(store):
+    for started in range(10):
+        statement = cmdsh.Statement('true', argv=['true'])
+        store.add(cmdsh.models.Record(
+            statement=statement,
+            result=cmdsh.Result(),
+            statements=[statement],
+            started=started,
+            finished=started + 0.5,
+        ))
+    records = store.query(since=3, until=6)
+    assert [record.started for record in records] == [3, 4, 5]
+    assert records[0].duration == 0.5
+
+
+def test_batches(tmpdir):
+    path = str(tmpdir.join('records.db'))
+    store = SQLiteRecordStore(path, batch_size=7, flush_interval=10)
+    app = StoreApp()
+    app.record_store = store
+    for _ in range(20):
+        app.do('true')
+    # flushing doesn't wait for the flush interval
+    start = time.monotonic()
+    assert len(store.query()) == 20
+    assert time.monotonic() - start < 5
+    store.close()
+    # the records are still there after the store is closed
+    store = SQLiteRecordStore(path)
+    assert len(store.query(command='true')) == 20
+    store.close()
+
+
+def test_memory_database():
+    store = SQLiteRecordStore(':memory:')
+    app = StoreApp()
+    app.record_store = store
+    app.do(b'true bytes')
+    assert store.query()[0].statement.raw == 'true bytes'
+    store.close()
+
+
+def test_base_store():
+    store = RecordStore()
+    with pytest.raises(NotImplementedError):
+        store.add(cmdsh.models.Record())
+    with pytest.raises(NotImplementedError):
+        store.query()
+    store.close()
@@ -0,0 +1,204 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import random
+
+import pytest
+
+import cmdsh
+import cmdsh.suggestions
+from cmdsh.suggestions import DeletionIndex, deletions, levenshtein
+
+
+#
+# test levenshtein()
+#
+@pytest.mark.parametrize('first, second, distance', [
+    ('', '', 0),
+    ('', 'abc', 3),
+    ('help', 'help', 0),
+    ('help', 'hlep', 2),
+    ('kitten', 'sitting', 3),
+    ('exit', 'exits', 1),
+])
+def test_levenshtein(first, second, distance):
+    assert levenshtein(first, second) == distance
+    assert levenshtein(second, first) == distance
+
+
+def test_levenshtein_limit():
+    assert levenshtein('kitten', 'sitting', 1) == 2
+    assert levenshtein('a', 'abcdef', 2) == 3
+    assert levenshtein('kitten', 'sitting', 3) == 3
+
+
+#
+# test DeletionIndex
+#
+def test_deletions():
+    assert deletions('abc', 0) == {'abc'}
+    assert deletions('abc', 1) == {'abc', 'bc', 'ac', 'ab'}
+    assert deletions('ab', 3) == {'ab', 'a', 'b', ''}
+
+
+def test_index_search():
+    index = DeletionIndex(['help', 'hello', 'exit', 'history', 'alias'])
+    assert index.search('helo', 1) == [(1, 'hello'), (1, 'help')]
+    assert index.search('exti', 2) == [(2, 'exit')]
+    assert index.search('zzzzzz', 2) == []
+    assert DeletionIndex().search('help', 2) == []
+
+
+def test_index_search_beyond_max_distance():
+    index = DeletionIndex(['kitten', 'exit'], max_distance=1)
+    assert index.search('sitting', 1) == []
+    assert index.search('sitting', 3) == [(3, 'kitten')]
+
+
+def test_index_matches_brute_force():
+    rnd = random.Random(42)
+    words = {''.join(rnd.choice('abcde') for _ in range(rnd.randint(1, 7))) for _ in range(500)}
+    index = DeletionIndex(words)
+    for _ in range(50):
+        word = ''.join(rnd.choice('abcde') for _ in range(rnd.randint(1, 7)))
+        for max_distance in (1, 2):
+            expected = sorted((levenshtein(word, other), other) for other in words
+                              if levenshtein(word, other) <= max_distance)
+            assert index.search(word, max_distance) == expected
+
+
+def test_index_search_length_out_of_range(monkeypatch):
+    index = DeletionIndex(['help', 'hello', 'exit'])
+    index.remove('hello')
+
+    def fail(word, count):
+        raise AssertionError('deletions() was called')
+    monkeypatch.setattr(cmdsh.suggestions, 'deletions', fail)
+    assert index.search('x' * 1000, 2) == []
+    assert index.search('helloo', 1) == []
+    assert index.search('h', 2) == []
+
+
+def test_index_remove():
+    index = DeletionIndex(['help', 'hello', 'exit'])
+    index.remove('hello')
+    index.remove('bogus')
+    assert 'hello' not in index
+    assert len(index) == 2
+    assert index.search('helo', 1) == [(1, 'help')]
+    index.add('hello')
+    assert index.search('helo', 1) == [(1, 'hello'), (1, 'help')]
+
+
+def test_index_remove_everything():
+    words = ['help', 'hello', 'exit', 'he']
+    index = DeletionIndex(words)
+    for word in words:
+        index.remove(word)
+    assert index.words == frozenset()
+    assert index._deletions == {}
+
+
+def test_index_copy():
+    index = DeletionIndex(['help', 'exit'])
+    other = index.copy()
+    other.add('hello')
+    other.remove('exit')
+    assert index.words == frozenset(['help', 'exit'])
+    assert index.search('helo', 1) == [(1, 'help')]
+    assert index.search('exit', 0) == [(0, 'exit')]
+    assert other.search('helo', 1) == [(1, 'hello'), (1, 'help')]
+    assert other.search('exit', 0) == []
+
+
+#
+# test suggestions from the shell
+#
+class SuggestApp(cmdsh.Shell):
+    """An app with some commands which are easy to misspell"""
+    def do_history(self, statement):
+        return cmdsh.Result()
+
+    def do_hello(self, statement):
+        return cmdsh.Result()
+
+    def do_help(self, statement):
+        return cmdsh.Result()
+
+
+def do_alias(self, statement):
+    return cmdsh.Result()
+
+
+@pytest.fixture
+def app():
+    return SuggestApp()
+
+
+def test_suggest_commands(app):
+    assert app.suggest_commands('hlep') == ['help']
+    assert app.suggest_commands('helo') == ['hello', 'help']
+    assert app.suggest_commands('histroy') == ['history']
+    assert app.suggest_commands('helo', limit=1) == ['hello']
+    assert app.suggest_commands('hlep', max_distance=1) == []
+    assert app.suggest_commands('bogus') == []
+
+
+def test_suggest_commands_not_the_command(app):
+    assert 'help' not in app.suggest_commands('help')
+
+
+def test_suggest_commands_updates(app):
+    assert app.suggest_commands('lias') == []
+    index = app._suggestion_index
+    cmdsh.utils.bind_function(do_alias, app)
+    assert app.suggest_commands('lias') == ['alias']
+    # the index was updated, not rebuilt
+    assert app._suggestion_index.words == index.words | {'alias'}
+    del app.do_alias
+    app.commands_changed()
+    assert app.suggest_commands('lias') == []
+
+
+def test_suggest_commands_clone(app):
+    assert app.suggest_commands('lias') == []
+    new = app.clone()
+    cmdsh.utils.bind_function(do_alias, new)
+    assert new.suggest_commands('lias') == ['alias']
+    assert app.suggest_commands('lias') == []
+    app.do_bias = lambda statement: cmdsh.Result()
+    app.commands_changed()
+    assert app.suggest_commands('lias') == ['bias']
+    assert new.suggest_commands('lias') == ['alias']
+
+
+def test_command_not_found_suggests(app, capsys):
+    app.load_module(cmdsh.modules.ExitCommand)
+    app.input_queue.extend(['histroy', 'bogus', 'exit'])
+    app.loop()
+    _, err = capsys.readouterr()
+    assert err.splitlines() == [
+        'histroy: command not found',
+        'did you mean: history?',
+        'bogus: command not found',
+    ]
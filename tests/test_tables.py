@@ -0,0 +1,115 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Jared Crapo
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import json
+
+import pytest
+
+from cmdsh.tables import TableWriter
+
+
+class Output:
+    """Collect what's written, one string per write"""
+    def __init__(self):
+        self.writes = []
+
+    def __call__(self, data):
+        self.writes.append(data)
+
+    @property
+    def text(self):
+        return ''.join(self.writes)
+
+
+def test_text_table():
+    out = Output()
+    with TableWriter(out, ['name', 'size']) as table:
+        table.writerow(('a', 1))
+        table.writerow(('longer', 1000))
+    assert out.text == (
+        'name    size\n'
+        'a          1\n'
+        'longer  1000\n'
+    )
+
+
+def test_sample_widths():
+    out = Output()
+    table = TableWriter(out, ['name', 'n'], sample=2)
+    table.writerows([('a', 1), ('bb', 2)])
+    # the widths are fixed once the sample is taken
+    table.writerow(('ccccc', 3))
+    table.close()
+    assert out.text.splitlines() == [
+        'name  n',
+        'a     1',
+        'bb    2',
+        'ccccc  3',
+    ]
+
+
+def test_fixed_widths_truncate():
+    out = Output()
+    with TableWriter(out, ['name', 'value'], widths=[6, 5], truncate=True) as table:
+        table.writerow(('abcdefghij', None))
+    assert out.text.splitlines() == ['name    value', 'abc...  ']
+
+
+def test_batches():
+    out = Output()
+    with TableWriter(out, ['n'], sample=10, batch=100) as table:
+        table.writerows((num,) for num in range(250))
+    assert len(out.writes) == 3
+    assert len(out.text.splitlines()) == 251
+    assert table.rows_written == 250
+
+
+def test_empty_table():
+    out = Output()
+    TableWriter(out, ['one', 'two']).close()
+    assert out.text == 'one  two\n'
+
+
+def test_csv():
+    out = Output()
+    with TableWriter(out, ['name', 'note'], fmt='csv', batch=2) as table:
+        table.writerows([('a', 'x, y'), ('b', 'say "hi"'), ('c', '')])
+    assert out.text == 'name,note\na,"x, y"\nb,"say ""hi"""\nc,\n'
+    assert len(out.writes) == 2
+
+
+def test_jsonl():
+    out = Output()
+    with TableWriter(out, ['name', 'size'], fmt='jsonl') as table:
+        table.writerow(('a', 1))
+        table.writerow(('b', None))
+    assert [json.loads(line) for line in out.text.splitlines()] == [
+        {'name': 'a', 'size': 1},
+        {'name': 'b', 'size': None},
+    ]
+
+
+def test_bad_format():
+    with pytest.raises(ValueError):
+        TableWriter(print, ['one'], fmt='xml')
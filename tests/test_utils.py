@@ -22,3 +22,26 @@
 # THE SOFTWARE.
 
 # TODO test all functions in utils
+
+import pytest
+
+import cmdsh
+
+
+def test_import_object_entry_point_style():
+    assert cmdsh.utils.import_object('cmdsh.modules:ExitCommand') is cmdsh.modules.ExitCommand
+
+
+def test_import_object_dotted():
+    assert cmdsh.utils.import_object('cmdsh.modules.ExitCommand') is cmdsh.modules.ExitCommand
+
+
+def test_import_object_nested():
+    assert cmdsh.utils.import_object('cmdsh:Shell.do') is cmdsh.Shell.do
+
+
+def test_import_object_missing():
+    with pytest.raises(AttributeError):
+        cmdsh.utils.import_object('cmdsh:NotAThing')
+    with pytest.raises(ImportError):
+        cmdsh.utils.import_object('cmdsh_not_a_module:Thing')